@@ -0,0 +1,42 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Currency
+from .serializers import CurrencySerializer
+
+CATALOGUE_CACHE_KEY = 'currencies:catalogue'
+
+
+def _etag(data):
+    return '"%s"' % hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def get_catalogue():
+    """
+    Return the serialized currency catalogue, building and caching it on the first call.
+
+    The catalogue is kept in the default cache until a Currency is saved or deleted
+    (see currencies/signals.py), so serving it costs no query and no serialization. The signals
+    only reach the process that made the change: with a per-process cache, the other processes
+    rebuild their catalogue once it is CURRENCY_CATALOGUE_TTL seconds old.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'etag': ETag of the whole catalogue.
+            - 'currencies': A dictionary mapping each code, in code order, to a
+                            (serialized currency, ETag of that currency) tuple.
+    """
+    catalogue = cache.get(CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        data = [dict(item) for item in CurrencySerializer(Currency.objects.all(), many=True).data]
+        catalogue = {'etag': _etag(data),
+                     'currencies': {item['code']: (item, _etag(item)) for item in data}}
+        cache.set(CATALOGUE_CACHE_KEY, catalogue, settings.CURRENCY_CATALOGUE_TTL)
+    return catalogue
+
+
+def invalidate_catalogue():
+    cache.delete(CATALOGUE_CACHE_KEY)
@@ -0,0 +1,56 @@
+from django.db import transaction
+
+from exchange_rates.libs.populate import async_backfill
+from .catalogue import invalidate_catalogue
+from .models import Currency
+from .registry import currency_registry
+from .serializers import CurrencySerializer
+
+
+def import_currencies(items):
+    """
+    Create many currencies at once.
+
+    The new currencies are validated with CurrencySerializer and inserted with one bulk_create in a
+    single transaction, which sends no post_save signal: the currency registry and catalogue are
+    cleared once, and one backfill of the new codes is scheduled when the transaction commits
+    instead of a refresh sweep per currency. Codes that already exist, or that appear earlier in
+    items, are skipped.
+
+    Args:
+        items (list): Dictionaries with the 'code', 'name' and 'symbol' of each currency.
+
+    Returns:
+        tuple: A tuple containing:
+            - list: Codes of the created currencies.
+            - list: Codes skipped because they already exist.
+
+    Raises:
+        rest_framework.exceptions.ValidationError: If any new currency is not valid; nothing is created.
+        django.db.IntegrityError: If a currency was created concurrently with one of the new codes;
+                                  nothing is created.
+    """
+    # The existing codes are read in the transaction that inserts the new ones: on SQLite it
+    # holds the write lock, elsewhere a concurrent insert of the same code raises IntegrityError.
+    with transaction.atomic():
+        existing = set(Currency.objects.values_list('code', flat=True))
+        new, skipped = [], []
+        for item in items:
+            code = item.get('code') if isinstance(item, dict) else None
+            if code in existing:
+                skipped.append(code)
+            else:
+                new.append(item)
+                if code is not None:
+                    existing.add(code)
+        serializer = CurrencySerializer(data=new, many=True)
+        serializer.is_valid(raise_exception=True)
+        created = Currency.objects.bulk_create([Currency(**data) for data in serializer.validated_data])
+        codes = [currency.code for currency in created]
+        currency_registry.clear()
+        invalidate_catalogue()
+        transaction.on_commit(currency_registry.clear)
+        transaction.on_commit(invalidate_catalogue)
+        if codes:
+            transaction.on_commit(lambda: async_backfill(codes))
+    return codes, skipped
@@ -0,0 +1,42 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from rest_framework.exceptions import ValidationError
+
+from currencies.importer import import_currencies
+
+
+class Command(BaseCommand):
+    """
+    Create many currencies at once from a JSON file, with a single backfill of their rates.
+
+    Unlike `manage.py loaddata`, the currencies are inserted with one bulk_create and their
+    rates are fetched by one background backfill instead of a refresh sweep per currency.
+    """
+    help = "Import currencies from a JSON list of {code, name, symbol} objects or a fixture of currencies."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON file to import, or - to read from stdin.")
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                items = json.load(sys.stdin)
+            else:
+                with open(options['path']) as file:
+                    items = json.load(file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        if not isinstance(items, list):
+            raise CommandError("Expected a list of currencies")
+        # Fixture objects carry the currency in their "fields".
+        items = [item.get('fields', item) if isinstance(item, dict) else item for item in items]
+        try:
+            created, skipped = import_currencies(items)
+        except ValidationError as e:
+            raise CommandError(f"Invalid currencies: {e.detail}")
+        except IntegrityError:
+            raise CommandError("A currency was created meanwhile, run the import again")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} currencies, skipped {len(skipped)}"))
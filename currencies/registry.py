@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Currency
+
+
+class CurrencyRegistry(object):
+    """
+    Process-wide, in-memory copy of the Currency table.
+
+    The table is tiny and rarely changes but is read on every request, so it is loaded once
+    and then served from memory, indexed by code and by id. The signal receivers in
+    currencies/signals.py clear it whenever a Currency is saved or deleted, and the next
+    lookup reloads it. Those signals only reach the process that saved it, so the copy is also
+    reloaded once it is CURRENCY_CATALOGUE_TTL seconds old, and a code missing from memory is
+    looked up once in the database: currencies renamed, deleted or created by another process
+    are picked up without a restart.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.loaded = None
+
+    def _expired(self):
+        ttl = settings.CURRENCY_CATALOGUE_TTL
+        return ttl is not None and time.monotonic() - self.loaded >= ttl
+
+    def _tables(self):
+        """
+        Return the (by_code, by_id) dictionaries, loading them from the database if needed.
+        """
+        snapshot = self.snapshot
+        if snapshot is None or self._expired():
+            with self.lock:
+                if self.snapshot is None or self._expired():
+                    currencies = list(Currency.objects.all())
+                    self.snapshot = ({currency.code: currency for currency in currencies},
+                                     {currency.id: currency for currency in currencies})
+                    self.loaded = time.monotonic()
+                snapshot = self.snapshot
+        return snapshot
+
+    def get(self, code):
+        """
+        Return the Currency with the given code.
+
+        Args:
+            code (str): ISO 4217 currency code ('USD').
+
+        Returns:
+            Currency: The matching currency.
+
+        Raises:
+            Currency.DoesNotExist: If no currency has that code.
+        """
+        currency = self._tables()[0].get(code)
+        if currency is None:
+            currency = Currency.objects.filter(code=code).first()
+            if currency is None:
+                raise Currency.DoesNotExist("Currency matching query does not exist.")
+            self.put(currency)
+        return currency
+
+    def get_by_id(self, pk):
+        """
+        Return the Currency with the given primary key, or None if it is unknown.
+        """
+        return self._tables()[1].get(pk)
+
+    def exists(self, code):
+        return code in self._tables()[0]
+
+    def codes(self):
+        """
+        Return the codes of all currencies, sorted like Currency.Meta.ordering.
+        """
+        return sorted(self._tables()[0])
+
+    def all(self):
+        """
+        Return every currency, sorted by code.
+        """
+        by_code = self._tables()[0]
+        return [by_code[code] for code in sorted(by_code)]
+
+    def exclude(self, code):
+        """
+        Return every currency except the one with the given code, sorted by code.
+        """
+        by_code = self._tables()[0]
+        return [by_code[item] for item in sorted(by_code) if item != code]
+
+    def put(self, currency):
+        with self.lock:
+            if self.snapshot is not None:
+                by_code = {code: item for code, item in self.snapshot[0].items() if item.id != currency.id}
+                by_code[currency.code] = currency
+                self.snapshot = (by_code, {item.id: item for item in by_code.values()})
+
+    def clear(self):
+        with self.lock:
+            self.snapshot = None
+
+
+currency_registry = CurrencyRegistry()
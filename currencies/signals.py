@@ -1,8 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from exchange_rates.libs.populate import async_populate_all
+from .catalogue import invalidate_catalogue
 from .models import Currency
+from .registry import currency_registry
 
 
 @receiver(post_save, sender=Currency)
@@ -11,7 +14,31 @@ def post_save_currency(sender, instance, created, **kwargs):
     Signal handler triggered after a Currency instance is saved.
 
     If the Currency instance was newly created, triggers an asynchronous task
-    to populate all related data.
+    to populate all related data. Rows loaded from fixtures (raw saves) are skipped: bulk
+    imports go through currencies.importer, which schedules a single backfill.
     """
-    if created:
+    if created and not kwargs.get('raw'):
         async_populate_all()
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def refresh_currency_registry(sender, instance, **kwargs):
+    """
+    Signal handler triggered after a Currency instance is saved or deleted.
+
+    Clears the in-memory currency registry so the next lookup reloads it, and clears it again
+    once the transaction commits in case another thread reloaded it in the meantime.
+    """
+    currency_registry.clear()
+    transaction.on_commit(currency_registry.clear)
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def refresh_currency_catalogue(sender, instance, **kwargs):
+    """
+    Signal handler triggered after a Currency instance is saved or deleted.
+
+    Drops the cached catalogue served by CurrencyViewSet, now and once the transaction commits.
+    """
+    invalidate_catalogue()
+    transaction.on_commit(invalidate_catalogue)
@@ -1,10 +1,19 @@
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError
 from django.urls import reverse
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.db.models.signals import post_save
 from currencies.signals import post_save_currency
 from currencies.models import Currency
+from currencies.registry import currency_registry
 
 
 class CurrencyViewSetTests(APITestCase):
@@ -67,3 +76,176 @@ class CurrencyViewSetTests(APITestCase):
         nonexistent_url = reverse('currency-detail', kwargs={'code': 'XXX'})
         response = self.client.get(nonexistent_url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CurrencyCatalogueTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$')
+        self.eur = Currency.objects.create(code='EUR', name='Euro', symbol='E')
+        self.list_url = reverse('currency-list')
+        self.detail_url = reverse('currency-detail', kwargs={'code': 'USD'})
+
+    def test_catalogue_served_without_queries(self):
+        # Once cached, list and detail are served without touching the database
+        self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+            detail = self.client.get(self.detail_url)
+        self.assertEqual(response.data, [{'code': 'EUR', 'name': 'Euro', 'symbol': 'E'},
+                                         {'code': 'USD', 'name': 'US Dollar', 'symbol': '$'}])
+        self.assertEqual(detail.data, {'code': 'USD', 'name': 'US Dollar', 'symbol': '$'})
+
+    def test_not_modified_when_etag_matches(self):
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        detail_etag = self.client.get(self.detail_url)['ETag']
+        self.assertNotEqual(detail_etag, etag)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_catalogue_invalidated_on_save_and_delete(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.usd.name = 'Dollar'
+        self.usd.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[1]['name'], 'Dollar')
+
+        self.eur.delete()
+        response = self.client.get(self.list_url)
+        self.assertEqual([item['code'] for item in response.data], ['USD'])
+        self.assertEqual(self.client.get(reverse('currency-detail', kwargs={'code': 'EUR'})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CURRENCY_CATALOGUE_TTL=30)
+    def test_catalogue_expires(self):
+        # Other processes are not signalled: their cached catalogue must expire
+        with patch('currencies.catalogue.cache.set') as cache_set:
+            self.client.get(self.list_url)
+        self.assertEqual(cache_set.call_args.args[2], 30)
+
+
+class CurrencyRegistryTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+
+    def test_lookups_are_served_from_memory(self):
+        # The table is loaded once, then every lookup is answered without a query
+        currency_registry.codes()
+        with self.assertNumQueries(0):
+            self.assertEqual(currency_registry.get('USD'), self.usd)
+            self.assertEqual(currency_registry.get_by_id(self.eur.id), self.eur)
+            self.assertEqual(currency_registry.codes(), ['EUR', 'USD'])
+            self.assertEqual(currency_registry.exclude('USD'), [self.eur])
+            self.assertTrue(currency_registry.exists('EUR'))
+
+    def test_refreshed_on_save_and_delete(self):
+        # post_save and post_delete clear the registry so it reloads the table
+        currency_registry.codes()
+        Currency.objects.create(code='GBP', name='Pound')
+        self.assertEqual(currency_registry.codes(), ['EUR', 'GBP', 'USD'])
+        self.usd.name = 'Dollar'
+        self.usd.save()
+        self.assertEqual(currency_registry.get('USD').name, 'Dollar')
+        self.eur.delete()
+        self.assertEqual(currency_registry.codes(), ['GBP', 'USD'])
+
+    def test_unknown_code_raises_does_not_exist(self):
+        with self.assertRaises(Currency.DoesNotExist):
+            currency_registry.get('XXX')
+
+    def test_missing_code_looked_up_in_database(self):
+        # A currency created without signals (e.g. by another process) is still found
+        currency_registry.codes()
+        Currency.objects.bulk_create([Currency(code='CHF', name='Franc')])
+        self.assertEqual(currency_registry.get('CHF').name, 'Franc')
+        self.assertTrue(currency_registry.exists('CHF'))
+
+    @override_settings(CURRENCY_CATALOGUE_TTL=60)
+    def test_reloaded_after_ttl(self):
+        # Renamed by another process: no signal reaches this one
+        currency_registry.codes()
+        Currency.objects.filter(code='USD').update(name='Dollar')
+        self.assertEqual(currency_registry.get('USD').name, 'US Dollar')
+
+        currency_registry.loaded -= 60
+        self.assertEqual(currency_registry.get('USD').name, 'Dollar')
+
+
+class CurrencyBulkImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.usd = Currency.objects.create(code='USD', name='US Dollar', symbol='$')
+        self.url = reverse('currency-import')
+        self.items = [{'code': 'EUR', 'name': 'Euro', 'symbol': 'E'},
+                      {'code': 'USD', 'name': 'Dollar', 'symbol': '$'},
+                      {'code': 'GBP', 'name': 'Pound', 'symbol': 'P'},
+                      {'code': 'EUR', 'name': 'Euro again', 'symbol': 'E'}]
+
+    @patch('currencies.importer.async_backfill')
+    @patch('currencies.signals.async_populate_all')
+    def test_import_schedules_one_backfill(self, mock_populate_all, mock_backfill):
+        currency_registry.codes()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, self.items, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'created': ['EUR', 'GBP'], 'skipped': ['USD', 'EUR']})
+        self.assertEqual(Currency.objects.get(code='EUR').name, 'Euro')
+        self.assertEqual(Currency.objects.get(code='USD').name, 'US Dollar')
+        self.assertEqual(currency_registry.codes(), ['EUR', 'GBP', 'USD'])
+        self.assertEqual([item['code'] for item in self.client.get(reverse('currency-list')).data],
+                         ['EUR', 'GBP', 'USD'])
+        mock_backfill.assert_called_once_with(['EUR', 'GBP'])
+        mock_populate_all.assert_not_called()
+
+    @patch('currencies.importer.async_backfill')
+    def test_invalid_import_creates_nothing(self, mock_backfill):
+        items = [{'code': 'EUR', 'name': 'Euro'}, {'code': 'XXX', 'name': 'Unknown'}]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('code', response.data[1])
+        self.assertEqual(self.client.post(self.url, {'code': 'EUR'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Currency.objects.filter(code='EUR').exists())
+        mock_backfill.assert_not_called()
+
+    @patch('currencies.importer.async_backfill')
+    def test_concurrent_import_is_a_conflict(self, mock_backfill):
+        # Another client inserted one of the codes after they were read
+        with patch.object(Currency.objects, 'bulk_create', side_effect=IntegrityError):
+            response = self.client.post(self.url, self.items, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Currency.objects.filter(code='EUR').exists())
+        mock_backfill.assert_not_called()
+
+    @patch('currencies.importer.async_backfill')
+    def test_import_command(self, mock_backfill):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump([{'model': 'currencies.currency', 'fields': item} for item in self.items], file)
+            file.flush()
+            out = StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('import_currencies', file.name, stdout=out)
+
+        self.assertIn('Created 2 currencies, skipped 2', out.getvalue())
+        mock_backfill.assert_called_once_with(['EUR', 'GBP'])
+
+    @patch('currencies.signals.async_populate_all')
+    def test_fixture_rows_do_not_start_refreshes(self, mock_populate_all):
+        post_save_currency(sender=Currency, instance=self.usd, created=True, raw=True)
+        mock_populate_all.assert_not_called()
+        post_save_currency(sender=Currency, instance=self.usd, created=True, raw=False)
+        mock_populate_all.assert_called_once_with()
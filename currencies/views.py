@@ -1,5 +1,12 @@
-from rest_framework import viewsets
+from django.db import IntegrityError
+from django.http import Http404
+from django.utils.http import parse_etags
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
+from .catalogue import get_catalogue
+from .importer import import_currencies
 from .models import Currency
 from .serializers import CurrencySerializer
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
@@ -26,9 +33,54 @@ class CurrencyViewSet(viewsets.ModelViewSet):
     update:
     Update information in Currency.
 
+    import:
+    Create many currencies at once from a list, skipping the codes that already exist.
+
+    list and retrieve are served from the cached catalogue (currencies/catalogue.py) with an ETag,
+    and answer 304 Not Modified when the client sends a matching If-None-Match header.
+
     """
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated]
     lookup_field = 'code'
     queryset = Currency.objects.all()
     serializer_class = CurrencySerializer
+
+    def list(self, request, *args, **kwargs):
+        catalogue = get_catalogue()
+        return self._conditional_response(
+            request, [item for item, etag in catalogue['currencies'].values()], catalogue['etag'])
+
+    def retrieve(self, request, *args, **kwargs):
+        currency = get_catalogue()['currencies'].get(kwargs[self.lookup_field])
+        if currency is None:
+            raise Http404
+        return self._conditional_response(request, *currency)
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import')
+    def bulk_import(self, request):
+        """
+        Create the currencies of a JSON list in one transaction (see currencies.importer).
+
+        Returns:
+            Response: HTTP 201 with the created and skipped codes, HTTP 400 with the errors
+            of each item if the body is not a list or any new currency is not valid, or HTTP 409
+            if another client created one of the new codes meanwhile.
+        """
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of currencies.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            created, skipped = import_currencies(request.data)
+        except IntegrityError:
+            return Response({'detail': 'A currency was created meanwhile, retry the import.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response({'created': created, 'skipped': skipped}, status=status.HTTP_201_CREATED)
+
+    def _conditional_response(self, request, data, etag):
+        """
+        Return the data with its ETag, or an empty 304 response if the client already has it.
+        """
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(data, headers={'ETag': etag})
@@ -1,10 +1,57 @@
+import re
+from datetime import datetime
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, Q
 from django.shortcuts import render
 from django.urls import path
+from django.utils.functional import cached_property
 
+from currencies.registry import currency_registry
 from .forms import ConverterForm
 from .libs.converter import converter
-from .models import CurrencyExchangeRate
+from .models import CurrencyExchangeRate, FetchJob
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than `limit` rows.
+
+    A filtered changelist counts at most limit + 1 rows and reports `limit` beyond that. The
+    unfiltered changelist estimates the table size from the primary key bounds, two index seeks,
+    instead of a COUNT(*) over millions of rows.
+    """
+    limit = 10000
+
+    @cached_property
+    def count(self):
+        count = self.object_list.order_by().values('pk')[:self.limit + 1].count()
+        if count <= self.limit:
+            return count
+        if not self.object_list.query.where:
+            bounds = self.object_list.model._default_manager.aggregate(first=Min('pk'), last=Max('pk'))
+            return bounds['last'] - bounds['first'] + 1
+        return self.limit
+
+
+class CurrencyExchangeRateChangeList(ChangeList):
+    """
+    ChangeList that keeps date filters on the (source_currency, valuation_date, ...) index.
+
+    valuation_date is only indexed after source_currency, so a date filter without a source
+    filter is given an explicit IN over every source currency, which SQLite resolves with one
+    index range scan per currency instead of a full table scan.
+    """
+
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        filters_date = any(param.startswith('valuation_date__') for param in self.params)
+        filters_source = any(param.startswith('source_currency__') for param in self.params)
+        if filters_date and not filters_source:
+            qs = qs.filter(source_currency_id__in=[currency.id for currency in currency_registry.all()])
+        return qs
 
 
 # Register your models here.
@@ -17,14 +64,55 @@ class CurrencyExchangeRateAdmin(admin.ModelAdmin):
         list_display (tuple): Fields to display in the admin list view.
 
     Provides a custom admin view for currency conversion accessible via a 'converter/' URL.
+
+    The changelist is built for tables with millions of rows: currencies are joined in the page
+    query, every filter and the date hierarchy run on indexed columns, counts are bounded by
+    EstimatedCountPaginator, search only matches exact currency codes or dates and columns are
+    not sortable, so a page never sorts or scans the whole table.
     """
 
     model = CurrencyExchangeRate
+    change_list_template = 'admin/exchange_rates/CurrencyExchangeRate/change_list.html'
     list_display = (
         'source_currency',
         'exchanged_currency',
         'valuation_date',
         'rate_value')
+    list_select_related = ('source_currency', 'exchanged_currency')
+    list_filter = ('source_currency', 'exchanged_currency', 'valuation_date')
+    date_hierarchy = 'valuation_date'
+    search_fields = ('source_currency__code', 'exchanged_currency__code', 'valuation_date')
+    search_help_text = "Currency code (USD) or valuation date (YYYY-MM-DD)."
+    sortable_by = ()
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_changelist(self, request, **kwargs):
+        return CurrencyExchangeRateChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match every word of the search against currency codes or valuation dates, exactly.
+
+        Codes are resolved to ids through the currency registry, so the filter runs on the
+        indexed foreign key columns instead of LIKE over joined tables; words that are neither
+        a known code nor a date match nothing.
+        """
+        for word in search_term.split():
+            if re.fullmatch(r'\d{4}-\d{2}-\d{2}', word):
+                try:
+                    valuation_date = datetime.strptime(word, "%Y-%m-%d").date()
+                except ValueError:
+                    return queryset.none(), False
+                queryset = queryset.filter(valuation_date=valuation_date)
+            elif currency_registry.exists(word.upper()):
+                currency = currency_registry.get(word.upper())
+                queryset = queryset.filter(Q(source_currency_id=currency.id) | Q(exchanged_currency_id=currency.id))
+            else:
+                return queryset.none(), False
+        return queryset, False
 
     def get_urls(self):
         """
@@ -74,3 +162,20 @@ class CurrencyExchangeRateAdmin(admin.ModelAdmin):
 
 
 admin.site.register(CurrencyExchangeRate, CurrencyExchangeRateAdmin)
+
+
+class FetchJobAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the provider fetch job queue, to follow retries and failures.
+    """
+    list_display = ('source_currency', 'kind', 'start_date', 'state', 'attempts', 'run_after', 'updated')
+    list_filter = ('state', 'kind')
+    list_select_related = ('source_currency',)
+    ordering = ('-pk',)
+    readonly_fields = [field.name for field in FetchJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(FetchJob, FetchJobAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ExchangeRatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exchange_rates'
+
+    def ready(self):
+        import exchange_rates.signals
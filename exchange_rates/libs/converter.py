@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from currencies.models import Currency
+from django.conf import settings
+
+from currencies.registry import currency_registry
 from .exchange_finder import ExchangeFinder
 from exchange_rates.libs.populate import async_populate_all
 
@@ -23,26 +25,47 @@ def converter(source_currency, exchanged_currency=None, value=None):
             - 'source_currency': A dictionary with the source currency code and the input value.
             - 'exchanged_currency': A dictionary mapping target currency codes to their converted values.
                                     If value is None or invalid, converted values will be None.
+            - 'as_of': The valuation date of the oldest rate used, in 'YYYY-MM-DD' format.
+            - 'stale': True if the rates used are older than today's.
+
+    Stale-while-revalidate: if today's rates are not stored yet, the latest stored rates at most
+    CONVERTER_MAX_STALENESS_DAYS old are used right away, and the refresh started by
+    async_populate_all() stores today's rates in the background. Only when a requested currency
+    has no recent enough rate (e.g. it was just added) does the conversion wait for the provider.
     """
     today = datetime.today().strftime('%Y-%m-%d')
     if exchanged_currency is None:
-        target_currency = Currency.objects.exclude(code=source_currency).values_list('code', flat=True)
-    elif Currency.objects.filter(code__in=exchanged_currency).exists():
+        target_currency = [currency.code for currency in currency_registry.exclude(source_currency)]
+    elif any(currency_registry.exists(code) for code in exchanged_currency):
         target_currency = exchanged_currency
     else:
         target_currency = []
-    result = ExchangeFinder(source_currency, today,
-                            today).get_currency_rates_list()
+    finder = ExchangeFinder(source_currency, today, today)
+    as_of, rates = finder.get_latest_rates(settings.CONVERTER_MAX_STALENESS_DAYS, target_currency or None)
+    # Only the requested currencies without a recent rate wait for the provider. The source
+    # currency has no rate against itself and is left out of the conversion.
+    missing = [code for code in target_currency
+               if code not in rates and code != source_currency and currency_registry.exists(code)]
+    if as_of is None or missing:
+        fresh = finder.get_currency_rates_list().get(today) or {}
+        if as_of is None or all(code in fresh for code in missing + list(rates)):
+            as_of, rates = today, fresh
+        else:
+            rates.update({code: fresh[code] for code in missing if code in fresh})
+    if as_of != today:
+        as_of = as_of.strftime('%Y-%m-%d')
 
     conversion = {}
-    for item in result.get(today):
+    for item in rates:
         if item in target_currency:
             try:
-                conversion[item] = result.get(today).get(item) * value
+                conversion[item] = rates.get(item) * value
             except TypeError:
                 conversion[item] = None
     out = {"date": today,
            "source_currency": {source_currency: value},
-           "exchanged_currency": conversion}
+           "exchanged_currency": conversion,
+           "as_of": as_of,
+           "stale": as_of != today}
     async_populate_all()
     return out
@@ -1,9 +1,55 @@
+from collections.abc import Sequence
 from datetime import datetime
 from datetime import timedelta
 
+from django.conf import settings
+from django.db.models import Count
+
 from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.libs.pagination import decode_cursor, encode_cursor
 from exchange_rates.libs.populate import populate, async_populate_all
+from exchange_rates.libs.rate_columns import RateColumns
+from exchange_rates.libs.rate_store import rate_store
+from exchange_rates.libs.shared_rates import shared_rates
 from exchange_rates.models import CurrencyExchangeRate
+from my_currency import deadline
+from providers.calendar import publication_calendar
+
+
+class DateSpan(Sequence):
+    """
+    An inclusive range of consecutive dates, kept as its two ends.
+
+    Behaves like the list of every date in the range (len, indexing, iteration, membership)
+    without building it, so a range of several decades costs the same as a single day.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return max((self.end - self.start).days + 1, 0)
+
+    def __getitem__(self, index):
+        days = range(len(self))[index]
+        if isinstance(days, range):
+            return [self.start + timedelta(days=day) for day in days]
+        return self.start + timedelta(days=days)
+
+    def __contains__(self, value):
+        return self.start <= value <= self.end
+
+    def __eq__(self, other):
+        if isinstance(other, DateSpan):
+            return (self.start, len(self)) == (other.start, len(other))
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"DateSpan({self.start}, {self.end})"
 
 
 class ExchangeFinder(object):
@@ -12,7 +58,7 @@ class ExchangeFinder(object):
     over a specified date range.
     """
 
-    def __init__(self, source_currency, start_date, end_date):
+    def __init__(self, source_currency, start_date, end_date, forward_fill=False):
         """
         Initialize the ExchangeFinder with a source currency and date range.
 
@@ -20,6 +66,8 @@ class ExchangeFinder(object):
             source_currency (str): The currency code of the source currency ('USD', 'EUR').
             start_date (str): The start date for the exchange rate query in 'YYYY-MM-DD' format.
             end_date (str): The end date for the exchange rate query in 'YYYY-MM-DD' format.
+            forward_fill (bool, optional): Whether the days on which the provider publishes no rates
+                                           get the rates of the last publication day. Defaults to False.
 
         Raises:
             Currency.DoesNotExist: If the source_currency code does not exist in the Currency model.
@@ -27,18 +75,19 @@ class ExchangeFinder(object):
         self.code_source_currency = source_currency
         self.start_date = start_date
         self.end_date = end_date
+        self.forward_fill = forward_fill
         try:
-            self.source_currency = Currency.objects.get(code=source_currency)
-            self.target_currency = Currency.objects.exclude(code=source_currency).values_list('id')
-            self.code_target_currency = ",".join(Currency.objects.exclude(
-                code=source_currency).values_list('code', flat=True))
+            self.source_currency = currency_registry.get(source_currency)
         except Currency.DoesNotExist:
             raise Currency.DoesNotExist('Currency code not found, you need to add')
+        targets = currency_registry.exclude(source_currency)
+        self.target_currency = [currency.id for currency in targets]
+        self.code_target_currency = ",".join(currency.code for currency in targets)
         self.dates, self.current_date = self._date_range(start_date, end_date)
 
     def _date_range(self, start_date, end_date):
         """
-        Generate a list of dates between start_date and end_date.
+        Build the span of dates between start_date and end_date.
 
         Args:
             start_date (str): The start date in 'YYYY-MM-DD' format.
@@ -46,7 +95,7 @@ class ExchangeFinder(object):
 
         Returns:
             tuple: A tuple containing:
-                - list: A list of date objects between start_date and end_date (inclusive).
+                - DateSpan: The dates between start_date and end_date (inclusive), as a lazy sequence.
                 - date: The start_date as a date object.
 
         Raises:
@@ -57,12 +106,7 @@ class ExchangeFinder(object):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
         except ValueError:
             raise ValueError("Invalid date format, expected YYYY-MM-DD")
-        dates = []
-        current_date = start_date
-        while current_date <= end_date:
-            dates.append(current_date)
-            current_date += timedelta(days=1)
-        return dates, start_date
+        return DateSpan(start_date, end_date), start_date
 
     def get_currency_rates_list(self):
         """
@@ -72,44 +116,217 @@ class ExchangeFinder(object):
         Returns:
             dict: A dictionary where keys are dates in 'YYYY-MM-DD' format and values are dictionaries
                   mapping target currency codes to their exchange rates (as floats).
+        """
+        return self.get_currency_rates_columns().to_dict()
+
+    def get_currency_rates_columns(self):
+        """
+        Retrieve the exchange rates of the date range in columnar form, fetching the missing ones.
+
+        A range fully present in the shared memory rates (RATE_SHM_ENABLED) or in the memory-mapped
+        rate store (RATE_STORE_ENABLED) is read from them, without querying the database.
+
+        Missing rates are fetched until the budget of the current request runs out (see
+        my_currency.deadline), which raises DeadlineExceeded.
+
+        With forward_fill only the publication days of the provider calendar (see
+        providers.calendar) must be stored: the other days get the rates of the last publication
+        day before them, and are listed in the filled attribute of the result.
+
+        Returns:
+            RateColumns: The rates, one row per date and one column per target currency.
+        """
+        if self.forward_fill:
+            return self._forward_filled_columns()
+        columns = self._stored_rates()
+        if columns is not None:
+            async_populate_all()
+            return columns
+        while not self._is_complete():
+            deadline.check()
+            populate(code_source_currency=self.code_source_currency, start_date=self.start_date,
+                     end_date=self.end_date)
+        columns = self._columns()
+        async_populate_all()
+        return columns
+
+    def get_stored_rates_columns(self):
+        """
+        Retrieve the exchange rates of the date range already stored, without fetching the missing ones.
+
+        Used to answer with partial rates once the request deadline is exceeded.
+
+        Returns:
+            RateColumns: The stored rates, without the dates that have none (forward filled with forward_fill).
+        """
+        if self.forward_fill:
+            calendar = publication_calendar()
+            return self._fill(self._columns(calendar.last_publication(self.dates.start)), calendar)
+        return self._columns()
+
+    def _columns(self, start=None):
+        return RateColumns.from_rows(self._rates(start).order_by('valuation_date').values_list(
+            'valuation_date', 'exchanged_currency_id', 'rate_value').iterator(), self._target_codes())
 
+    def _forward_filled_columns(self):
         """
-        out = {}
-        end = True
-        while end:
-            dates_set = set(self.dates)
-            target_currency = set(self.code_target_currency.split(','))
-            existing_dates = set(
-                CurrencyExchangeRate.objects.filter(
-                    source_currency=self.source_currency,
-                    exchanged_currency__in=self.target_currency,
-                    valuation_date__in=self.dates
-                ).values_list('valuation_date', flat=True).distinct()
-            )
-            existing_target_currency = set(
-                CurrencyExchangeRate.objects.filter(
-                    source_currency=self.source_currency,
-                    exchanged_currency__in=self.target_currency,
-                    valuation_date__in=self.dates
-                ).values_list('exchanged_currency__code', flat=True).distinct()
-            )
-
-            if existing_dates == dates_set and target_currency == existing_target_currency:
-                exchanged_currency = CurrencyExchangeRate.objects.filter(source_currency=self.source_currency,
-                                                                         exchanged_currency__in=self.target_currency,
-                                                                         valuation_date__in=self.dates).order_by(
-                    'valuation_date')
-                for item in exchanged_currency:
-                    if out.get(item.valuation_date.strftime("%Y-%m-%d")):
-                        out[item.valuation_date.strftime("%Y-%m-%d")].update({
-                            item.exchanged_currency.code: float(item.rate_value)})
-                    else:
-                        out.update(
-                            {item.valuation_date.strftime("%Y-%m-%d"): {
-                                item.exchanged_currency.code: float(item.rate_value)}})
-                end = False
-            else:
+        Retrieve the rates of the publication days from the last one on or before the start date, then fill the range.
+
+        The missing rates are fetched once: publication days the provider still has no rates for
+        (a holiday missing from the calendar) are filled like non-publication days.
+        """
+        calendar = publication_calendar()
+        start = calendar.last_publication(self.dates.start)
+        if not self._is_complete(start, calendar):
+            deadline.check()
+            populate(code_source_currency=self.code_source_currency, start_date=start.strftime("%Y-%m-%d"),
+                     end_date=self.end_date)
+        columns = self._columns(start)
+        async_populate_all()
+        return self._fill(columns, calendar)
+
+    def _fill(self, columns, calendar):
+        stored = set(columns.dates)
+        return columns.forward_fill(self.dates, lambda day: day in stored and calendar.is_published(day))
+
+    def get_currency_rates_page(self, limit, cursor=None):
+        """
+        Retrieve one page of the exchange rates of the date range, ordered by date and exchanged currency.
+
+        Pages are delimited by keyset: the cursor holds the (valuation_date, exchanged_currency) of the
+        last rate already returned and the next page starts right after it, so every page costs one
+        index range scan and rates inserted meanwhile never shift the following pages. Missing rates
+        are only fetched for the first page (no cursor).
+
+        Args:
+            limit (int): Maximum number of rates (date and currency pairs) in the page.
+            cursor (str, optional): Cursor returned with the previous page. Defaults to None, the first page.
+
+        Returns:
+            tuple: A tuple containing:
+                - dict: The rates of the page, in the same format as get_currency_rates_list.
+                - str: The cursor of the next page, or None if this is the last one.
+
+        Raises:
+            ValueError: If the cursor is not valid.
+        """
+        rates = self._rates()
+        if cursor is None:
+            while not self._is_complete():
+                deadline.check()
                 populate(code_source_currency=self.code_source_currency, start_date=self.start_date,
                          end_date=self.end_date)
-        async_populate_all()
-        return out
+            async_populate_all()
+        else:
+            after_date, after_currency = decode_cursor(cursor)
+            rates = rates.filter(valuation_date__gte=after_date).exclude(
+                valuation_date=after_date, exchanged_currency_id__lte=after_currency)
+        rows = list(rates.order_by('valuation_date', 'exchanged_currency_id').values_list(
+            'valuation_date', 'exchanged_currency_id', 'rate_value')[:limit + 1])
+        next_cursor = encode_cursor(*rows[limit - 1][:2]) if len(rows) > limit else None
+        return RateColumns.from_rows(rows[:limit], self._target_codes()).to_dict(), next_cursor
+
+    def get_latest_rates(self, max_age_days, targets=None):
+        """
+        Retrieve the most recent stored rates of the source currency, without fetching anything.
+
+        Takes the latest rate of each target currency at most max_age_days before the end date of
+        the range, so a target without recent rates (a currency just added) does not hide the
+        others: it is simply left out.
+
+        Args:
+            max_age_days (int): How many days before the end date the rates may be.
+            targets (list, optional): Codes of the target currencies wanted; unknown codes are
+                                      ignored. Defaults to None, every target currency.
+
+        Returns:
+            tuple: A tuple containing:
+                - date: The valuation date of the oldest rate returned, or None if there are no
+                        recent enough rates.
+                - dict: A dictionary mapping target currency codes to their exchange rates (as floats).
+        """
+        if targets is None:
+            target_ids = self.target_currency
+        else:
+            target_ids = [currency_registry.get(code).id for code in targets
+                          if code != self.code_source_currency and currency_registry.exists(code)]
+        if settings.RATE_SHM_ENABLED and target_ids:
+            for age in range(max_age_days + 1):
+                day = self.dates.end - timedelta(days=age)
+                shared = shared_rates.get_range(self.source_currency.id, day, day, target_ids)
+                if shared is not None:
+                    return day, self._codes(shared[day])
+        oldest = self.dates.end - timedelta(days=max_age_days)
+        latest = {}
+        for exchanged_id, valuation_date, rate_value in CurrencyExchangeRate.objects.filter(
+                source_currency=self.source_currency, exchanged_currency__in=target_ids,
+                valuation_date__range=(oldest, self.dates.end)
+        ).order_by('-valuation_date').values_list('exchanged_currency_id', 'valuation_date', 'rate_value'):
+            latest.setdefault(exchanged_id, (valuation_date, rate_value))
+        if not latest:
+            return None, {}
+        as_of = min(valuation_date for valuation_date, _ in latest.values())
+        return as_of, self._codes({exchanged_id: float(value) for exchanged_id, (_, value) in latest.items()})
+
+    def _stored_rates(self):
+        """
+        Return the RateColumns of the range from shared memory or the rate store, or None if neither has them all.
+        """
+        if not self.target_currency:
+            return None
+        stored = None
+        if settings.RATE_SHM_ENABLED:
+            stored = shared_rates.get_range(self.source_currency.id, self.dates.start, self.dates.end,
+                                            self.target_currency)
+        if stored is not None:
+            return RateColumns.from_mapping(stored, self._target_codes())
+        if settings.RATE_STORE_ENABLED:
+            rates = rate_store.read(self.source_currency.id, self.dates.start, self.dates.end, self.target_currency)
+            if rates is not None:
+                return RateColumns(self.dates, self._target_codes().values(), rates)
+        return None
+
+    def _codes(self, rates):
+        """
+        Key a {exchanged_currency_id: rate} dictionary by currency code.
+        """
+        return {currency_registry.get_by_id(exchanged_id).code: value for exchanged_id, value in rates.items()}
+
+    def _target_codes(self):
+        """
+        Return the currency code of every target currency id, in column order.
+        """
+        return {target: currency_registry.get_by_id(target).code for target in self.target_currency}
+
+    def _rates(self, start=None):
+        """
+        Return the stored rates of the source currency against the target currencies in the date range.
+
+        The range is a BETWEEN predicate, so the query has the same size whatever the number of days.
+
+        Args:
+            start (date, optional): Start of the range instead of the start date. Defaults to None.
+        """
+        return CurrencyExchangeRate.objects.filter(source_currency=self.source_currency,
+                                                   exchanged_currency__in=self.target_currency,
+                                                   valuation_date__range=(start or self.dates.start, self.dates.end))
+
+    def _is_complete(self, start=None, calendar=None):
+        """
+        Check whether every target currency has a stored rate for every date of the range.
+
+        Rates are unique per pair and date, so a target currency is complete when its number
+        of rows in the range equals the number of days, which one grouped count answers.
+
+        Args:
+            start (date, optional): Start of the range instead of the start date. Defaults to None.
+            calendar (Calendar, optional): Only count the publication days of this calendar. Defaults to None.
+        """
+        rates = self._rates(start)
+        days = len(DateSpan(start or self.dates.start, self.dates.end))
+        if calendar is not None:
+            rates = rates.filter(valuation_date__week_day__in=calendar.django_weekdays()).exclude(
+                valuation_date__in=calendar.closed)
+            days = calendar.count(start or self.dates.start, self.dates.end)
+        counts = dict(rates.order_by().values_list('exchanged_currency_id').annotate(total=Count('id')))
+        return all(counts.get(target, 0) == days for target in self.target_currency)
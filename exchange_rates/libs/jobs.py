@@ -0,0 +1,187 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from exchange_rates.models import FetchJob
+from my_currency.routers import pin_primary, primary_pinned
+from providers.adapters.throttle import background_fetch
+
+
+def enqueue(source_currency, start_date, kind=FetchJob.REFRESH):
+    """
+    Queue a job fetching the rates of a source currency from start_date to today.
+
+    A currency has at most one pending or running job (enforced by a partial unique constraint):
+    if one exists the new job is dropped, and a pending job starting later is moved to start_date.
+
+    Args:
+        source_currency (Currency): The currency whose rates are fetched.
+        start_date (date): First date to fetch.
+        kind (str, optional): FetchJob.REFRESH or FetchJob.BACKFILL. Defaults to FetchJob.REFRESH.
+
+    Returns:
+        FetchJob: The queued job, or None if the currency already had one.
+    """
+    try:
+        with transaction.atomic():
+            return FetchJob.objects.create(kind=kind, source_currency=source_currency, start_date=start_date,
+                                           run_after=timezone.now())
+    except IntegrityError:
+        FetchJob.objects.filter(source_currency=source_currency, state=FetchJob.PENDING,
+                                start_date__gt=start_date).update(start_date=start_date)
+        return None
+
+
+def enqueue_refreshes(start_dates):
+    """
+    Queue a refresh of the source currencies that have none pending or running.
+
+    Called on the request path, so the queue is read first and only the missing jobs are
+    inserted, or the pending jobs moved to an earlier start date as enqueue() does: a request
+    served while the refreshes are queued takes no write lock. These writes do not pin the reads
+    of the request, nor those of the client, to the primary.
+
+    Args:
+        start_dates (dict): First date to fetch by source currency (Currency).
+
+    Returns:
+        list: The queued jobs.
+    """
+    active = {source_id: (state, start_date) for source_id, state, start_date in FetchJob.objects.filter(
+        state__in=(FetchJob.PENDING, FetchJob.RUNNING)).values_list('source_currency_id', 'state', 'start_date')}
+    queued = []
+    with primary_pinned(False):
+        for source_currency, start_date in start_dates.items():
+            state, queued_start = active.get(source_currency.pk, (None, None))
+            if state is None:
+                job = enqueue(source_currency, start_date)
+                if job is not None:
+                    queued.append(job)
+            elif state == FetchJob.PENDING and queued_start > start_date:
+                enqueue(source_currency, start_date)
+    return queued
+
+
+def claim_job():
+    """
+    Claim the next due job: a pending job whose run_after has passed, or a running one whose lease expired.
+
+    Claims are a compare-and-set on the version of the job, so when several workers race for the
+    same job exactly one update matches and the others move on to the next candidate. No row lock
+    is held, which works the same on SQLite and on server databases.
+
+    Returns:
+        FetchJob: The claimed job, now running, or None if no job is due.
+    """
+    # The queue is read back right after being written: never from a replica.
+    pin_primary()
+    now = timezone.now()
+    FetchJob.objects.filter(state=FetchJob.RUNNING, locked_until__lt=now,
+                            attempts__gte=settings.FETCH_JOB_MAX_ATTEMPTS).update(
+        state=FetchJob.FAILED, locked_until=None, last_error="Lease expired", updated=now)
+    due = Q(state=FetchJob.PENDING, run_after__lte=now) | Q(state=FetchJob.RUNNING, locked_until__lt=now)
+    for pk, version in FetchJob.objects.filter(due).order_by('run_after').values_list('pk', 'version')[:10]:
+        claimed = FetchJob.objects.filter(pk=pk, version=version).update(
+            state=FetchJob.RUNNING, version=version + 1, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.FETCH_JOB_LEASE), updated=now)
+        if claimed:
+            return FetchJob.objects.select_related('source_currency').get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job, then mark it done, or pending again with an exponential backoff, or failed.
+
+    Args:
+        job (FetchJob): A job returned by claim_job().
+
+    Returns:
+        bool: Whether the rates were fetched.
+    """
+    # populate imports this module to queue its jobs.
+    from exchange_rates.libs.populate import populate
+
+    try:
+        with background_fetch():
+            populate(job.source_currency.code, job.start_date.strftime("%Y-%m-%d"))
+    except Exception as e:
+        now = timezone.now()
+        if job.attempts >= settings.FETCH_JOB_MAX_ATTEMPTS:
+            state, run_after = FetchJob.FAILED, now
+        else:
+            delay = min(settings.FETCH_JOB_BACKOFF * 2 ** (job.attempts - 1), settings.FETCH_JOB_MAX_BACKOFF)
+            state, run_after = FetchJob.PENDING, now + timedelta(seconds=delay)
+        FetchJob.objects.filter(pk=job.pk, version=job.version).update(
+            state=state, run_after=run_after, locked_until=None, last_error=repr(e), updated=now)
+        return False
+    FetchJob.objects.filter(pk=job.pk, version=job.version).update(
+        state=FetchJob.DONE, locked_until=None, last_error='', updated=timezone.now())
+    return True
+
+
+def run_pending(limit=None):
+    """
+    Claim and run due jobs until there are none left.
+
+    Args:
+        limit (int, optional): Maximum number of jobs to run. Defaults to None, no limit.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
+
+
+_drain_lock = threading.Lock()
+_draining = False
+_wake = False
+
+
+def _drain():
+    global _draining, _wake
+    stopped = False
+    try:
+        while True:
+            run_pending()
+            with _drain_lock:
+                if not _wake:
+                    _draining = False
+                    stopped = True
+                    return
+                _wake = False
+    finally:
+        if not stopped:
+            with _drain_lock:
+                _draining = False
+        connections.close_all()
+
+
+def wake_worker():
+    """
+    Drain the queue in a background thread of this process (FETCH_WORKER_IN_PROCESS).
+
+    At most one thread drains the queue; waking it while it runs makes it look for jobs once
+    more before stopping. Jobs waiting for their retry time are left to the next wake up or to
+    `manage.py fetch_worker`.
+    """
+    global _draining, _wake
+    if not settings.FETCH_WORKER_IN_PROCESS:
+        return
+    with _drain_lock:
+        if _draining:
+            _wake = True
+            return
+        _draining = True
+    threading.Thread(target=_drain, daemon=True).start()
@@ -0,0 +1,262 @@
+import asyncio
+import base64
+import math
+import random
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+# Endpoints driven by the load generator, by the name used in the request mix.
+ENDPOINTS = {
+    'convert': '/api/v1/convert_amount/',
+    'list': '/api/v1/concurrency_rate_list/',
+}
+
+
+def parse_mix(text):
+    """
+    Parse a request mix such as 'convert=4,list=1' into relative weights.
+
+    Args:
+        text (str): Comma-separated endpoint=weight pairs; endpoints are the keys of ENDPOINTS.
+
+    Returns:
+        dict: The weight of each endpoint.
+
+    Raises:
+        ValueError: If an endpoint is unknown or a weight is not a positive number.
+    """
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+        if not mix[name] > 0:
+            raise ValueError(f"Invalid weight for {name!r}")
+    return mix
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percentile of sorted values, or None if there are none.
+    """
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+class RequestMix(object):
+    """
+    Random requests following a mix of endpoints.
+
+    Conversions are from source_currency to the target currencies with a random amount; rate lists
+    cover the last `days` days of the source currency.
+    """
+
+    def __init__(self, mix, source_currency, targets, days=30, seed=None):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.source_currency = source_currency
+        self.targets = targets
+        self.days = days
+        self.random = random.Random(seed)
+
+    def list_path(self):
+        today = date.today()
+        return ENDPOINTS['list'] + '?' + urlencode({
+            'source_currency': self.source_currency,
+            'date_from': (today - timedelta(days=self.days - 1)).strftime('%Y-%m-%d'),
+            'date_to': today.strftime('%Y-%m-%d')})
+
+    def next(self):
+        """
+        Returns:
+            tuple: The endpoint name and the path with its query string.
+        """
+        name = self.random.choices(self.names, self.weights)[0]
+        if name == 'list':
+            return name, self.list_path()
+        return name, ENDPOINTS['convert'] + '?' + urlencode({
+            'source_currency': self.source_currency, 'exchanged_currency': ','.join(self.targets),
+            'amount': self.random.randint(1, 1000)})
+
+
+class HttpConnection(object):
+    """
+    Minimal HTTP/1.1 client over asyncio streams, reusing its connection between requests.
+
+    Thousands of them run in one thread, so the load generator costs a coroutine per concurrent
+    client instead of a thread, and does not become the bottleneck before the server does.
+    """
+
+    def __init__(self, host, port, headers=None):
+        self.host = host
+        self.port = port
+        self.headers = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        self.reader = None
+        self.writer = None
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """
+        Send a GET request and read the whole response.
+
+        A kept-alive connection the server closed or reset meanwhile is opened again once.
+
+        Returns:
+            tuple: The status code and the body.
+
+        Raises:
+            OSError: If the server cannot be reached.
+            ValueError: If the response is not valid HTTP.
+        """
+        reused = self.writer is not None
+        if not reused:
+            await self._open()
+        request = f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n{self.headers}\r\n".encode()
+        try:
+            self.writer.write(request)
+            await self.writer.drain()
+            status_line = await self.reader.readline()
+        except OSError:
+            self.close()
+            if not reused:
+                raise
+            status_line = b''
+        if not status_line and reused:
+            self.close()
+            return await self.get(path)
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            self.close()
+            raise ValueError(f"Invalid status line {status_line!r}")
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked()
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, body
+
+    async def _read_chunked(self):
+        body = b''
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if not size:
+                await self.reader.readline()
+                return body
+            body += await self.reader.readexactly(size)
+            await self.reader.readline()
+
+
+class LoadResult(object):
+    """
+    Latencies and errors of the requests sent, by endpoint.
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.elapsed = 0.0
+
+    def record(self, name, seconds, ok):
+        self.latencies.setdefault(name, []).append(seconds)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self):
+        """
+        Return throughput and latency percentiles (in milliseconds), by endpoint and in total.
+        """
+        out = {}
+        every = []
+        for name, latencies in sorted(self.latencies.items()):
+            every.extend(latencies)
+            out[name] = self._summary(latencies, self.errors.get(name, 0))
+        out['total'] = self._summary(every, sum(self.errors.values()))
+        return out
+
+    def _summary(self, latencies, errors):
+        latencies = sorted(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / self.elapsed if self.elapsed else 0.0,
+            **{f'p{percent}': percentile(latencies, percent) * 1000 if latencies else None
+               for percent in (50, 90, 99)},
+            'max': latencies[-1] * 1000 if latencies else None,
+        }
+
+
+def basic_auth(user, password):
+    """
+    Return the headers authenticating requests as user, with basic authentication.
+    """
+    return {'Authorization': 'Basic ' + base64.b64encode(f"{user}:{password}".encode()).decode()}
+
+
+async def run_load(host, port, requests, concurrency, duration=None, total=None, headers=None):
+    """
+    Send requests to a server from `concurrency` concurrent clients, until duration or total is reached.
+
+    Args:
+        host (str): Host of the server.
+        port (int): Port of the server.
+        requests (RequestMix): The requests to send.
+        concurrency (int): Number of clients, each sending its next request once it has the previous response.
+        duration (float, optional): Seconds to run. Defaults to None.
+        total (int, optional): Number of requests to send. Defaults to None. At least one limit is needed.
+        headers (dict, optional): Headers of every request, e.g. basic_auth(). Defaults to None.
+
+    Returns:
+        LoadResult: The latency of every request, and the errors (non-2xx responses and connection failures).
+    """
+    if duration is None and total is None:
+        raise ValueError("Give a duration or a number of requests")
+    result = LoadResult()
+    start = time.perf_counter()
+    end = None if duration is None else start + duration
+    sent = 0
+
+    async def client():
+        nonlocal sent
+        connection = HttpConnection(host, port, headers)
+        try:
+            while (total is None or sent < total) and (end is None or time.perf_counter() < end):
+                sent += 1
+                name, path = requests.next()
+                began = time.perf_counter()
+                try:
+                    status, _ = await connection.get(path)
+                    ok = 200 <= status < 300
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    connection.close()
+                    ok = False
+                result.record(name, time.perf_counter() - began, ok)
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,38 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(valuation_date, exchanged_currency_id):
+    """
+    Build the opaque cursor pointing right after a (valuation_date, exchanged_currency) position.
+
+    Args:
+        valuation_date (date): Valuation date of the last rate of the page.
+        exchanged_currency_id (int): Id of the exchanged currency of the last rate of the page.
+
+    Returns:
+        str: A URL-safe token.
+    """
+    position = f"{valuation_date.strftime('%Y-%m-%d')}:{exchanged_currency_id}"
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Read back the position stored in a cursor built by encode_cursor.
+
+    Args:
+        cursor (str): The token received from the client.
+
+    Returns:
+        tuple: The valuation date (date) and the exchanged currency id (int).
+
+    Raises:
+        ValueError: If the cursor is not a valid token.
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        valuation_date, exchanged_currency_id = position.split(':')
+        return datetime.strptime(valuation_date, "%Y-%m-%d").date(), int(exchanged_currency_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
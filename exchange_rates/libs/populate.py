@@ -1,9 +1,14 @@
 import sys
-import threading
 from datetime import datetime, timedelta
 
+from django.db.models import OuterRef, Subquery
+
 from currencies.models import Currency
-from exchange_rates.models import CurrencyExchangeRate
+from currencies.registry import currency_registry
+from exchange_rates.libs import jobs
+from exchange_rates.models import CurrencyExchangeRate, FetchJob
+from exchange_rates.libs.writer import rate_writer
+from my_currency.routers import pin_primary
 from providers.adapters.create_provider import CreateProvider
 
 
@@ -16,34 +21,77 @@ def populate(code_source_currency, start_date, end_date=None):
         start_date (str): The start date for fetching exchange rates in 'YYYY-MM-DD' format.
         end_date (str, optional): The end date for fetching exchange rates in 'YYYY-MM-DD' format.
                                   Defaults to None, in which case today's date is used.
+
+    The rates are stored through the single rate writer, which skips those already in the database.
+    The caller's following reads are pinned to the primary database, which has the new rates.
     """
+    source_currency = currency_registry.get(code_source_currency)
     provider = CreateProvider().create()
     if end_date is None:
         end_date = datetime.today().strftime('%Y-%m-%d')
     result = provider.get_timeseries_rates(code_source_currency, start_date,
                                            end_date)
 
+    rates = []
     for day in result:
         for money in result.get(day):
-            if not CurrencyExchangeRate.objects.filter(source_currency=Currency.objects.get(code=code_source_currency),
-                                                       valuation_date=datetime.strptime(day, "%Y-%m-%d").date(),
-                                                       exchanged_currency=Currency.objects.get(code=money)):
-                CurrencyExchangeRate.objects.create(source_currency=Currency.objects.get(code=code_source_currency),
-                                                    valuation_date=datetime.strptime(day, "%Y-%m-%d").date(),
-                                                    exchanged_currency=Currency.objects.get(code=money),
-                                                    rate_value=result.get(day).get(money))
+            rates.append(CurrencyExchangeRate(source_currency=source_currency,
+                                              valuation_date=datetime.strptime(day, "%Y-%m-%d").date(),
+                                              exchanged_currency=currency_registry.get(money),
+                                              rate_value=result.get(day).get(money)))
+    rate_writer.write(rates)
+    pin_primary()
 
 
 def async_populate_all():
     """
-    Asynchronously update exchange rates for all currencies in the database.
+    Queue a refresh of the exchange rates of every currency in the database that is not up to date.
+
+    Each refresh is a durable job (exchange_rates.libs.jobs) run by a worker, which retries it
+    after a failure. A currency has at most one pending or running refresh, so the requests
+    served with stale rates while a refresh is queued only read the queue.
+    """
+    if 'test' not in sys.argv:
+        jobs.enqueue_refreshes(stale_currencies())
+        jobs.wake_worker()
+
+
+def stale_currencies():
+    """
+    Find the currencies without today's exchange rates.
+
+    Runs on every request that reads rates: the last date of each currency is one seek of the
+    (source_currency, valuation_date, ...) index, as a correlated subquery of a single query over
+    the currencies, so its cost does not grow with the rate table.
+
+    Returns:
+        dict: The last stored valuation date by currency, or a year ago for a currency without rates.
+    """
+    today = datetime.now().date()
+    last = CurrencyExchangeRate.objects.filter(source_currency_id=OuterRef('pk')).order_by(
+        '-valuation_date').values('valuation_date')[:1]
+    latest = dict(Currency.objects.order_by().annotate(last=Subquery(last)).values_list('pk', 'last'))
+    start_dates = {}
+    for item in currency_registry.codes():
+        currency = currency_registry.get(item)
+        date = latest.get(currency.pk) or today - timedelta(days=365)
+        if date != today:
+            start_dates[currency] = date
+    return start_dates
+
+
+def async_backfill(codes):
+    """
+    Queue the fetch of the last year of exchange rates of newly added currencies.
+
+    One backfill job is queued per currency and the worker runs them one after the other, so
+    importing many currencies at once does not start one refresh sweep per currency.
+
+    Args:
+        codes (list): Currency codes of the new currencies.
     """
     if 'test' not in sys.argv:
-        for item in Currency.objects.values_list('code', flat=True):
-            date = CurrencyExchangeRate.objects.filter(source_currency=Currency.objects.get(code=item)).values_list(
-                'valuation_date', flat=True).order_by('-valuation_date').first()
-            if not date:
-                date = datetime.now() - timedelta(days=365)
-            if date.strftime("%Y-%m-%d") != datetime.now().strftime("%Y-%m-%d"):
-                thread = threading.Thread(target=populate, args=(item, date.strftime("%Y-%m-%d")))
-                thread.start()
+        start_date = (datetime.now() - timedelta(days=365)).date()
+        for code in codes:
+            jobs.enqueue(currency_registry.get(code), start_date, kind=FetchJob.BACKFILL)
+        jobs.wake_worker()
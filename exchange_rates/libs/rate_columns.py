@@ -0,0 +1,153 @@
+import csv
+import json
+import math
+from array import array
+
+
+class _Echo(object):
+    """File-like object whose write() returns the line instead of storing it, for streaming csv."""
+
+    def write(self, value):
+        return value
+
+
+class RateColumns(object):
+    """
+    Exchange rates of a date range in columnar form.
+
+    Holds a sorted list of dates, the tuple of exchanged currency codes and a flat float64 array
+    of len(dates) x len(codes) rates, row by date, NaN where a rate is missing. Building it costs
+    one array slot per rate instead of a dict entry, and each date is formatted once when the
+    result is converted: to the legacy nested dict (to_dict) or streamed as JSON or CSV.
+    """
+
+    def __init__(self, dates, codes, rates, filled=()):
+        """
+        Args:
+            dates (list): Sorted valuation dates (date objects).
+            codes (tuple): Exchanged currency codes, one per column.
+            rates (array): len(dates) * len(codes) rates, row by date.
+            filled (iterable, optional): Dates whose rates were carried forward (see forward_fill).
+        """
+        self.dates = dates
+        self.codes = tuple(codes)
+        self.rates = rates
+        self.filled = set(filled)
+
+    @classmethod
+    def from_rows(cls, rows, codes_by_id):
+        """
+        Build the columns from (valuation_date, exchanged_currency_id, rate_value) rows sorted by date.
+
+        Args:
+            rows (iterable): The rows, e.g. a values_list() iterator.
+            codes_by_id (dict): Currency code of each exchanged currency id, in column order.
+
+        Returns:
+            RateColumns: The rates of the rows.
+        """
+        index = {currency_id: column for column, currency_id in enumerate(codes_by_id)}
+        width = len(index)
+        empty = array('d', [math.nan]) * width
+        dates = []
+        rates = array('d')
+        for valuation_date, exchanged_currency_id, rate_value in rows:
+            if not dates or dates[-1] != valuation_date:
+                dates.append(valuation_date)
+                rates.extend(empty)
+            rates[(len(dates) - 1) * width + index[exchanged_currency_id]] = float(rate_value)
+        return cls(dates, codes_by_id.values(), rates)
+
+    @classmethod
+    def from_mapping(cls, mapping, codes_by_id):
+        """
+        Build the columns from a {date: {exchanged_currency_id: rate}} dictionary.
+        """
+        return cls.from_rows(((day, currency_id, rate) for day in sorted(mapping)
+                              for currency_id, rate in mapping[day].items()), codes_by_id)
+
+    def forward_fill(self, dates, is_published):
+        """
+        Return the columns of every date of dates, carrying rates forward over non-publication days.
+
+        A date on which no rates are published gets the rates of the last publication day before
+        it, which may precede dates, even if some rates are stored for it. Publication days are never
+        filled: a rate missing on one of them stays missing.
+
+        Args:
+            dates (iterable): The sorted dates of the result.
+            is_published (callable): Whether rates are published on a given date.
+
+        Returns:
+            RateColumns: The rates of every date, whose filled attribute holds the carried forward dates.
+        """
+        if not dates:
+            return RateColumns([], self.codes, array('d'))
+        width = len(self.codes)
+        stored = {day: self.rates[row * width:(row + 1) * width] for row, day in enumerate(self.dates)}
+        out_dates, rates, filled = [], array('d'), []
+        last = None
+        for day in self.dates:
+            if day >= dates[0]:
+                break
+            if is_published(day):
+                last = stored[day]
+        for day in dates:
+            if is_published(day):
+                row = stored.get(day)
+                last = last if row is None else row
+            else:
+                row = last
+                if row is not None:
+                    filled.append(day)
+            if row is not None:
+                out_dates.append(day)
+                rates.extend(row)
+        return RateColumns(out_dates, self.codes, rates, filled)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _rows(self):
+        """
+        Yield (date string, {code: rate}) for every date, skipping missing rates.
+        """
+        width = len(self.codes)
+        for row, day in enumerate(self.dates):
+            values = self.rates[row * width:(row + 1) * width]
+            yield day.strftime("%Y-%m-%d"), {code: rate for code, rate in zip(self.codes, values)
+                                             if not math.isnan(rate)}
+
+    def to_dict(self):
+        """
+        Return the rates in the legacy shape: {'YYYY-MM-DD': {code: rate}}.
+        """
+        return dict(self._rows())
+
+    def iter_json(self):
+        """
+        Stream the JSON of to_dict() one date at a time, formatted like the REST framework renderer.
+
+        Yields:
+            str: Consecutive chunks of the JSON document.
+        """
+        yield '{'
+        separator = ''
+        for day, rates in self._rows():
+            yield f'{separator}"{day}":{json.dumps(rates, separators=(",", ":"))}'
+            separator = ','
+        yield '}'
+
+    def iter_csv(self):
+        """
+        Stream the rates as CSV: a 'date' column followed by one column per currency code.
+
+        Yields:
+            str: The header line, then one line per date; missing rates are empty cells.
+        """
+        writer = csv.writer(_Echo())
+        yield writer.writerow(('date',) + self.codes)
+        width = len(self.codes)
+        for row, day in enumerate(self.dates):
+            values = self.rates[row * width:(row + 1) * width]
+            yield writer.writerow([day.strftime("%Y-%m-%d")] + ['' if math.isnan(rate) else rate for rate in values])
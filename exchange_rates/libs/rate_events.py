@@ -0,0 +1,305 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+
+
+def currency_code(pk):
+    """
+    Return the code of the currency with the given primary key, from the currency registry when possible.
+    """
+    currency = currency_registry.get_by_id(pk)
+    if currency is None:
+        currency = Currency.objects.get(pk=pk)
+        currency_registry.put(currency)
+    return currency.code
+
+
+def rate_events(rates):
+    """
+    Group stored exchange rates into events, one per source currency and valuation date.
+
+    Args:
+        rates (iterable): CurrencyExchangeRate instances.
+
+    Returns:
+        list: Events as dictionaries: {'source': 'USD', 'date': 'YYYY-MM-DD', 'rates': {code: rate}}.
+    """
+    events = {}
+    for rate in rates:
+        source = currency_code(rate.source_currency_id)
+        day = rate.valuation_date.strftime("%Y-%m-%d")
+        event = events.setdefault((source, day), {'source': source, 'date': day, 'rates': {}})
+        event['rates'][currency_code(rate.exchanged_currency_id)] = float(rate.rate_value)
+    return list(events.values())
+
+
+class Subscription(object):
+    """
+    The rate events a client subscribed to, buffered until it reads them.
+
+    A subscription follows some source currencies, some currency pairs, or everything when
+    neither is given. At most RATE_EVENTS_BUFFER events are buffered: a client that does not
+    keep up loses the oldest ones rather than holding memory. Events are read by a thread (get)
+    or, once bound to an event loop, by a coroutine (aget).
+    """
+
+    def __init__(self, hub, sources=None, pairs=None):
+        self.hub = hub
+        self.sources = set(sources) if sources else None
+        self.pairs = set(pairs) if pairs else None
+        self.events = deque(maxlen=settings.RATE_EVENTS_BUFFER)
+        self.condition = threading.Condition()
+        self.loop = None
+        self.ready = None
+
+    @property
+    def source_keys(self):
+        """
+        Source currencies the hub indexes the subscription under, or None for every source.
+        """
+        if self.sources is None and self.pairs is None:
+            return None
+        return (self.sources or set()) | {source for source, _ in self.pairs or ()}
+
+    def _filter(self, event):
+        if self.pairs is None or (self.sources and event['source'] in self.sources):
+            return event
+        rates = {code: rate for code, rate in event['rates'].items() if (event['source'], code) in self.pairs}
+        return dict(event, rates=rates) if rates else None
+
+    def deliver(self, event):
+        event = self._filter(event)
+        if event is None:
+            return
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def _drain(self):
+        with self.condition:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def get(self, timeout):
+        """
+        Wait up to timeout seconds for events.
+
+        Returns:
+            list: The buffered events, possibly none.
+        """
+        with self.condition:
+            if not self.events:
+                self.condition.wait(timeout)
+        return self._drain()
+
+    def bind(self, loop):
+        self.ready = asyncio.Event()
+        self.loop = loop
+
+    async def aget(self, timeout):
+        """
+        Coroutine version of get(), for a subscription bound to the running event loop.
+        """
+        if not self.events:
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.ready.clear()
+        return self._drain()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class RateHub(object):
+    """
+    In-process fan-out of rate events to the subscriptions of this process.
+
+    Subscriptions are indexed by source currency, so an event only visits the subscriptions
+    that follow its source (plus those following everything), and delivering it costs a deque
+    append per subscriber: no subscriber queries the database. Events reach the hub of every
+    process through RATE_EVENTS_CHANNEL (see LocalChannel and DatabaseChannel).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.everything = set()
+        self.by_source = {}
+        self.listeners = []
+        self._channel = None
+
+    @property
+    def channel(self):
+        if self._channel is None:
+            with self.lock:
+                if self._channel is None:
+                    self._channel = import_string(settings.RATE_EVENTS_CHANNEL)(self)
+        return self._channel
+
+    def subscribe(self, sources=None, pairs=None):
+        """
+        Subscribe to the events of some source currencies and/or currency pairs.
+
+        Args:
+            sources (iterable, optional): Source currency codes. Defaults to None.
+            pairs (iterable, optional): (source, exchanged) currency code tuples. Defaults to None.
+                                        Without sources nor pairs, every event is received.
+
+        Returns:
+            Subscription: The subscription; close it when the client goes away.
+        """
+        subscription = Subscription(self, sources, pairs)
+        keys = subscription.source_keys
+        with self.lock:
+            if keys is None:
+                self.everything.add(subscription)
+            for key in keys or ():
+                self.by_source.setdefault(key, set()).add(subscription)
+        self.channel.listen()
+        return subscription
+
+    def add_listener(self, listener):
+        """
+        Call listener(event) for every event delivered to this process, to keep an in-memory copy up to date.
+
+        Listeners run in the thread delivering the events and must not block. They are kept by reset().
+        """
+        with self.lock:
+            if listener not in self.listeners:
+                self.listeners.append(listener)
+        self.channel.listen()
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.everything.discard(subscription)
+            for key in subscription.source_keys or ():
+                subscribers = self.by_source.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.by_source[key]
+
+    def deliver(self, events):
+        """
+        Hand events to the matching subscriptions of this process.
+        """
+        for event in events:
+            with self.lock:
+                listeners = list(self.listeners)
+                subscriptions = self.everything | self.by_source.get(event['source'], set())
+            for listener in listeners:
+                listener(event)
+            for subscription in subscriptions:
+                subscription.deliver(event)
+
+    def publish(self, rates):
+        """
+        Publish newly stored exchange rates to the subscribers of every process.
+
+        Args:
+            rates (iterable): CurrencyExchangeRate instances.
+        """
+        events = rate_events(rates)
+        if events:
+            self.channel.publish(events)
+
+    def reset(self):
+        with self.lock:
+            self.everything.clear()
+            self.by_source.clear()
+            channel, self._channel = self._channel, None
+        if channel is not None:
+            channel.close()
+
+
+class LocalChannel(object):
+    """
+    Deliver events to the subscribers of the publishing process only (a single web process).
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, events):
+        self.hub.deliver(events)
+
+    def listen(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class DatabaseChannel(object):
+    """
+    Carry events between processes through the RateEvent table.
+
+    Publishing inserts one row per batch of events. Each process with subscribers runs a single
+    thread that polls the rows added since its last poll every RATE_EVENTS_POLL seconds and hands
+    them to its hub, so the database sees one poll per process, whatever the number of clients.
+    Rows older than RATE_EVENTS_RETENTION seconds are deleted as new ones are published.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.lock = threading.Lock()
+        self.last_id = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def publish(self, events):
+        from exchange_rates.models import RateEvent
+
+        RateEvent.objects.create(events=events)
+        RateEvent.objects.filter(
+            created__lt=timezone.now() - timezone.timedelta(seconds=settings.RATE_EVENTS_RETENTION)).delete()
+
+    def poll(self):
+        """
+        Deliver the events published since the previous poll.
+        """
+        from exchange_rates.models import RateEvent
+        from my_currency.routers import pin_primary
+
+        # Replicas lag behind: read the events from the primary.
+        pin_primary()
+        if self.last_id is None:
+            self.last_id = RateEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            return
+        for pk, events in RateEvent.objects.filter(pk__gt=self.last_id).order_by('pk').values_list('pk', 'events'):
+            self.hub.deliver(events)
+            self.last_id = pk
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                self.poll()
+                time.sleep(settings.RATE_EVENTS_POLL)
+        finally:
+            connections.close_all()
+
+    def listen(self):
+        with self.lock:
+            if self.thread is None:
+                self.poll()
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def close(self):
+        self.stopped.set()
+
+
+rate_hub = RateHub()
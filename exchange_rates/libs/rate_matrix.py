@@ -0,0 +1,156 @@
+import threading
+import time
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Q
+
+from currencies.registry import currency_registry
+from exchange_rates.libs.rate_events import currency_code, rate_hub
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class RateMatrix(object):
+    """
+    The latest stored rate of every currency pair, kept in memory.
+
+    The matrix is loaded on first use with two queries (the latest valuation date of each pair, then
+    the rates of those dates) and then kept up to date by the rate events of
+    exchange_rates.libs.rate_events, which every write publishes: reading it does not query the
+    database. The events of LocalChannel only reach the process that stored the rates, so the
+    matrix is also loaded again once it is RATE_MATRIX_TTL seconds old, which bounds how long it
+    misses the rates stored by other processes. That reload groups the whole rate table: it runs
+    in a background thread while requests keep reading the current matrix.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rates = None
+        self.loaded = None
+        # Events received while a reload runs, merged into the reloaded matrix; None when idle.
+        self.reloading = None
+
+    def _load(self):
+        latest = (CurrencyExchangeRate.objects.order_by().values('source_currency_id', 'exchanged_currency_id')
+                  .annotate(latest=Max('valuation_date')))
+        pairs = {}
+        for row in latest:
+            pairs.setdefault((row['source_currency_id'], row['latest']), set()).add(row['exchanged_currency_id'])
+        rates = {}
+        if pairs:
+            query = reduce(or_, (Q(source_currency_id=source, valuation_date=day) for source, day in pairs))
+            rows = CurrencyExchangeRate.objects.filter(query).values_list(
+                'source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value')
+            for source, exchanged, day, value in rows:
+                if exchanged in pairs[(source, day)]:
+                    rates.setdefault(currency_code(source), {})[currency_code(exchanged)] = (
+                        day.strftime("%Y-%m-%d"), float(value))
+        return rates
+
+    def _expired(self):
+        ttl = settings.RATE_MATRIX_TTL
+        return ttl is not None and time.monotonic() - self.loaded >= ttl
+
+    def _table(self):
+        rates = self.rates
+        if rates is None:
+            # Listen first, so rates stored while loading are not missed.
+            rate_hub.add_listener(self.update)
+            with self.lock:
+                if self.rates is None:
+                    self.rates = self._load()
+                    self.loaded = time.monotonic()
+                rates = self.rates
+        elif self._expired():
+            self._start_reload()
+        return rates
+
+    def _start_reload(self):
+        with self.lock:
+            if self.reloading is not None:
+                return
+            self.reloading = []
+        threading.Thread(target=self._reload_in_background, daemon=True).start()
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        finally:
+            connections.close_all()
+
+    def reload(self):
+        """
+        Load the matrix again from the database, keeping the rate events received meanwhile.
+        """
+        with self.lock:
+            if self.reloading is None:
+                self.reloading = []
+        try:
+            rates = self._load()
+            with self.lock:
+                for event in self.reloading or ():
+                    self._merge(rates, event)
+                self.rates = rates
+                self.loaded = time.monotonic()
+        finally:
+            with self.lock:
+                self.reloading = None
+
+    def update(self, event):
+        """
+        Merge a rate event (see exchange_rates.libs.rate_events.rate_events) into the matrix.
+
+        Rates older than the ones in the matrix, e.g. from a backfill, are ignored.
+        """
+        with self.lock:
+            if self.rates is None:
+                return
+            self._merge(self.rates, event)
+            if self.reloading is not None:
+                self.reloading.append(event)
+
+    def _merge(self, rates, event):
+        row = rates.setdefault(event['source'], {})
+        for code, rate in event['rates'].items():
+            current = row.get(code)
+            if current is None or current[0] <= event['date']:
+                row[code] = (event['date'], rate)
+
+    def get(self, sources=None, targets=None):
+        """
+        Return the latest stored rates of the given source and target currencies.
+
+        Args:
+            sources (iterable, optional): Source currency codes. Defaults to None, every source with stored rates.
+            targets (iterable, optional): Target currency codes. Defaults to None, every target.
+
+        Returns:
+            dict: A dictionary keyed by source currency code, each holding:
+                - 'date': The most recent valuation date of its rates, in 'YYYY-MM-DD' format.
+                - 'rates': A dictionary mapping target currency codes to their latest rate (as floats).
+                Sources without stored rates are left out.
+        """
+        table = self._table()
+        targets = set(targets) if targets else None
+        out = {}
+        with self.lock:
+            for source in sources or sorted(table):
+                row = table.get(source)
+                if not row or not currency_registry.exists(source):
+                    continue
+                rates = {code: value for code, value in sorted(row.items())
+                         if (targets is None or code in targets) and currency_registry.exists(code)}
+                if rates:
+                    out[source] = {'date': max(day for day, _ in rates.values()),
+                                   'rates': {code: rate for code, (_, rate) in rates.items()}}
+        return out
+
+    def clear(self):
+        with self.lock:
+            self.rates = None
+            self.reloading = None
+
+
+rate_matrix = RateMatrix()
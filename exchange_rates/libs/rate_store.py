@@ -0,0 +1,217 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: the rate writers of several processes are not serialized.
+    fcntl = None
+
+MAGIC = b'RATESF64'
+# magic, epoch (date ordinal of row 0), column capacity, columns used; then the column currency ids.
+HEADER = struct.Struct('<8sqii')
+HEADER_SIZE = 4096
+MAX_COLUMNS = (HEADER_SIZE - HEADER.size) // 8
+NAN = struct.pack('<d', math.nan)
+# NAN as an int64, to find missing rates without converting the values to Python floats.
+NAN_BITS = struct.unpack('<q', NAN)[0]
+QUANTUM = Decimal('0.000001')
+
+
+class RateStore(object):
+    """
+    Memory-mapped history of exchange rates, one binary file per source currency.
+
+    Each file is a fixed-layout date x currency matrix of float64: a 4 KiB header holds the date
+    of the first row and the exchanged currency id of every column, and row n holds the rates of
+    epoch + n days, NaN where a rate is missing. A date range is therefore a contiguous slice of
+    the file, read through mmap without parsing or any database query.
+
+    Files grow as rates are appended by the rate writer; when a date before the first row or
+    more columns than reserved are needed the file is rewritten with the new layout and
+    atomically replaced, so readers always see a consistent file. Writers of every process are
+    serialized by a lock file next to each data file. The database remains the source of
+    truth: `manage.py build_rate_store` rebuilds every file from it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def path(self, source_id):
+        return Path(self.directory or settings.RATE_STORE_DIR) / f"{source_id}.f64"
+
+    def append(self, rates):
+        """
+        Store exchange rates in the files of their source currencies.
+
+        Args:
+            rates (iterable): CurrencyExchangeRate instances.
+        """
+        by_source = {}
+        for rate in rates:
+            value = float(Decimal(str(rate.rate_value)).quantize(QUANTUM))
+            by_source.setdefault(rate.source_currency_id, []).append(
+                (rate.valuation_date, rate.exchanged_currency_id, value))
+        with self.lock:
+            for source_id, values in by_source.items():
+                with self._locked(source_id):
+                    self._write(source_id, values)
+
+    def read(self, source_id, start_date, end_date, exchanged_ids):
+        """
+        Read the rates of a source currency against some currencies over a date range.
+
+        Args:
+            source_id (int): Id of the source currency.
+            start_date (date): First date of the range.
+            end_date (date): Last date of the range (inclusive).
+            exchanged_ids (list): Ids of the exchanged currencies.
+
+        Returns:
+            array: The rates as float64, row by date and one column per exchanged id in the order
+                   given (see exchange_rates.libs.rate_columns.RateColumns), or None if any of the
+                   requested rates is not in the store. The columns are copied out of the file
+                   slice in bulk, without building a Python object per rate.
+        """
+        try:
+            file = open(self.path(source_id), 'rb')
+        except FileNotFoundError:
+            return None
+        with file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            epoch, capacity, columns = self._header(mm)
+            try:
+                indexes = [columns.index(exchanged_id) for exchanged_id in exchanged_ids]
+            except ValueError:
+                return None
+            first = start_date.toordinal() - epoch
+            last = end_date.toordinal() - epoch
+            if first < 0 or HEADER_SIZE + (last + 1) * capacity * 8 > len(mm):
+                return None
+            stored = array('d')
+            stored.frombytes(mm[HEADER_SIZE + first * capacity * 8:HEADER_SIZE + (last + 1) * capacity * 8])
+        width = len(indexes)
+        if indexes == list(range(capacity)):
+            rates = stored
+        else:
+            rates = array('d', bytes(8 * width * (last - first + 1)))
+            for column, index in enumerate(indexes):
+                rates[column::width] = stored[index::capacity]
+        if NAN_BITS in array('q', rates.tobytes()):
+            return None
+        return rates
+
+    def clear(self):
+        directory = Path(self.directory or settings.RATE_STORE_DIR)
+        with self.lock:
+            for path in directory.glob('*.f64'):
+                with self._locked(path.stem):
+                    path.unlink(missing_ok=True)
+
+    @contextmanager
+    def _locked(self, source_id):
+        """
+        Serialize the writers of a file across processes. The lock is taken on a separate file,
+        as rewrites replace the data file.
+        """
+        path = self.path(source_id).with_suffix('.lock')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _header(self, mm):
+        magic, epoch, capacity, used = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a rate store file")
+        return epoch, capacity, list(struct.unpack_from(f'<{used}q', mm, HEADER.size))
+
+    def _write(self, source_id, values):
+        path = self.path(source_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        first = min(day for day, _, _ in values).toordinal()
+        ids = {exchanged_id for _, exchanged_id, _ in values}
+        if path.exists():
+            with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                epoch, capacity, columns = self._header(mm)
+            new_columns = columns + sorted(ids - set(columns))
+            if first < epoch or len(new_columns) > capacity:
+                self._rewrite(path, min(first, epoch), new_columns)
+        else:
+            self._rewrite(path, first, sorted(ids))
+
+        with open(path, 'r+b') as file:
+            with mmap.mmap(file.fileno(), 0) as mm:
+                epoch, capacity, columns = self._header(mm)
+                missing = sorted(ids - set(columns))
+                columns += missing
+                # Column ids first, then their count, so readers never see an id that is not written yet.
+                struct.pack_into(f'<{len(columns)}q', mm, HEADER.size, *columns)
+                HEADER.pack_into(mm, 0, MAGIC, epoch, capacity, len(columns))
+                size = len(mm)
+            rows = (size - HEADER_SIZE) // (capacity * 8)
+            last = max(day for day, _, _ in values).toordinal() - epoch
+            if last >= rows:
+                file.seek(size)
+                file.write(NAN * (capacity * (last + 1 - rows)))
+                file.flush()
+            with mmap.mmap(file.fileno(), 0) as mm:
+                for day, exchanged_id, value in values:
+                    offset = HEADER_SIZE + ((day.toordinal() - epoch) * capacity + columns.index(exchanged_id)) * 8
+                    struct.pack_into('<d', mm, offset, value)
+                mm.flush()
+
+    def _rewrite(self, path, epoch, columns):
+        """
+        Write a copy of the file with a new first date and room for more columns, then swap it in.
+        """
+        capacity = min(max(len(columns) * 2, settings.RATE_STORE_COLUMNS), MAX_COLUMNS)
+        if len(columns) > capacity:
+            raise ValueError(f"A rate store file holds at most {MAX_COLUMNS} currencies")
+        old = self._load(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w+b') as file:
+                header = bytearray(HEADER_SIZE)
+                HEADER.pack_into(header, 0, MAGIC, epoch, capacity, len(columns))
+                struct.pack_into(f'<{len(columns)}q', header, HEADER.size, *columns)
+                file.write(header)
+                if old is not None:
+                    old_epoch, old_columns, rows = old
+                    file.write(NAN * (capacity * (old_epoch - epoch)))
+                    for row in rows:
+                        values = [math.nan] * capacity
+                        for index, exchanged_id in enumerate(old_columns):
+                            values[columns.index(exchanged_id)] = row[index]
+                        file.write(struct.pack(f'<{capacity}d', *values))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _load(self, path):
+        """
+        Return (epoch, columns, rows) of an existing file, or None if there is none.
+        """
+        if not path.exists():
+            return None
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            epoch, capacity, columns = self._header(mm)
+            count = (len(mm) - HEADER_SIZE) // (capacity * 8)
+            rows = [struct.unpack_from(f'<{len(columns)}d', mm, HEADER_SIZE + row * capacity * 8)
+                    for row in range(count)]
+        return epoch, columns, rows
+
+
+rate_store = RateStore()
@@ -0,0 +1,215 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from currencies.registry import currency_registry
+from exchange_rates.models import CurrencyExchangeRate, CurrencyExchangeRateRollup
+
+GRANULARITIES = (CurrencyExchangeRateRollup.WEEK, CurrencyExchangeRateRollup.MONTH, CurrencyExchangeRateRollup.YEAR)
+AGGREGATE_FIELDS = ['open_date', 'open_value', 'close_date', 'close_value', 'high_value', 'low_value',
+                    'total_value', 'days']
+QUANTUM = Decimal('0.000001')
+
+
+def period_start(day, granularity):
+    """
+    Return the first day of the week (Monday), month or year that contains a date.
+
+    Args:
+        day (date): Any date of the period.
+        granularity (str): 'week', 'month' or 'year'.
+
+    Returns:
+        date: The first day of the period.
+
+    Raises:
+        ValueError: If the granularity is not one of GRANULARITIES.
+    """
+    if granularity == CurrencyExchangeRateRollup.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == CurrencyExchangeRateRollup.MONTH:
+        return day.replace(day=1)
+    if granularity == CurrencyExchangeRateRollup.YEAR:
+        return date(day.year, 1, 1)
+    raise ValueError(f"Invalid granularity, expected one of {', '.join(GRANULARITIES)}")
+
+
+def period_end(start, granularity):
+    """
+    Return the last day of the week, month or year that starts on a date (see period_start).
+    """
+    if granularity == CurrencyExchangeRateRollup.WEEK:
+        return start + timedelta(days=6)
+    if granularity == CurrencyExchangeRateRollup.MONTH:
+        return (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return date(start.year, 12, 31)
+
+
+def _combine(rollup, other):
+    """
+    Merge the aggregates of `other` into `rollup`; both cover the same pair and period.
+    """
+    if other.open_date < rollup.open_date:
+        rollup.open_date, rollup.open_value = other.open_date, other.open_value
+    if other.close_date > rollup.close_date:
+        rollup.close_date, rollup.close_value = other.close_date, other.close_value
+    rollup.high_value = max(rollup.high_value, other.high_value)
+    rollup.low_value = min(rollup.low_value, other.low_value)
+    rollup.total_value += other.total_value
+    rollup.days += other.days
+
+
+def _aggregate(rows, model=CurrencyExchangeRateRollup, granularities=GRANULARITIES):
+    """
+    Aggregate daily rates into one unsaved rollup per pair, granularity and period.
+
+    Args:
+        rows (iterable): (source_currency_id, exchanged_currency_id, valuation_date, rate_value) tuples.
+        model (Model, optional): The rollup model, the historical one in migrations.
+                                 Defaults to CurrencyExchangeRateRollup.
+        granularities (tuple, optional): The granularities to aggregate. Defaults to all of them.
+
+    Returns:
+        dict: Unsaved CurrencyExchangeRateRollup instances keyed by
+              (source_currency_id, granularity, period_start, exchanged_currency_id).
+    """
+    rollups = {}
+    for source, exchanged, valuation_date, rate_value in rows:
+        value = Decimal(str(rate_value)).quantize(QUANTUM)
+        for granularity in granularities:
+            start = period_start(valuation_date, granularity)
+            day = model(
+                source_currency_id=source, exchanged_currency_id=exchanged, granularity=granularity,
+                period_start=start, open_date=valuation_date, open_value=value, close_date=valuation_date,
+                close_value=value, high_value=value, low_value=value, total_value=value, days=1)
+            key = (source, granularity, start, exchanged)
+            if key in rollups:
+                _combine(rollups[key], day)
+            else:
+                rollups[key] = day
+    return rollups
+
+
+def merge_rollups(rates):
+    """
+    Add newly inserted daily rates to the week, month and year rollups of their pairs.
+
+    Must run in the transaction that inserts the rates, and only with rates that were not stored
+    before, otherwise they would be counted twice. The rollups touched are read with one range
+    query per source currency and granularity, then updated or created in bulk.
+
+    Args:
+        rates (list): CurrencyExchangeRate instances just inserted.
+    """
+    new = _aggregate((rate.source_currency_id, rate.exchanged_currency_id, rate.valuation_date, rate.rate_value)
+                     for rate in rates)
+    if not new:
+        return
+    periods = {}
+    for source, granularity, start, exchanged in new:
+        periods.setdefault((source, granularity), []).append(start)
+    updated = []
+    for (source, granularity), starts in periods.items():
+        stored = CurrencyExchangeRateRollup.objects.filter(
+            source_currency_id=source, granularity=granularity, period_start__range=(min(starts), max(starts)))
+        for rollup in stored:
+            key = (source, granularity, rollup.period_start, rollup.exchanged_currency_id)
+            if key in new:
+                _combine(rollup, new.pop(key))
+                updated.append(rollup)
+    CurrencyExchangeRateRollup.objects.bulk_update(updated, AGGREGATE_FIELDS, batch_size=500)
+    CurrencyExchangeRateRollup.objects.bulk_create(list(new.values()), batch_size=500)
+
+
+def rebuild_rollups(source_currency=None):
+    """
+    Recompute the rollups from the stored daily rates.
+
+    Existing rates are rolled up by migration 0006; needed after rates are written without
+    going through the rate writer or the model (fixtures, queryset updates, raw SQL).
+
+    Args:
+        source_currency (Currency, optional): Only rebuild the rollups of this source currency.
+                                              Defaults to None, every source currency.
+
+    Returns:
+        int: The number of rollups created.
+    """
+    rates = CurrencyExchangeRate.objects.all()
+    rollups = CurrencyExchangeRateRollup.objects.all()
+    if source_currency is not None:
+        rates = rates.filter(source_currency=source_currency)
+        rollups = rollups.filter(source_currency=source_currency)
+    rollups.delete()
+    new = _aggregate(rates.order_by().values_list(
+        'source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value').iterator(chunk_size=5000))
+    CurrencyExchangeRateRollup.objects.bulk_create(list(new.values()), batch_size=500)
+    return len(new)
+
+
+def refresh_rollups(source_currency_id, exchanged_currency_id, day):
+    """
+    Recompute the week, month and year rollups of a pair that contain a date from its daily rates.
+
+    merge_rollups() only adds new rates; a rate edited or deleted one by one (admin) changes
+    the aggregates of its periods, which are recomputed here with one range query each.
+
+    Args:
+        source_currency_id (int): Id of the source currency.
+        exchanged_currency_id (int): Id of the exchanged currency.
+        day (date): The valuation date of the rate that changed.
+    """
+    pair = {'source_currency_id': source_currency_id, 'exchanged_currency_id': exchanged_currency_id}
+    with transaction.atomic():
+        for granularity in GRANULARITIES:
+            start = period_start(day, granularity)
+            rows = CurrencyExchangeRate.objects.filter(
+                valuation_date__range=(start, period_end(start, granularity)), **pair
+            ).order_by().values_list('source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value')
+            CurrencyExchangeRateRollup.objects.filter(granularity=granularity, period_start=start, **pair).delete()
+            CurrencyExchangeRateRollup.objects.bulk_create(list(_aggregate(rows, granularities=(granularity,))
+                                                                .values()))
+
+
+def get_rollups(source_currency, granularity, start_date, end_date):
+    """
+    Retrieve the rollups of a source currency for the periods overlapping a date range.
+
+    Args:
+        source_currency (str): The currency code of the source currency ('USD').
+        granularity (str): 'week', 'month' or 'year'.
+        start_date (str): The start date in 'YYYY-MM-DD' format.
+        end_date (str): The end date in 'YYYY-MM-DD' format.
+
+    Returns:
+        dict: A dictionary where keys are the first day of each period in 'YYYY-MM-DD' format and
+              values map exchanged currency codes to their 'open', 'high', 'low', 'close' and
+              'average' rates (floats) and the number of daily rates aggregated ('days').
+
+    Raises:
+        Currency.DoesNotExist: If the source_currency code does not exist.
+        ValueError: If a date is not in 'YYYY-MM-DD' format or the granularity is invalid.
+    """
+    source = currency_registry.get(source_currency)
+    try:
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError("Invalid date format, expected YYYY-MM-DD")
+    rollups = CurrencyExchangeRateRollup.objects.filter(
+        source_currency=source, granularity=granularity,
+        period_start__range=(period_start(start_date, granularity), end_date)
+    ).order_by('period_start', 'exchanged_currency_id')
+    out = {}
+    for rollup in rollups.iterator():
+        code = currency_registry.get_by_id(rollup.exchanged_currency_id).code
+        out.setdefault(rollup.period_start.strftime("%Y-%m-%d"), {})[code] = {
+            "open": float(rollup.open_value),
+            "high": float(rollup.high_value),
+            "low": float(rollup.low_value),
+            "close": float(rollup.close_value),
+            "average": float(rollup.average_value),
+            "days": rollup.days,
+        }
+    return out
@@ -0,0 +1,231 @@
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from multiprocessing import resource_tracker, shared_memory
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: the rate writers of several processes are not serialized.
+    fcntl = None
+
+MAGIC = b'RATESHM1'
+# magic, sequence counter, number of days, number of currency slots, slots used.
+HEADER = struct.Struct('<8sQiii')
+HEADER_SIZE = 64
+QUANTUM = Decimal('0.000001')
+# Reads retried while a write is in progress, with a growing pause, before falling back to the database.
+READ_RETRIES = 20
+READ_BACKOFF = 0.0001
+
+
+class SharedRates(object):
+    """
+    Recent exchange rates of every pair in a shared memory segment, read by all the worker processes.
+
+    The segment holds a ring of RATE_SHM_DAYS days; each day is a RATE_SHM_CURRENCIES x
+    RATE_SHM_CURRENCIES float64 matrix (source slot x exchanged slot, NaN where a rate is missing)
+    and its slot in the ring is its date ordinal modulo the number of days. The currency id of each
+    slot and the date of each day are stored in the header, so every process maps ids and dates to
+    offsets the same way.
+
+    Writers (the rate writer of each process, on commit) are serialized with a file lock and
+    publish through a sequence lock: the counter is odd while a write is in progress. Readers
+    take no lock; they copy the values and retry if the counter was odd or changed meanwhile,
+    READ_RETRIES times at most, so a writer killed in the middle of a write makes them fall back
+    to the database instead of spinning.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.shm = None
+        self.lock = threading.Lock()
+
+    def _segment(self):
+        """
+        Attach to the segment, creating and seeding it from the database if it does not exist.
+        """
+        if self.shm is not None:
+            return self.shm
+        created = False
+        with self.lock:
+            if self.shm is None:
+                name = self.name or settings.RATE_SHM_NAME
+                days, slots = settings.RATE_SHM_DAYS, settings.RATE_SHM_CURRENCIES
+                size = HEADER_SIZE + slots * 8 + days * 8 + days * slots * slots * 8
+                try:
+                    shm = shared_memory.SharedMemory(name=name)
+                except FileNotFoundError:
+                    try:
+                        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                        created = True
+                    except FileExistsError:
+                        shm = shared_memory.SharedMemory(name=name)
+                # The segment outlives this process: other workers keep using it after it exits.
+                resource_tracker.unregister(shm._name, 'shared_memory')
+                if created:
+                    shm.buf[HEADER_SIZE:size] = struct.pack('<d', math.nan) * ((size - HEADER_SIZE) // 8)
+                    struct.pack_into(f'<{days}q', shm.buf, HEADER_SIZE + slots * 8, *([0] * days))
+                    HEADER.pack_into(shm.buf, 0, MAGIC, 0, days, slots, 0)
+                self.shm = shm
+        if created:
+            self._seed()
+        return self.shm
+
+    def _layout(self, buf):
+        magic, sequence, days, slots, used = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a shared rates segment")
+        return sequence, days, slots, used
+
+    def _offsets(self, days, slots):
+        ids_offset = HEADER_SIZE
+        days_offset = ids_offset + slots * 8
+        return ids_offset, days_offset, days_offset + days * 8
+
+    @contextmanager
+    def _writing(self, buf):
+        """
+        Serialize writers across processes and publish their changes through the sequence counter.
+        """
+        with self.lock, open(os.path.join(tempfile.gettempdir(), f"{self.name or settings.RATE_SHM_NAME}.lock"),
+                             'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            sequence = struct.unpack_from('<Q', buf, 8)[0]
+            # Odd while no other writer holds the lock: the last one died during its write.
+            sequence += sequence % 2
+            struct.pack_into('<Q', buf, 8, sequence + 1)
+            try:
+                yield
+            finally:
+                struct.pack_into('<Q', buf, 8, sequence + 2)
+
+    def put(self, rates):
+        """
+        Publish exchange rates to every process. Rates older than the days held are ignored.
+
+        Args:
+            rates (iterable): CurrencyExchangeRate instances.
+        """
+        rates = list(rates)
+        if not rates:
+            return
+        buf = self._segment().buf
+        with self._writing(buf):
+            _, days, slots, used = self._layout(buf)
+            ids_offset, days_offset, data_offset = self._offsets(days, slots)
+            ids = list(struct.unpack_from(f'<{used}q', buf, ids_offset))
+            row_days = list(struct.unpack_from(f'<{days}q', buf, days_offset))
+            newest = max(max(row_days), max(rate.valuation_date.toordinal() for rate in rates))
+            for rate in rates:
+                ordinal = rate.valuation_date.toordinal()
+                if ordinal <= newest - days:
+                    continue
+                slot_ids = []
+                for currency_id in (rate.source_currency_id, rate.exchanged_currency_id):
+                    if currency_id not in ids:
+                        if len(ids) == slots:
+                            break
+                        ids.append(currency_id)
+                        struct.pack_into('<q', buf, ids_offset + (len(ids) - 1) * 8, currency_id)
+                    slot_ids.append(ids.index(currency_id))
+                if len(slot_ids) < 2:
+                    continue
+                row = ordinal % days
+                row_offset = data_offset + row * slots * slots * 8
+                if row_days[row] != ordinal:
+                    buf[row_offset:row_offset + slots * slots * 8] = struct.pack('<d', math.nan) * (slots * slots)
+                    row_days[row] = ordinal
+                    struct.pack_into('<q', buf, days_offset + row * 8, ordinal)
+                value = float(Decimal(str(rate.rate_value)).quantize(QUANTUM))
+                struct.pack_into('<d', buf, row_offset + (slot_ids[0] * slots + slot_ids[1]) * 8, value)
+            HEADER.pack_into(buf, 0, MAGIC, struct.unpack_from('<Q', buf, 8)[0], days, slots, len(ids))
+
+    def get_range(self, source_id, start_date, end_date, exchanged_ids):
+        """
+        Read the rates of a source currency against some currencies over a date range.
+
+        Args:
+            source_id (int): Id of the source currency.
+            start_date (date): First date of the range.
+            end_date (date): Last date of the range (inclusive).
+            exchanged_ids (list): Ids of the exchanged currencies.
+
+        Returns:
+            dict: {date: {exchanged_id: rate}} for every date of the range, or None if any of
+                  the requested rates is not in shared memory, or if no consistent copy could
+                  be read while writes are in progress.
+        """
+        buf = self._segment().buf
+        for attempt in range(READ_RETRIES):
+            if attempt:
+                time.sleep(READ_BACKOFF * 2 ** min(attempt, 6))
+            try:
+                sequence, days, slots, used = self._layout(buf)
+            except ValueError:
+                # Segment just created by another process and not initialized yet.
+                return None
+            if sequence % 2:
+                continue
+            out = self._read(buf, days, slots, used, source_id, start_date, end_date, exchanged_ids)
+            if struct.unpack_from('<Q', buf, 8)[0] == sequence:
+                return out
+        return None
+
+    def _read(self, buf, days, slots, used, source_id, start_date, end_date, exchanged_ids):
+        ids_offset, days_offset, data_offset = self._offsets(days, slots)
+        ids = list(struct.unpack_from(f'<{used}q', buf, ids_offset))
+        if source_id not in ids or any(exchanged_id not in ids for exchanged_id in exchanged_ids):
+            return None
+        source = ids.index(source_id)
+        out = {}
+        day = start_date
+        while day <= end_date:
+            row = day.toordinal() % days
+            if struct.unpack_from('<q', buf, days_offset + row * 8)[0] != day.toordinal():
+                return None
+            row_offset = data_offset + (row * slots + source) * slots * 8
+            rates = {exchanged_id: struct.unpack_from('<d', buf, row_offset + ids.index(exchanged_id) * 8)[0]
+                     for exchanged_id in exchanged_ids}
+            if any(math.isnan(rate) for rate in rates.values()):
+                return None
+            out[day] = rates
+            day += timedelta(days=1)
+        return out
+
+    def _seed(self):
+        """
+        Load the days held from the database into a new segment.
+        """
+        from exchange_rates.models import CurrencyExchangeRate
+
+        since = date.today() - timedelta(days=settings.RATE_SHM_DAYS - 1)
+        self.put(CurrencyExchangeRate.objects.filter(valuation_date__gte=since).only(
+            'source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value'))
+
+    def close(self):
+        with self.lock:
+            if self.shm is not None:
+                self.shm.close()
+                self.shm = None
+
+    def unlink(self):
+        """
+        Destroy the segment; the next access recreates it from the database.
+        """
+        name = self._segment().name
+        self.close()
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+
+
+shared_rates = SharedRates()
@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from exchange_rates.libs.rate_events import rate_hub
+from exchange_rates.libs.rate_store import rate_store
+from exchange_rates.libs.rollup import merge_rollups
+from exchange_rates.libs.shared_rates import shared_rates
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class _WriteRequest(object):
+    """
+    A list of rates queued by one caller, completed once the writer has committed them.
+    """
+
+    def __init__(self, rates):
+        self.rates = rates
+        self.inserted = []
+        self.error = None
+        self.done = threading.Event()
+
+
+class RateWriter(object):
+    """
+    Single writer through which every CurrencyExchangeRate insert is funneled.
+
+    SQLite allows one writer at a time, so instead of letting each populate() thread fight for
+    the lock, callers queue their rates and one background thread commits them. Requests that
+    arrive within RATE_WRITER_LINGER_SECONDS of each other are merged into one transaction of up
+    to RATE_WRITER_BATCH_SIZE rates. When RATE_WRITER_BACKGROUND is False (tests, management
+    commands) the rates are written in the caller's thread with the same logic.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def write(self, rates):
+        """
+        Store exchange rates, skipping those that already exist, and wait until they are committed.
+
+        Args:
+            rates (list): Unsaved CurrencyExchangeRate instances.
+
+        Returns:
+            list: The CurrencyExchangeRate instances that were actually inserted.
+
+        Raises:
+            Exception: Any database error raised while committing these rates.
+        """
+        request = _WriteRequest(list(rates))
+        if not request.rates:
+            return []
+        if not settings.RATE_WRITER_BACKGROUND:
+            self._commit([request])
+            return request.inserted
+        self._start()
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.inserted
+
+    def _start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='rate-writer', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0].rates)
+            deadline = time.monotonic() + settings.RATE_WRITER_LINGER_SECONDS
+            while size < settings.RATE_WRITER_BATCH_SIZE:
+                try:
+                    request = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.rates)
+            try:
+                self._commit(batch)
+            except Exception:
+                # Commit each request on its own so the error only reaches the caller that caused it.
+                for request in batch:
+                    try:
+                        self._commit([request])
+                    except Exception as e:
+                        request.error = e
+            finally:
+                for request in batch:
+                    request.done.set()
+
+    def _commit(self, batch):
+        """
+        Insert the rates of several requests in a single transaction, along with their rollups.
+
+        Args:
+            batch (list): _WriteRequest instances to commit together.
+        """
+        with transaction.atomic():
+            existing = self._existing_keys({self._key(rate) for request in batch for rate in request.rates})
+            for request in batch:
+                request.inserted = []
+                for rate in request.rates:
+                    key = self._key(rate)
+                    if key not in existing:
+                        existing.add(key)
+                        request.inserted.append(rate)
+            inserted = [rate for request in batch for rate in request.inserted]
+            CurrencyExchangeRate.objects.bulk_create(inserted, batch_size=500)
+            merge_rollups(inserted)
+            if settings.RATE_STORE_ENABLED and inserted:
+                transaction.on_commit(lambda: rate_store.append(inserted), robust=True)
+            if settings.RATE_SHM_ENABLED and inserted:
+                transaction.on_commit(lambda: shared_rates.put(inserted), robust=True)
+            if inserted:
+                transaction.on_commit(lambda: rate_hub.publish(inserted), robust=True)
+
+    def _existing_keys(self, keys):
+        """
+        Return the keys already stored, with one range query per source currency.
+        """
+        existing = set()
+        sources = {}
+        for source, valuation_date, exchanged in keys:
+            sources.setdefault(source, []).append(valuation_date)
+        for source, dates in sources.items():
+            existing.update(CurrencyExchangeRate.objects.filter(
+                source_currency_id=source, valuation_date__range=(min(dates), max(dates))
+            ).values_list('source_currency_id', 'valuation_date', 'exchanged_currency_id'))
+        return existing
+
+    def _key(self, rate):
+        return rate.source_currency_id, rate.valuation_date, rate.exchanged_currency_id
+
+
+rate_writer = RateWriter()
@@ -0,0 +1,91 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from currencies.models import Currency
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class Rollback(Exception):
+    """Raised to discard everything the benchmark wrote."""
+
+
+class Command(BaseCommand):
+    """
+    Measure insert and range-read throughput of the CurrencyExchangeRate table.
+
+    Everything runs inside a transaction that is rolled back at the end, so the command can be
+    pointed at a real database. Run it once before and once after a schema migration to compare
+    both layouts, e.g. `manage.py migrate exchange_rates 0001 && manage.py benchmark_rates`.
+    """
+    help = "Benchmark inserts and date-range reads on the exchange rate table (changes are rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=3650, help="Days of history per source currency.")
+        parser.add_argument('--currencies', type=int, default=4, help="Number of synthetic currencies.")
+        parser.add_argument('--single-rows', type=int, default=2000,
+                            help="Rows inserted one by one, as populate() used to do.")
+        parser.add_argument('--reads', type=int, default=200, help="Range reads per window size.")
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        database = options['database']
+        try:
+            with transaction.atomic(using=database):
+                self._run(database, options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _run(self, database, options):
+        self.stdout.write(f"Indexes: {', '.join(self._indexes(database))}")
+        # bulk_create does not send post_save, so no refresh of the synthetic currencies is triggered.
+        currencies = Currency.objects.using(database).bulk_create(
+            [Currency(code=f"B{i:02d}", name=f"Bench {i}", symbol='B') for i in range(options['currencies'])])
+        start = date(2000, 1, 1)
+        days = [start + timedelta(days=i) for i in range(options['days'])]
+
+        rows = [CurrencyExchangeRate(source_currency=source, exchanged_currency=target, valuation_date=day,
+                                     rate_value=round(random.uniform(0.5, 1.5), 6))
+                for source in currencies for target in currencies if source != target for day in days]
+        self._report("bulk insert", len(rows), self._timed(
+            lambda: CurrencyExchangeRate.objects.using(database).bulk_create(rows, batch_size=1000)))
+
+        source, target = currencies[0], currencies[1]
+        single_start = days[-1] + timedelta(days=1)
+
+        def insert_single_rows():
+            for i in range(options['single_rows']):
+                CurrencyExchangeRate.objects.using(database).create(
+                    source_currency=source, exchanged_currency=target,
+                    valuation_date=single_start + timedelta(days=i), rate_value=1)
+        self._report("single-row insert", options['single_rows'], self._timed(insert_single_rows))
+
+        targets = [currency.id for currency in currencies[1:]]
+        for window in (30, 365, len(days)):
+            def read_ranges():
+                for _ in range(options['reads']):
+                    first = random.choice(days[:len(days) - window + 1])
+                    list(CurrencyExchangeRate.objects.using(database).filter(
+                        source_currency=source, exchanged_currency__in=targets,
+                        valuation_date__range=(first, first + timedelta(days=window - 1))
+                    ).values_list('valuation_date', 'exchanged_currency_id', 'rate_value'))
+            self._report(f"range read ({window} days)", options['reads'], self._timed(read_ranges))
+
+    def _indexes(self, database):
+        connection = connections[database]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, CurrencyExchangeRate._meta.db_table)
+        return [f"{name}({', '.join(info['columns'])})" for name, info in constraints.items()
+                if info['index'] or info['unique']]
+
+    def _timed(self, function):
+        begin = time.perf_counter()
+        function()
+        return time.perf_counter() - begin
+
+    def _report(self, label, count, elapsed):
+        self.stdout.write(f"{label:<26} {count:>9} ops  {elapsed:8.3f} s  {count / elapsed:12.1f} ops/s")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from currencies.registry import currency_registry
+from exchange_rates.libs.rate_store import rate_store
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the memory-mapped rate store from the exchange rates stored in the database.
+
+    Run it before setting RATE_STORE_ENABLED, and whenever rates were changed or deleted
+    without going through the rate writer.
+    """
+    help = "Rebuild the memory-mapped rate store (RATE_STORE_DIR) from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50000, help="Rates written per append.")
+
+    def handle(self, *args, **options):
+        rate_store.clear()
+        total = 0
+        for currency in currency_registry.all():
+            rates = CurrencyExchangeRate.objects.filter(source_currency=currency).order_by('valuation_date').only(
+                'source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value')
+            chunk = []
+            for rate in rates.iterator(chunk_size=options['chunk_size']):
+                chunk.append(rate)
+                if len(chunk) >= options['chunk_size']:
+                    rate_store.append(chunk)
+                    total += len(chunk)
+                    chunk = []
+            rate_store.append(chunk)
+            total += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Stored {total} rates"))
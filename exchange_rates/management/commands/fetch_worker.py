@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from exchange_rates.libs.jobs import run_pending
+
+
+class Command(BaseCommand):
+    """
+    Run the queued provider fetch jobs (exchange_rates.libs.jobs).
+
+    Several workers can run at once, on one or several hosts: each job is claimed by exactly one
+    of them, and the job of a worker that died is claimed again once its lease expires. Set
+    FETCH_WORKER_IN_PROCESS = False when jobs are only run by this command.
+    """
+    help = "Run the queued provider fetch jobs, retrying failed ones with a backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs due now, then exit.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to wait when no job is due.")
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending()
+            if count:
+                self.stdout.write(f"Ran {count} jobs")
+            if options['once']:
+                break
+            if not count:
+                time.sleep(options['poll'])
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from multiprocessing import shared_memory
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from exchange_rates.libs.loadtest import HttpConnection, RequestMix, basic_auth, parse_mix, run_load
+
+
+def _server_env(directory):
+    """
+    Return the environment of a server whose database, caches and rate copies live in directory.
+
+    DEBUG is off: with it Django keeps every SQL query of a request in memory.
+    """
+    return dict(os.environ,
+                MY_CURRENCY_DEBUG='0',
+                MY_CURRENCY_ALLOWED_HOSTS='127.0.0.1,localhost',
+                MY_CURRENCY_DB=os.path.join(directory, 'db.sqlite3'),
+                MY_CURRENCY_PROVIDER_CACHE_MODE='off',
+                MY_CURRENCY_PROVIDER_CACHE_DIR=os.path.join(directory, 'provider_cache'),
+                MY_CURRENCY_RATE_STORE_DIR=os.path.join(directory, 'rate_store'),
+                MY_CURRENCY_RATE_SHM_NAME=f'my_currency_{os.path.basename(directory)}')
+
+
+def _unlink_segment(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _server_command(command, port):
+    """
+    Return the arguments starting the server: command, with {port} replaced, or runserver.
+
+    Args:
+        command (str): Shell-like command line of a WSGI or ASGI server, or None.
+        port (int): Port the server must listen on, at 127.0.0.1.
+    """
+    if command:
+        return shlex.split(command.replace('{port}', str(port)))
+    return [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', f'127.0.0.1:{port}', '--noreload']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """
+    Load test the conversion and rate list endpoints and report throughput and latency percentiles.
+
+    By default a server is started on a local port, with DEBUG off, on a temporary database
+    holding the load test user, the source and target currencies and the Mock provider, so no real
+    provider is called. That server is `runserver`, Django's development server, unless --server
+    gives the command of a production server (gunicorn, uvicorn...): only then, or with --url and
+    an already running server, are the measures those of a deployed node. Requests are sent by
+    asyncio clients over kept-alive connections, all in one thread.
+
+    Requests authenticate with a session by default: basic authentication hashes the password on
+    every request, which then dominates the measures.
+    """
+    help = "Drive convert_amount and concurrency_rate_list with concurrent clients and report latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+                                          "Defaults to a server started with the Mock provider.")
+        parser.add_argument('--server',
+                            help="Command starting the server on 127.0.0.1:{port}, e.g. 'gunicorn --workers 4 "
+                                 "--bind 127.0.0.1:{port} my_currency.wsgi'. Defaults to runserver, the "
+                                 "development server: use this or --url for production-like measures.")
+        parser.add_argument('--port', type=int, default=0, help="Port of the started server. Defaults to a free one.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Number of concurrent clients.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run.")
+        parser.add_argument('--requests', type=int, help="Number of requests to send, instead of a duration.")
+        parser.add_argument('--mix', default='convert=4,list=1',
+                            help="Relative weight of each endpoint: convert (convert_amount), list (rate list).")
+        parser.add_argument('--source', default='USD', help="Source currency of the requests.")
+        parser.add_argument('--targets', default='EUR,GBP,CHF', help="Comma-separated target currencies.")
+        parser.add_argument('--days', type=int, default=30, help="Days covered by each rate list request.")
+        parser.add_argument('--auth', default='session', choices=['session', 'basic', 'none'],
+                            help="Authentication of the requests.")
+        parser.add_argument('--user', default='loadtest', help="Username of the load test user.")
+        parser.add_argument('--password', default='loadtest', help="Password of the load test user.")
+        parser.add_argument('--session-key', help="Session key of the user with --url and --auth session.")
+        parser.add_argument('--seed', type=int, help="Seed of the random request mix.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(e)
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        targets = [code for code in options['targets'].split(',') if code]
+        requests = RequestMix(mix, options['source'], targets, days=options['days'], seed=options['seed'])
+        session_key = options['session_key']
+        if options['url'] and options['auth'] == 'session' and not session_key:
+            raise CommandError("--session-key is needed to load --url with --auth session")
+        session_key = session_key or get_random_string(32)
+        headers = {
+            'session': {'Cookie': f"{settings.SESSION_COOKIE_NAME}={session_key}"},
+            'basic': basic_auth(options['user'], options['password']),
+            'none': {},
+        }[options['auth']]
+
+        if options['url']:
+            url = urlsplit(options['url'])
+            if url.scheme != 'http' or not url.hostname:
+                raise CommandError("--url must be an http:// URL")
+            result = self._run(url.hostname, url.port or 80, requests, headers, options)
+        else:
+            with self._server(options, targets, session_key) as (host, port):
+                result = self._run(host, port, requests, headers, options)
+        self._report(result.summary(), options['json'])
+
+    def _run(self, host, port, requests, headers, options):
+        # The first rate list fetches the range from the provider: keep it out of the measures.
+        status = asyncio.run(self._warm_up(host, port, requests, headers))
+        if not 200 <= status < 300:
+            raise CommandError(f"Warm-up request failed with HTTP {status}")
+        self.stderr.write(f"Loading {host}:{port} with {options['concurrency']} clients")
+        return asyncio.run(run_load(host, port, requests, options['concurrency'],
+                                    duration=None if options['requests'] else options['duration'],
+                                    total=options['requests'], headers=headers))
+
+    async def _warm_up(self, host, port, requests, headers):
+        connection = HttpConnection(host, port, headers)
+        try:
+            status, _ = await connection.get(requests.list_path())
+        finally:
+            connection.close()
+        return status
+
+    @contextmanager
+    def _server(self, options, targets, session_key):
+        """
+        Start the server (--server or runserver) on a temporary database with the load test data,
+        and stop it on exit.
+
+        The server keeps its rate store and shared memory rates in the temporary directory too,
+        and does not use the provider response cache, so it leaves the app's own state alone.
+        """
+        directory = tempfile.mkdtemp(prefix='loadtest-')
+        env = _server_env(directory)
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+        log_path = os.path.join(directory, 'server.log')
+        server = None
+        try:
+            self.stderr.write("Preparing the load test database")
+            subprocess.run(manage + ['migrate', '--noinput'], env=env, check=True, stdout=subprocess.DEVNULL)
+            fixture = os.path.join(directory, 'loadtest.json')
+            with open(fixture, 'w') as file:
+                json.dump(self._fixture(options, targets, session_key), file)
+            subprocess.run(manage + ['loaddata', fixture], env=env, check=True, stdout=subprocess.DEVNULL)
+
+            port = options['port'] or _free_port()
+            with open(log_path, 'w') as log:
+                try:
+                    server = subprocess.Popen(_server_command(options['server'], port), env=env,
+                                              cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+                except OSError as e:
+                    raise CommandError(f"Could not start the server: {e}")
+            self._wait_for(server, port, log_path)
+            yield '127.0.0.1', port
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Could not prepare the load test database: {e}")
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+            _unlink_segment(env['MY_CURRENCY_RATE_SHM_NAME'])
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _fixture(self, options, targets, session_key):
+        codes = [options['source']] + [code for code in targets if code != options['source']]
+        user = User(pk=1, username=options['user'], password=make_password(options['password']))
+        session = SessionStore().encode({SESSION_KEY: str(user.pk), HASH_SESSION_KEY: user.get_session_auth_hash(),
+                                         BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0]})
+        return ([{'model': 'auth.user', 'pk': user.pk,
+                  'fields': {'username': user.username, 'password': user.password, 'is_active': True}},
+                 {'model': 'sessions.session', 'pk': session_key,
+                  'fields': {'session_data': session,
+                             'expire_date': (timezone.now() + timedelta(days=1)).isoformat()}},
+                 {'model': 'providers.credentials', 'pk': 1,
+                  'fields': {'name': 'Mock', 'token': 'loadtest', 'url': 'http://localhost', 'priority': 1,
+                             'enabled': True}}]
+                + [{'model': 'currencies.currency', 'pk': pk, 'fields': {'code': code, 'name': code, 'symbol': ''}}
+                   for pk, code in enumerate(codes, start=1)])
+
+    def _wait_for(self, server, port, log_path, timeout=30):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            if server.poll() is not None:
+                break
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        with open(log_path) as log:
+            raise CommandError(f"The server did not start:\n{log.read()[-2000:]}")
+
+    def _report(self, summary, as_json):
+        if as_json:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        def ms(value):
+            return '-' if value is None else f"{value:.1f}"
+
+        self.stdout.write(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>10}"
+                          f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, row in summary.items():
+            self.stdout.write(f"{name:<10}{row['requests']:>10}{row['errors']:>8}{row['rps']:>10.1f}"
+                              f"{ms(row['p50']):>10}{ms(row['p90']):>10}{ms(row['p99']):>10}{ms(row['max']):>10}")
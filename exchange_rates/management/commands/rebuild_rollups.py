@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.libs.rollup import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """
+    Recompute the week, month and year rollups from the stored daily exchange rates.
+
+    The rate writer keeps the rollups up to date, so this is only needed once after migrating
+    and after rates are loaded by other means (admin, fixtures, raw SQL).
+    """
+    help = "Rebuild the weekly, monthly and yearly exchange rate rollups from the daily rates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source-currency', help="Only rebuild the rollups of this currency code.")
+
+    def handle(self, *args, **options):
+        source_currency = None
+        if options['source_currency']:
+            try:
+                source_currency = currency_registry.get(options['source_currency'])
+            except Currency.DoesNotExist:
+                raise CommandError(f"Currency {options['source_currency']} does not exist")
+        with transaction.atomic():
+            total = rebuild_rollups(source_currency)
+        self.stdout.write(self.style.SUCCESS(f"Created {total} rollups"))
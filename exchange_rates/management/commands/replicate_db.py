@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """
+    Copy the primary SQLite database to the read replica, a local stand-in for database replication.
+
+    The copy uses the SQLite online backup API, so the primary stays available while it runs.
+    With --interval the copy is repeated forever, which keeps the replica a few seconds behind
+    the primary like an asynchronous replica would be.
+    """
+    help = "Copy the primary SQLite database to the read replica (DATABASE_READ_ALIAS), once or periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replica', default='replica', help="Alias of the replica in DATABASES.")
+        parser.add_argument('--path', help="Copy to this file instead of the NAME of the replica.")
+        parser.add_argument('--interval', type=float, help="Repeat the copy every INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if options['replica'] not in settings.DATABASES:
+            raise CommandError(f"Database {options['replica']} is not configured")
+        replica = settings.DATABASES[options['replica']]
+        if source.vendor != 'sqlite' or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("replicate_db only copies SQLite databases, use the replication of the database server")
+        path = options['path'] or replica['NAME']
+        while True:
+            started = time.monotonic()
+            source.ensure_connection()
+            target = sqlite3.connect(path, timeout=30)
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Copied {source.settings_dict['NAME']} to {path} in "
+                              f"{time.monotonic() - started:.2f}s")
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,109 @@
+# Hand-written: the composite unique index is added and the single-column indexes
+# dropped with plain CREATE/DROP INDEX statements so that large tables are not
+# rebuilt, and duplicated rates left behind by concurrent populate() runs are
+# removed beforehand in chunks, each one in its own short transaction.
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Count, Min
+
+CHUNK_SIZE = 5000
+CONSTRAINT = models.UniqueConstraint(fields=['source_currency', 'valuation_date', 'exchanged_currency'],
+                                     name='unique_rate_per_pair_and_date')
+DROPPED_INDEXES = ('source_currency', 'valuation_date', 'rate_value')
+
+
+def delete_duplicate_rates(apps, schema_editor):
+    """
+    Keep the oldest row of every (source_currency, valuation_date, exchanged_currency) group.
+
+    Only the duplicated groups are kept in memory; the table is then walked by primary key
+    in chunks of CHUNK_SIZE rows and the extra rows of each chunk are deleted in their own
+    transaction, so the table is never locked for the whole pass.
+    """
+    model = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    db = schema_editor.connection.alias
+    keys = ('source_currency_id', 'valuation_date', 'exchanged_currency_id')
+    keep = {
+        tuple(group[key] for key in keys): group['keep']
+        for group in model.objects.using(db).values(*keys).order_by().annotate(
+            keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    }
+    if not keep:
+        return
+    last_id = 0
+    while True:
+        chunk = list(model.objects.using(db).filter(id__gt=last_id).order_by('id').values_list(
+            'id', *keys)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        extra = [row[0] for row in chunk if keep.get(row[1:], row[0]) != row[0]]
+        if extra:
+            with transaction.atomic(using=db):
+                model.objects.using(db).filter(id__in=extra).delete()
+
+
+def create_unique_index(apps, schema_editor):
+    model = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    schema_editor.execute(CONSTRAINT.create_sql(model, schema_editor))
+
+
+def drop_unique_index(apps, schema_editor):
+    model = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    schema_editor.execute(CONSTRAINT.remove_sql(model, schema_editor))
+
+
+def drop_single_column_indexes(apps, schema_editor):
+    model = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    for name in DROPPED_INDEXES:
+        column = model._meta.get_field(name).column
+        for index in schema_editor._constraint_names(model, [column], index=True, unique=False):
+            schema_editor.execute(schema_editor._delete_index_sql(model, index))
+
+
+def create_single_column_indexes(apps, schema_editor):
+    model = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    for name in DROPPED_INDEXES:
+        schema_editor.execute(schema_editor._create_index_sql(model, fields=[model._meta.get_field(name)]))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('exchange_rates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_rates, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_unique_index, drop_unique_index),
+                migrations.RunPython(drop_single_column_indexes, create_single_column_indexes),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='currencyexchangerate',
+                    constraint=CONSTRAINT,
+                ),
+                migrations.AlterField(
+                    model_name='currencyexchangerate',
+                    name='source_currency',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                                            related_name='exchanges', to='currencies.currency'),
+                ),
+                migrations.AlterField(
+                    model_name='currencyexchangerate',
+                    name='valuation_date',
+                    field=models.DateField(),
+                ),
+                migrations.AlterField(
+                    model_name='currencyexchangerate',
+                    name='rate_value',
+                    field=models.DecimalField(decimal_places=6, max_digits=18),
+                ),
+            ],
+        ),
+    ]
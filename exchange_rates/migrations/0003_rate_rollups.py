@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currencies', '0001_initial'),
+        ('exchange_rates', '0002_rate_pair_date_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrencyExchangeRateRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('week', 'Week'), ('month', 'Month'), ('year', 'Year')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('open_date', models.DateField()),
+                ('open_value', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('close_date', models.DateField()),
+                ('close_value', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('high_value', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('low_value', models.DecimalField(decimal_places=6, max_digits=18)),
+                ('total_value', models.DecimalField(decimal_places=6, max_digits=24)),
+                ('days', models.PositiveIntegerField()),
+                ('exchanged_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='currencies.currency')),
+                ('source_currency', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='currencies.currency')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source_currency', 'granularity', 'period_start', 'exchanged_currency'), name='unique_rollup_per_pair_and_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('currencies', '0001_initial'),
+        ('exchange_rates', '0003_rate_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('refresh', 'Refresh'), ('backfill', 'Backfill')], default='refresh', max_length=8)),
+                ('start_date', models.DateField()),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=7)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField()),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('source_currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fetch_jobs', to='currencies.currency')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'run_after'], name='fetch_job_claim_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('state__in', ['pending', 'running'])), fields=('source_currency',), name='unique_active_fetch_job_per_currency')],
+            },
+        ),
+    ]
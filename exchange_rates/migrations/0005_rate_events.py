@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange_rates', '0004_fetch_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('events', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
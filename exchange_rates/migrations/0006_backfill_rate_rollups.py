@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Roll up the rates stored before the rollup table existed (migration 0003).
+    """
+    from exchange_rates.libs.rollup import _aggregate
+
+    alias = schema_editor.connection.alias
+    CurrencyExchangeRate = apps.get_model('exchange_rates', 'CurrencyExchangeRate')
+    CurrencyExchangeRateRollup = apps.get_model('exchange_rates', 'CurrencyExchangeRateRollup')
+    if CurrencyExchangeRateRollup.objects.using(alias).exists():
+        return
+    rows = CurrencyExchangeRate.objects.using(alias).order_by().values_list(
+        'source_currency_id', 'exchanged_currency_id', 'valuation_date', 'rate_value').iterator(chunk_size=5000)
+    CurrencyExchangeRateRollup.objects.using(alias).bulk_create(
+        list(_aggregate(rows, model=CurrencyExchangeRateRollup).values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange_rates', '0005_rate_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
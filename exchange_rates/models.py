@@ -12,10 +12,137 @@ class CurrencyExchangeRate(models.Model):
             exchanged_currency (ForeignKey): The currency to which the exchange rate applies.
             valuation_date (DateField): The date the exchange rate is valid for.
             rate_value (DecimalField): The exchange rate value, with high precision.
+
+        Every query filters by source currency and a range of valuation dates, so the only
+        index on the table besides the primary key and the exchanged currency foreign key is
+        the composite unique one on (source_currency, valuation_date, exchanged_currency). Its
+        leading column also serves lookups by source currency alone.
     """
     source_currency = models.ForeignKey(Currency, related_name='exchanges',
-                                        on_delete=models.CASCADE)
+                                        on_delete=models.CASCADE, db_index=False)
     exchanged_currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
-    valuation_date = models.DateField(db_index=True)
-    rate_value = models.DecimalField(db_index=True, decimal_places=6,
-                                     max_digits=18)
+    valuation_date = models.DateField()
+    rate_value = models.DecimalField(decimal_places=6, max_digits=18)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_currency', 'valuation_date', 'exchanged_currency'],
+                                    name='unique_rate_per_pair_and_date'),
+        ]
+
+
+class CurrencyExchangeRateRollup(models.Model):
+    """
+        Aggregate of the daily exchange rates of a currency pair over a week, month or year.
+
+        Attributes:
+            source_currency (ForeignKey): The currency from which the exchange rates are calculated.
+            exchanged_currency (ForeignKey): The currency to which the exchange rates apply.
+            granularity (CharField): Length of the period: 'week', 'month' or 'year'.
+            period_start (DateField): First day of the period (Monday for weeks).
+            open_date (DateField): Date of the first daily rate of the period.
+            open_value (DecimalField): First daily rate of the period.
+            close_date (DateField): Date of the last daily rate of the period.
+            close_value (DecimalField): Last daily rate of the period.
+            high_value (DecimalField): Highest daily rate of the period.
+            low_value (DecimalField): Lowest daily rate of the period.
+            total_value (DecimalField): Sum of the daily rates, kept so the average can be merged.
+            days (PositiveIntegerField): Number of daily rates aggregated.
+
+        Rows are maintained by exchange_rates.libs.rollup as the rate writer inserts daily rates,
+        and can be rebuilt from scratch with `manage.py rebuild_rollups`.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    YEAR = 'year'
+    GRANULARITY_CHOICES = [(WEEK, 'Week'), (MONTH, 'Month'), (YEAR, 'Year')]
+
+    source_currency = models.ForeignKey(Currency, related_name='rollups',
+                                        on_delete=models.CASCADE, db_index=False)
+    exchanged_currency = models.ForeignKey(Currency, related_name='+', on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    open_date = models.DateField()
+    open_value = models.DecimalField(decimal_places=6, max_digits=18)
+    close_date = models.DateField()
+    close_value = models.DecimalField(decimal_places=6, max_digits=18)
+    high_value = models.DecimalField(decimal_places=6, max_digits=18)
+    low_value = models.DecimalField(decimal_places=6, max_digits=18)
+    total_value = models.DecimalField(decimal_places=6, max_digits=24)
+    days = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_currency', 'granularity', 'period_start', 'exchanged_currency'],
+                                    name='unique_rollup_per_pair_and_period'),
+        ]
+
+    @property
+    def average_value(self):
+        return self.total_value / self.days
+
+
+class FetchJob(models.Model):
+    """
+        A durable request to fetch the exchange rates of a source currency from a start date to today.
+
+        Attributes:
+            kind (CharField): 'refresh' (catch up from the last stored rate) or 'backfill' (new currency).
+            source_currency (ForeignKey): The currency whose rates are fetched.
+            start_date (DateField): First date to fetch.
+            state (CharField): 'pending', 'running', 'done' or 'failed'.
+            attempts (PositiveIntegerField): Number of times the job was claimed.
+            run_after (DateTimeField): The job is not claimed before this time (retry backoff).
+            locked_until (DateTimeField): End of the lease of a running job; once past, the worker
+                                          is presumed dead and the job can be claimed again.
+            version (PositiveIntegerField): Incremented on every claim, for compare-and-set.
+            last_error (TextField): Error of the last failed attempt.
+
+        Jobs are queued and run by exchange_rates.libs.jobs. At most one pending or running job
+        exists per source currency: queueing another one only moves its start date earlier.
+    """
+    REFRESH = 'refresh'
+    BACKFILL = 'backfill'
+    KIND_CHOICES = [(REFRESH, 'Refresh'), (BACKFILL, 'Backfill')]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATE_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES, default=REFRESH)
+    source_currency = models.ForeignKey(Currency, related_name='fetch_jobs', on_delete=models.CASCADE)
+    start_date = models.DateField()
+    state = models.CharField(max_length=7, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source_currency'],
+                                    condition=models.Q(state__in=['pending', 'running']),
+                                    name='unique_active_fetch_job_per_currency'),
+        ]
+        indexes = [
+            models.Index(fields=['state', 'run_after'], name='fetch_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.source_currency} from {self.start_date} ({self.state})"
+
+
+class RateEvent(models.Model):
+    """
+        A batch of rate events, carried between processes by the DatabaseChannel of exchange_rates.libs.rate_events.
+
+        Attributes:
+            events (JSONField): The events published together: one per source currency and valuation date.
+            created (DateTimeField): When the events were published; old rows are deleted on publish.
+    """
+    events = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .libs.rollup import refresh_rollups
+from .models import CurrencyExchangeRate
+
+
+def _rollup_key(rate):
+    # The date of a rate created with a 'YYYY-MM-DD' string is still a string after the save.
+    valuation_date = CurrencyExchangeRate._meta.get_field('valuation_date').to_python(rate.valuation_date)
+    return rate.source_currency_id, rate.exchanged_currency_id, valuation_date
+
+
+@receiver(pre_save, sender=CurrencyExchangeRate)
+def remember_rate_periods(sender, instance, raw, **kwargs):
+    """
+    Signal handler triggered before a CurrencyExchangeRate instance is saved.
+
+    Keeps the pair and date the rate had before, whose rollups must be recomputed too if they change.
+    """
+    instance._rollup_previous = None
+    if instance.pk is not None and not raw:
+        previous = CurrencyExchangeRate.objects.filter(pk=instance.pk).values_list(
+            'source_currency_id', 'exchanged_currency_id', 'valuation_date').first()
+        if previous is not None and previous != _rollup_key(instance):
+            instance._rollup_previous = previous
+
+
+@receiver([post_save, post_delete], sender=CurrencyExchangeRate)
+def refresh_rate_rollups(sender, instance, **kwargs):
+    """
+    Signal handler triggered after a CurrencyExchangeRate instance is saved or deleted.
+
+    Recomputes the rollups of its periods. The rate writer inserts in bulk, sending no signal,
+    and merges its rates into the rollups itself. Rows loaded from fixtures (raw saves) are
+    skipped: run `manage.py rebuild_rollups` after loading them.
+    """
+    if kwargs.get('raw'):
+        return
+    refresh_rollups(*_rollup_key(instance))
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        refresh_rollups(*previous)
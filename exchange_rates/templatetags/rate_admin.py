@@ -0,0 +1,103 @@
+import datetime
+
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from currencies.models import Currency
+
+register = template.Library()
+
+
+def _date_bounds(queryset, field_name):
+    """
+    Return the first and last date of the queryset, or (None, None) if it is empty.
+
+    MIN/MAX over the whole table cannot use the (source_currency, valuation_date, ...) index,
+    but the first and last date of each source currency are single index seeks. They are
+    correlated subqueries of one query over the currencies, so the bounds cost one query
+    whatever the size of the table and the number of currencies.
+    """
+    dates = queryset.order_by().filter(source_currency_id=OuterRef('pk')).values(field_name)
+    bounds = Currency.objects.annotate(
+        first=Subquery(dates.order_by(field_name)[:1]),
+        last=Subquery(dates.order_by('-' + field_name)[:1]),
+    ).aggregate(first_date=Min('first'), last_date=Max('last'))
+    if bounds['first_date'] is None:
+        return None, None
+    return bounds['first_date'], bounds['last_date']
+
+
+def rate_date_hierarchy(cl):
+    """
+    Display the date hierarchy of the exchange rate changelist.
+
+    Same output as the admin date_hierarchy tag, but the years, months and days offered are
+    derived from the first and last valuation dates instead of SELECT DISTINCT over the table:
+    rates are published daily, so every period between both bounds has rates.
+    """
+    field_name = cl.date_hierarchy
+    year_field = "%s__year" % field_name
+    month_field = "%s__month" % field_name
+    day_field = "%s__day" % field_name
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, ["%s__" % field_name])
+
+    first, last = _date_bounds(cl.queryset, field_name)
+    if first is None:
+        return {"show": False}
+    if not (year_lookup or month_lookup or day_lookup) and first.year == last.year:
+        year_lookup = first.year
+        if first.month == last.month:
+            month_lookup = first.month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup, month_field: month_lookup}),
+                     "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT"))},
+            "choices": [{"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}],
+        }
+    if year_lookup and month_lookup:
+        days = [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [{"link": link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                         "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}
+                        for day in days],
+        }
+    if year_lookup:
+        months = [datetime.date(first.year, month, 1) for month in range(first.month, last.month + 1)]
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [{"link": link({year_field: year_lookup, month_field: month.month}),
+                         "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT"))}
+                        for month in months],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [{"link": link({year_field: str(year)}), "title": str(year)}
+                    for year in range(first.year, last.year + 1)],
+    }
+
+
+@register.tag(name="rate_date_hierarchy")
+def rate_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=rate_date_hierarchy,
+        template_name="date_hierarchy.html",
+        takes_context=False,
+    )
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.admin import EstimatedCountPaginator
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class CurrencyExchangeRateAdminTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.user)
+        self.url = reverse('admin:exchange_rates_currencyexchangerate_changelist')
+
+    def tearDown(self):
+        currency_registry.clear()
+
+    def add_rates(self, days, first_day=0):
+        # Three rates per day: USD/EUR, USD/GBP and EUR/GBP
+        CurrencyExchangeRate.objects.bulk_create([
+            CurrencyExchangeRate(source_currency=source, exchanged_currency=exchanged,
+                                 valuation_date=date(2024, 1, 1) + timedelta(days=day), rate_value=1.1)
+            for day in range(first_day, first_day + days) for source in (self.usd, self.eur)
+            for exchanged in (self.eur, self.gbp) if source != exchanged
+        ])
+
+    def count_queries(self, params=None):
+        currency_registry.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_rates(5)
+        few = self.count_queries()
+        few_filtered = self.count_queries({'valuation_date__year': '2024'})
+
+        self.add_rates(300, first_day=5)
+        self.assertEqual(self.count_queries(), few)
+        self.assertEqual(self.count_queries({'valuation_date__year': '2024'}), few_filtered)
+
+    def test_changelist_queries_do_not_grow_with_currencies(self):
+        self.add_rates(5)
+        few = self.count_queries()
+
+        Currency.objects.bulk_create([Currency(code=f'C{i:02d}', name=f'Currency {i}') for i in range(20)])
+        self.assertEqual(self.count_queries(), few)
+
+    def test_date_filter_is_restricted_to_source_currencies(self):
+        self.add_rates(3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url, {'valuation_date__year': '2024', 'valuation_date__month': '1'})
+
+        rate_queries = [q['sql'] for q in ctx.captured_queries
+                        if 'FROM "exchange_rates_currencyexchangerate"' in q['sql']
+                        and 'valuation_date' in q['sql'].split('WHERE')[-1]]
+        self.assertTrue(rate_queries)
+        self.assertTrue(all('"source_currency_id" IN' in sql for sql in rate_queries))
+
+    def test_search_matches_codes_and_dates_exactly(self):
+        self.add_rates(3)
+
+        response = self.client.get(self.url, {'q': 'gbp 2024-01-02'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        response = self.client.get(self.url, {'q': 'US'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_paginator_bounds_count(self):
+        self.add_rates(5)
+        rates = CurrencyExchangeRate.objects.order_by('pk')
+
+        paginator = EstimatedCountPaginator(rates, 100)
+        paginator.limit = 10
+        self.assertEqual(paginator.count, 15)
+        paginator = EstimatedCountPaginator(rates.filter(source_currency=self.usd), 100)
+        paginator.limit = 5
+        self.assertEqual(paginator.count, 5)
@@ -1,10 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from currencies.models import Currency
+from currencies.registry import currency_registry
 from exchange_rates.libs.converter import converter
+from exchange_rates.models import CurrencyExchangeRate
 
 
 class ConverterFunctionTests(TestCase):
@@ -18,6 +20,7 @@ class ConverterFunctionTests(TestCase):
     @patch('exchange_rates.libs.converter.async_populate_all')
     def test_converter_single_currency(self, mock_populate, mock_exchange_finder):
         mock_instance = mock_exchange_finder.return_value
+        mock_instance.get_latest_rates.return_value = (None, {})
         mock_instance.get_currency_rates_list.return_value = {
             self.today: {'USD': 1.0, 'EUR': 0.93, 'GBP': 0.80}
         }
@@ -27,7 +30,9 @@ class ConverterFunctionTests(TestCase):
         expected = {
             "date": self.today,
             "source_currency": {"USD": 100},
-            "exchanged_currency": {"EUR": 93.0}  # 100 * 0.93
+            "exchanged_currency": {"EUR": 93.0},  # 100 * 0.93
+            "as_of": self.today,
+            "stale": False
         }
         self.assertEqual(result, expected)
         mock_exchange_finder.assert_called_once_with('USD', self.today, self.today)
@@ -37,6 +42,7 @@ class ConverterFunctionTests(TestCase):
     @patch('exchange_rates.libs.converter.async_populate_all')
     def test_converter_all_currencies(self, mock_populate, mock_exchange_finder):
         mock_instance = mock_exchange_finder.return_value
+        mock_instance.get_latest_rates.return_value = (None, {})
         mock_instance.get_currency_rates_list.return_value = {
             self.today: {'USD': 1.0, 'EUR': 0.93, 'GBP': 0.80}
         }
@@ -49,7 +55,9 @@ class ConverterFunctionTests(TestCase):
             "exchanged_currency": {
                 "EUR": 93.0,
                 "GBP": 80.0
-            }
+            },
+            "as_of": self.today,
+            "stale": False
         }
         self.assertEqual(result, expected)
         mock_exchange_finder.assert_called_once_with('USD', self.today, self.today)
@@ -59,6 +67,7 @@ class ConverterFunctionTests(TestCase):
     @patch('exchange_rates.libs.converter.async_populate_all')
     def test_converter_invalid_exchanged_currency(self, mock_populate, mock_exchange_finder):
         mock_instance = mock_exchange_finder.return_value
+        mock_instance.get_latest_rates.return_value = (None, {})
         mock_instance.get_currency_rates_list.return_value = {
             self.today: {'USD': 1.0, 'EUR': 0.93, 'GBP': 0.80}
         }
@@ -68,7 +77,9 @@ class ConverterFunctionTests(TestCase):
         expected = {
             "date": self.today,
             "source_currency": {"USD": 100},
-            "exchanged_currency": {}
+            "exchanged_currency": {},
+            "as_of": self.today,
+            "stale": False
         }
         self.assertEqual(result, expected)
         mock_exchange_finder.assert_called_once_with('USD', self.today, self.today)
@@ -78,6 +89,7 @@ class ConverterFunctionTests(TestCase):
     @patch('exchange_rates.libs.converter.async_populate_all')
     def test_converter_no_value(self, mock_populate, mock_exchange_finder):
         mock_instance = mock_exchange_finder.return_value
+        mock_instance.get_latest_rates.return_value = (None, {})
         mock_instance.get_currency_rates_list.return_value = {
             self.today: {'USD': 1.0, 'EUR': 0.93, 'GBP': 0.80}
         }
@@ -87,7 +99,9 @@ class ConverterFunctionTests(TestCase):
         expected = {
             "date": self.today,
             "source_currency": {"USD": None},
-            "exchanged_currency": {"EUR": None}  # None * 0.93 = None
+            "exchanged_currency": {"EUR": None},  # None * 0.93 = None
+            "as_of": self.today,
+            "stale": False
         }
         self.assertEqual(result, expected)
         mock_exchange_finder.assert_called_once_with('USD', self.today, self.today)
@@ -109,6 +123,7 @@ class ConverterFunctionTests(TestCase):
         with patch('exchange_rates.libs.converter.ExchangeFinder') as mock_exchange_finder, \
                 patch('exchange_rates.libs.converter.async_populate_all') as mock_populate:
             mock_instance = mock_exchange_finder.return_value
+            mock_instance.get_latest_rates.return_value = (None, {})
             mock_instance.get_currency_rates_list.return_value = {
                 self.today: {'USD': 1.0}
             }
@@ -118,7 +133,99 @@ class ConverterFunctionTests(TestCase):
             expected = {
                 "date": self.today,
                 "source_currency": {"USD": 100},
-                "exchanged_currency": {}
+                "exchanged_currency": {},
+                "as_of": self.today,
+                "stale": False
             }
             self.assertEqual(result, expected)
             mock_populate.assert_called_once()
+
+
+class ConverterStaleWhileRevalidateTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.today = datetime.today().date()
+
+    def tearDown(self):
+        currency_registry.clear()
+
+    def store_rate(self, days_ago, value):
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=self.today - timedelta(days=days_ago), rate_value=value)
+
+    @override_settings(CONVERTER_MAX_STALENESS_DAYS=3)
+    @patch('exchange_rates.libs.converter.async_populate_all')
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_recent_rates_are_served_without_fetching(self, mock_fetch, mock_populate):
+        self.store_rate(5, 0.5)
+        self.store_rate(2, 0.9)
+
+        result = converter(source_currency='USD', exchanged_currency=['EUR'], value=10)
+
+        self.assertEqual(result["exchanged_currency"], {"EUR": 9.0})
+        self.assertEqual(result["as_of"], (self.today - timedelta(days=2)).strftime('%Y-%m-%d'))
+        self.assertTrue(result["stale"])
+        mock_fetch.assert_not_called()
+        mock_populate.assert_called_once()
+
+    @override_settings(CONVERTER_MAX_STALENESS_DAYS=1)
+    @patch('exchange_rates.libs.converter.async_populate_all')
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_too_old_rates_wait_for_the_provider(self, mock_fetch, mock_populate):
+        self.store_rate(2, 0.9)
+        mock_fetch.side_effect = lambda **kwargs: self.store_rate(0, 0.8)
+
+        result = converter(source_currency='USD', exchanged_currency=['EUR'], value=10)
+
+        self.assertEqual(result["exchanged_currency"], {"EUR": 8.0})
+        self.assertEqual(result["as_of"], self.today.strftime('%Y-%m-%d'))
+        self.assertFalse(result["stale"])
+        mock_fetch.assert_called_once()
+
+    @override_settings(CONVERTER_MAX_STALENESS_DAYS=3)
+    @patch('exchange_rates.libs.converter.async_populate_all')
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_new_currency_does_not_block_the_others(self, mock_fetch, mock_populate):
+        # GBP was just added and has no rates yet: EUR conversions are still served from storage
+        self.store_rate(1, 0.9)
+        Currency.objects.create(code='GBP', name='British Pound')
+
+        result = converter(source_currency='USD', exchanged_currency=['EUR'], value=10)
+
+        self.assertEqual(result["exchanged_currency"], {"EUR": 9.0})
+        self.assertTrue(result["stale"])
+        mock_fetch.assert_not_called()
+
+    @override_settings(CONVERTER_MAX_STALENESS_DAYS=3)
+    @patch('exchange_rates.libs.converter.async_populate_all')
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_only_missing_currencies_wait_for_the_provider(self, mock_fetch, mock_populate):
+        # GBP has no rate yet: the conversion waits for today's rates, which are used for every currency
+        self.store_rate(1, 0.9)
+        gbp = Currency.objects.create(code='GBP', name='British Pound')
+
+        def fetch(**kwargs):
+            self.store_rate(0, 0.95)
+            CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=gbp,
+                                                valuation_date=self.today, rate_value=0.8)
+        mock_fetch.side_effect = fetch
+
+        result = converter(source_currency='USD', exchanged_currency=['EUR', 'GBP'], value=10)
+
+        self.assertEqual(result["exchanged_currency"], {"EUR": 9.5, "GBP": 8.0})
+        self.assertFalse(result["stale"])
+        mock_fetch.assert_called_once()
+
+    @override_settings(CONVERTER_MAX_STALENESS_DAYS=3)
+    @patch('exchange_rates.libs.converter.async_populate_all')
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_source_currency_among_targets_does_not_wait(self, mock_fetch, mock_populate):
+        self.store_rate(1, 0.9)
+
+        result = converter(source_currency='USD', exchanged_currency=['USD', 'EUR'], value=10)
+
+        self.assertEqual(result["exchanged_currency"], {"EUR": 9.0})
+        self.assertTrue(result["stale"])
+        mock_fetch.assert_not_called()
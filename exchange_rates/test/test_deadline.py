@@ -0,0 +1,103 @@
+import time
+from datetime import date
+from unittest.mock import Mock, patch
+
+import requests
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from currencies.models import Currency
+from exchange_rates.models import CurrencyExchangeRate
+from my_currency.deadline import DeadlineExceeded, check, deadline, remaining, request_budget, timeout
+from providers.adapters.currency_beacon import CurrencyBeaconAdapter
+
+
+@override_settings(REQUEST_DEADLINE_SECONDS=10)
+class DeadlineTests(TestCase):
+    def test_nested_budget_never_extends(self):
+        self.assertIsNone(remaining())
+        self.assertEqual(timeout(5), 5)
+        with deadline(1):
+            with deadline(60):
+                self.assertLessEqual(remaining(), 1)
+            self.assertLessEqual(timeout(5), 1)
+        self.assertIsNone(remaining())
+
+    def test_spent_budget(self):
+        with deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                check()
+            with self.assertRaises(DeadlineExceeded):
+                timeout(5)
+
+    def test_request_budget(self):
+        factory = APIRequestFactory()
+        self.assertEqual(request_budget(factory.get('/')), 10)
+        self.assertEqual(request_budget(factory.get('/', HTTP_X_REQUEST_TIMEOUT='2.5')), 2.5)
+        self.assertEqual(request_budget(factory.get('/', HTTP_X_REQUEST_TIMEOUT='60')), 10)
+        for value in ('0', '-1', 'soon'):
+            with self.assertRaises(ValueError):
+                request_budget(factory.get('/', HTTP_X_REQUEST_TIMEOUT=value))
+
+    @override_settings(PROVIDER_TIMEOUT=10)
+    @patch('providers.adapters.currency_beacon.requests.get')
+    def test_provider_timeout_follows_budget(self, mock_get):
+        mock_get.return_value = Mock(json=Mock(return_value={"response": {"2025-01-01": {"EUR": 0.93}}}))
+        adapter = CurrencyBeaconAdapter(token="token", url="https://api.currencybeacon.com")
+
+        adapter.get_timeseries_rates("USD", "2025-01-01", "2025-01-01")
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], 10)
+        with deadline(2):
+            adapter.get_timeseries_rates("USD", "2025-01-01", "2025-01-01")
+        self.assertLessEqual(mock_get.call_args.kwargs['timeout'], 2)
+
+        def slow(*args, **kwargs):
+            time.sleep(0.05)
+            raise requests.Timeout()
+
+        mock_get.side_effect = slow
+        with deadline(0.02):
+            with self.assertRaises(DeadlineExceeded):
+                adapter.get_timeseries_rates("USD", "2025-01-01", "2025-01-01")
+
+
+def slow_populate(code_source_currency, start_date, end_date):
+    time.sleep(0.1)
+
+
+@patch('exchange_rates.libs.exchange_finder.populate', side_effect=slow_populate)
+class DeadlineViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=date(2025, 1, 1), rate_value=0.93)
+
+    def test_partial_rates_once_deadline_exceeded(self, mock_populate):
+        params = {"source_currency": "USD", "date_from": "2025-01-01", "date_to": "2025-01-03"}
+
+        response = self.client.get(reverse('v1:concurrency_rate_list'), params, HTTP_X_REQUEST_TIMEOUT='0.05')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'2025-01-01': {'EUR': 0.93}})
+        self.assertEqual(response['X-Partial-Rates'], 'true')
+        mock_populate.assert_called_once()
+
+        params.update(date_from="2025-01-02")
+        response = self.client.get(reverse('v1:concurrency_rate_list'), params, HTTP_X_REQUEST_TIMEOUT='0.05')
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+
+    def test_converter_timeout(self, mock_populate):
+        CurrencyExchangeRate.objects.all().delete()
+
+        response = self.client.get(reverse('v1:convert_amount'),
+                                   {"source_currency": "USD", "exchanged_currency": "EUR", "amount": 10},
+                                   HTTP_X_REQUEST_TIMEOUT='0.05')
+
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
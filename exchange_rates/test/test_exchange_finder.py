@@ -1,11 +1,13 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from unittest.mock import patch
 
 from django.db.models.signals import post_save
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from currencies.models import Currency
-from providers.models import Credentials
+from providers.models import ClosedDay, Credentials, PublicationCalendar
 from currencies.signals import post_save_currency
 from exchange_rates.libs.exchange_finder import ExchangeFinder  # Adjust import
 from exchange_rates.models import CurrencyExchangeRate
@@ -84,6 +86,16 @@ class ExchangeFinderTests(TestCase):
         }
         self.assertEqual(result, expected)
 
+    def test_no_currency_queries_once_registry_loaded(self):
+        # Currency lookups come from the in-memory registry, not the Currency table
+        ExchangeFinder(source_currency='USD', start_date='2025-01-01', end_date='2025-01-01')
+        with CaptureQueriesContext(connection) as queries:
+            finder = ExchangeFinder(source_currency='USD', start_date='2025-01-01', end_date='2025-01-01')
+            finder.get_currency_rates_list()
+        self.assertTrue(queries.captured_queries)
+        self.assertFalse([query for query in queries.captured_queries
+                          if Currency._meta.db_table in query['sql']])
+
     @patch('exchange_rates.libs.exchange_finder.populate')
     def test_get_currency_rates_list_missing_data(self, mock_populate):
         # Test get_currency_rates_list when data is missing and populate is called
@@ -114,3 +126,86 @@ class ExchangeFinderTests(TestCase):
         self.assertEqual(result, expected)
         mock_populate.assert_called_once_with(code_source_currency='USD', start_date='2025-01-01',
                                               end_date='2025-01-02')
+
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_get_currency_rates_list_fifty_years(self, mock_populate):
+        # A 50-year range is queried with BETWEEN predicates, so query size does not grow with the range
+        finder = ExchangeFinder(source_currency='USD', start_date='1975-01-01', end_date='2024-12-31')
+        days = (date(2024, 12, 31) - date(1975, 1, 1)).days + 1
+
+        def side_effect(code_source_currency, start_date, end_date):
+            CurrencyExchangeRate.objects.bulk_create([
+                CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=currency,
+                                     valuation_date=date(1975, 1, 1) + timedelta(days=day), rate_value=1)
+                for day in range(days) for currency in (self.eur, self.gbp)], batch_size=1000)
+
+        mock_populate.side_effect = side_effect
+
+        with CaptureQueriesContext(connection) as queries:
+            result = finder.get_currency_rates_list()
+
+        self.assertEqual(len(finder.dates), days)
+        self.assertEqual(len(result), days)
+        self.assertEqual(result['1975-01-01'], {'EUR': 1.0, 'GBP': 1.0})
+        self.assertEqual(result['2024-12-31'], {'EUR': 1.0, 'GBP': 1.0})
+        mock_populate.assert_called_once()
+        finder_queries = [query['sql'] for query in queries.captured_queries
+                          if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(finder_queries), 3)  # incomplete count, complete count, rates
+        for sql in finder_queries:
+            self.assertIn('BETWEEN', sql)
+            self.assertLess(len(sql), 1000)
+
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_forward_fill_non_publication_days(self, mock_populate):
+        # Weekends and closed days get the rates of the last publication day, and are not fetched
+        calendar = PublicationCalendar.objects.create(credentials=Credentials.objects.get(name='Mock'))
+        ClosedDay.objects.create(calendar=calendar, date=date(2025, 1, 2), name='Holiday')
+
+        def side_effect(code_source_currency, start_date, end_date):
+            for day, value in ((3, 0.95), (6, 0.96)):
+                for currency in (self.eur, self.gbp):
+                    CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=currency,
+                                                        valuation_date=date(2025, 1, day), rate_value=value)
+
+        mock_populate.side_effect = side_effect
+        finder = ExchangeFinder(source_currency='USD', start_date='2025-01-02', end_date='2025-01-06',
+                                forward_fill=True)
+
+        columns = finder.get_currency_rates_columns()
+
+        self.assertEqual(columns.to_dict(), {
+            '2025-01-02': {'EUR': 0.93, 'GBP': 0.80},
+            '2025-01-03': {'EUR': 0.95, 'GBP': 0.95},
+            '2025-01-04': {'EUR': 0.95, 'GBP': 0.95},
+            '2025-01-05': {'EUR': 0.95, 'GBP': 0.95},
+            '2025-01-06': {'EUR': 0.96, 'GBP': 0.96},
+        })
+        self.assertEqual(columns.filled, {date(2025, 1, 2), date(2025, 1, 4), date(2025, 1, 5)})
+        mock_populate.assert_called_once_with(code_source_currency='USD', start_date='2025-01-01',
+                                              end_date='2025-01-06')
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 6)
+
+        finder.get_currency_rates_columns()
+        mock_populate.assert_called_once()
+
+    @patch('exchange_rates.libs.exchange_finder.populate')
+    def test_forward_fill_publication_days_the_provider_skipped(self, mock_populate):
+        # Friday 3 is a publication day of the calendar, but the provider has no rates for it
+        PublicationCalendar.objects.create(credentials=Credentials.objects.get(name='Mock'))
+
+        def side_effect(code_source_currency, start_date, end_date):
+            for day, value in ((2, 0.94), (6, 0.96)):
+                for currency in (self.eur, self.gbp):
+                    CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=currency,
+                                                        valuation_date=date(2025, 1, day), rate_value=value)
+
+        mock_populate.side_effect = side_effect
+        finder = ExchangeFinder(source_currency='USD', start_date='2025-01-02', end_date='2025-01-06',
+                                forward_fill=True)
+
+        columns = finder.get_currency_rates_columns()
+
+        mock_populate.assert_called_once()
+        self.assertEqual(columns.to_dict()['2025-01-03'], {'EUR': 0.94, 'GBP': 0.94})
+        self.assertEqual(columns.filled, {date(2025, 1, 3), date(2025, 1, 4), date(2025, 1, 5)})
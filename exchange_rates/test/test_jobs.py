@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from currencies.models import Currency
+from exchange_rates.libs.jobs import claim_job, enqueue, enqueue_refreshes, run_job, run_pending
+from exchange_rates.libs.populate import stale_currencies
+from exchange_rates.models import CurrencyExchangeRate, FetchJob
+from my_currency.routers import primary_pinned, wrote_primary
+
+
+@override_settings(FETCH_JOB_MAX_ATTEMPTS=2, FETCH_JOB_BACKOFF=30, FETCH_JOB_LEASE=60)
+class FetchJobTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+
+    def test_identical_pending_jobs_are_deduplicated(self):
+        job = enqueue(self.usd, date(2025, 1, 10))
+        self.assertIsNone(enqueue(self.usd, date(2025, 1, 12)))
+        self.assertIsNone(enqueue(self.usd, date(2025, 1, 5), kind=FetchJob.BACKFILL))
+        self.assertIsNotNone(enqueue(self.eur, date(2025, 1, 10)))
+
+        job.refresh_from_db()
+        self.assertEqual(job.start_date, date(2025, 1, 5))
+        self.assertEqual(FetchJob.objects.filter(source_currency=self.usd).count(), 1)
+
+        FetchJob.objects.filter(pk=job.pk).update(state=FetchJob.DONE)
+        self.assertIsNotNone(enqueue(self.usd, date(2025, 1, 12)))
+
+    def test_queued_refreshes_are_not_inserted_again(self):
+        self.assertEqual(len(enqueue_refreshes({self.usd: date(2025, 1, 10), self.eur: date(2025, 1, 10)})), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(enqueue_refreshes({self.usd: date(2025, 1, 12), self.eur: date(2025, 1, 10)}), [])
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+
+        # An earlier start date moves the pending job, as enqueue() does
+        self.assertEqual(enqueue_refreshes({self.eur: date(2025, 1, 5)}), [])
+        self.assertEqual(FetchJob.objects.get(source_currency=self.eur).start_date, date(2025, 1, 5))
+        self.assertEqual(FetchJob.objects.get(source_currency=self.usd).start_date, date(2025, 1, 10))
+
+    def test_queued_refreshes_do_not_pin_the_request(self):
+        with primary_pinned(False):
+            enqueue_refreshes({self.usd: date(2025, 1, 10)})
+
+            self.assertFalse(wrote_primary())
+        self.assertEqual(FetchJob.objects.get().source_currency, self.usd)
+
+    def test_stale_currencies(self):
+        today = date.today()
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=today - timedelta(days=3), rate_value=0.9)
+        CurrencyExchangeRate.objects.create(source_currency=self.eur, exchanged_currency=self.usd,
+                                            valuation_date=today, rate_value=1.1)
+
+        stale_currencies()
+        # One query over the currencies, each last date being an index seek
+        with self.assertNumQueries(1):
+            self.assertEqual(stale_currencies(), {self.usd: today - timedelta(days=3)})
+
+    def test_claim_is_compare_and_set(self):
+        job = enqueue(self.usd, date(2025, 1, 10))
+
+        claimed = claim_job()
+        self.assertEqual((claimed.pk, claimed.state, claimed.attempts, claimed.version),
+                         (job.pk, FetchJob.RUNNING, 1, 1))
+        self.assertIsNone(claim_job())
+        # A worker that read the job before the claim cannot claim it any more
+        self.assertEqual(FetchJob.objects.filter(pk=job.pk, version=0).update(state=FetchJob.RUNNING), 0)
+
+    def test_expired_lease_is_claimed_again(self):
+        job = enqueue(self.usd, date(2025, 1, 10))
+        claim_job()
+        FetchJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim_job().attempts, 2)
+        FetchJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(claim_job())
+        self.assertEqual(FetchJob.objects.get(pk=job.pk).state, FetchJob.FAILED)
+
+    @patch('exchange_rates.libs.populate.populate')
+    def test_run_job_marks_done(self, mock_populate):
+        enqueue(self.usd, date(2025, 1, 10))
+
+        self.assertTrue(run_job(claim_job()))
+
+        mock_populate.assert_called_once_with('USD', '2025-01-10')
+        self.assertEqual(FetchJob.objects.get().state, FetchJob.DONE)
+
+    @patch('exchange_rates.libs.populate.populate', side_effect=ValueError("There is no Provider"))
+    def test_failed_jobs_are_retried_with_backoff(self, mock_populate):
+        job = enqueue(self.usd, date(2025, 1, 10))
+
+        self.assertFalse(run_job(claim_job()))
+        job.refresh_from_db()
+        self.assertEqual(job.state, FetchJob.PENDING)
+        self.assertIn("There is no Provider", job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+        self.assertIsNone(claim_job())
+
+        FetchJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertFalse(run_job(claim_job()))
+        self.assertEqual(FetchJob.objects.get(pk=job.pk).state, FetchJob.FAILED)
+
+    @patch('exchange_rates.libs.populate.populate')
+    def test_worker_runs_due_jobs(self, mock_populate):
+        enqueue(self.usd, date(2025, 1, 10))
+        later = enqueue(self.eur, date(2025, 1, 10))
+        FetchJob.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(hours=1))
+
+        out = StringIO()
+        call_command('fetch_worker', '--once', stdout=out)
+
+        self.assertIn('Ran 1 jobs', out.getvalue())
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(FetchJob.objects.get(pk=later.pk).state, FetchJob.PENDING)
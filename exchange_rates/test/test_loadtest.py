@@ -0,0 +1,107 @@
+import asyncio
+import os
+import socket
+import struct
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from currencies.models import Currency
+from exchange_rates.libs.loadtest import HttpConnection, RequestMix, basic_auth, parse_mix, percentile, run_load
+from exchange_rates.management.commands.loadtest import _server_command, _server_env
+from providers.models import Credentials
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('convert=4, list=1'), {'convert': 4.0, 'list': 1.0})
+        self.assertEqual(parse_mix('list'), {'list': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('convert=4,history=1')
+        with self.assertRaises(ValueError):
+            parse_mix('convert=0')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_request_mix(self):
+        requests = RequestMix({'convert': 1}, 'USD', ['EUR', 'GBP'], seed=1)
+        name, path = requests.next()
+        self.assertEqual(name, 'convert')
+        self.assertTrue(path.startswith('/api/v1/convert_amount/?source_currency=USD&exchanged_currency=EUR%2CGBP'))
+
+    def test_server_state_is_isolated(self):
+        env = _server_env('/tmp/loadtest-abc')
+
+        self.assertEqual(env['MY_CURRENCY_PROVIDER_CACHE_MODE'], 'off')
+        for name in ('MY_CURRENCY_DB', 'MY_CURRENCY_PROVIDER_CACHE_DIR', 'MY_CURRENCY_RATE_STORE_DIR'):
+            self.assertEqual(os.path.dirname(env[name]), '/tmp/loadtest-abc')
+        self.assertEqual(env['MY_CURRENCY_RATE_SHM_NAME'], 'my_currency_loadtest-abc')
+        self.assertEqual(env['MY_CURRENCY_DEBUG'], '0')
+
+    def test_server_command(self):
+        self.assertEqual(_server_command('gunicorn --bind 127.0.0.1:{port} my_currency.wsgi', 8123),
+                         ['gunicorn', '--bind', '127.0.0.1:8123', 'my_currency.wsgi'])
+        self.assertEqual(_server_command(None, 8123)[-3:], ['runserver', '127.0.0.1:8123', '--noreload'])
+
+    def test_reset_connection_is_opened_again(self):
+        # The server answers one request per connection and then resets it, without closing it cleanly
+        async def handle(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+            try:
+                await reader.readuntil(b'\r\n\r\n')
+            except asyncio.IncompleteReadError:
+                pass
+            writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            connection = HttpConnection('127.0.0.1', server.sockets[0].getsockname()[1])
+            async with server:
+                try:
+                    return [await connection.get('/') for _ in range(3)]
+                finally:
+                    connection.close()
+                    await asyncio.sleep(0.05)
+
+        self.assertEqual(asyncio.run(run()), [(200, b'ok')] * 3)
+
+
+class RunLoadTests(LiveServerTestCase):
+    def setUp(self):
+        User.objects.create_user(username='loadtest', password='loadtest')
+        Currency.objects.create(code='USD', name='US Dollar')
+        Currency.objects.create(code='EUR', name='Euro')
+        Credentials.objects.create(name='Mock', token='random', url='www.url.com', enabled=True, priority=1)
+        url = urlsplit(self.live_server_url)
+        self.host, self.port = url.hostname, url.port
+
+    def test_requests_are_measured_by_endpoint(self):
+        requests = RequestMix({'convert': 1, 'list': 1}, 'USD', ['EUR'], days=3, seed=1)
+        headers = basic_auth('loadtest', 'loadtest')
+        # Fetch the range first, as the command does: the in-memory test database is locked by concurrent writes
+        asyncio.run(run_load(self.host, self.port, RequestMix({'list': 1}, 'USD', ['EUR'], days=3), 1, total=1,
+                             headers=headers))
+
+        result = asyncio.run(run_load(self.host, self.port, requests, 3, total=12, headers=headers))
+
+        summary = result.summary()
+        self.assertEqual(summary['total']['requests'], 12)
+        self.assertEqual(summary['total']['errors'], 0)
+        self.assertEqual(summary['convert']['requests'] + summary['list']['requests'], 12)
+        self.assertLessEqual(summary['total']['p50'], summary['total']['p99'])
+
+    def test_failed_requests_are_errors(self):
+        requests = RequestMix({'convert': 1}, 'USD', ['EUR'])
+
+        result = asyncio.run(run_load(self.host, self.port, requests, 2, total=4))
+
+        self.assertEqual(result.summary()['total']['errors'], 4)
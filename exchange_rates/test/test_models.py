@@ -0,0 +1,57 @@
+from datetime import date
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+
+from currencies.models import Currency
+from exchange_rates.models import CurrencyExchangeRate
+
+migration = import_module('exchange_rates.migrations.0002_rate_pair_date_unique')
+
+
+class CurrencyExchangeRateSchemaTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+
+    def test_duplicate_rate_rejected(self):
+        # The same pair can only have one rate per valuation date
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=date(2025, 1, 1), rate_value=0.93)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                                valuation_date=date(2025, 1, 1), rate_value=0.94)
+
+    def test_only_composite_index_on_filtered_columns(self):
+        # rate_value, valuation_date and source_currency have no single-column index any more
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, CurrencyExchangeRate._meta.db_table)
+        indexed = {tuple(info['columns']) for info in constraints.values()
+                   if info['index'] or info['unique']}
+        self.assertIn(('source_currency_id', 'valuation_date', 'exchanged_currency_id'), indexed)
+        self.assertNotIn(('rate_value',), indexed)
+        self.assertNotIn(('valuation_date',), indexed)
+        self.assertNotIn(('source_currency_id',), indexed)
+
+    def test_delete_duplicate_rates_keeps_oldest_row(self):
+        # The migration clean-up keeps the first row of every duplicated group, chunk by chunk
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX unique_rate_per_pair_and_date')
+        first = CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                                    valuation_date=date(2025, 1, 1), rate_value=0.93)
+        for value in (0.94, 0.95):
+            CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                                valuation_date=date(2025, 1, 1), rate_value=value)
+        other = CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                                    valuation_date=date(2025, 1, 2), rate_value=0.96)
+        chunk_size, migration.CHUNK_SIZE = migration.CHUNK_SIZE, 2
+        try:
+            migration.delete_duplicate_rates(apps, SimpleNamespace(connection=connection))
+        finally:
+            migration.CHUNK_SIZE = chunk_size
+
+        self.assertEqual(list(CurrencyExchangeRate.objects.order_by('id').values_list('id', flat=True)),
+                         [first.id, other.id])
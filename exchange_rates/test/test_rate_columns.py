@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from exchange_rates.libs.rate_columns import RateColumns
+
+
+class RateColumnsTests(SimpleTestCase):
+    def setUp(self):
+        self.columns = RateColumns.from_rows([(date(2025, 1, 1), 2, 0.9), (date(2025, 1, 1), 3, 0.8),
+                                              (date(2025, 1, 2), 3, 0.81)], {2: 'EUR', 3: 'GBP'})
+
+    def test_from_rows(self):
+        self.assertEqual(self.columns.dates, [date(2025, 1, 1), date(2025, 1, 2)])
+        self.assertEqual(self.columns.codes, ('EUR', 'GBP'))
+        self.assertEqual(len(self.columns.rates), 4)
+        self.assertEqual(len(self.columns), 2)
+
+    def test_to_dict_skips_missing_rates(self):
+        self.assertEqual(self.columns.to_dict(), {'2025-01-01': {'EUR': 0.9, 'GBP': 0.8},
+                                                  '2025-01-02': {'GBP': 0.81}})
+
+    def test_from_mapping(self):
+        columns = RateColumns.from_mapping({date(2025, 1, 2): {3: 0.81}, date(2025, 1, 1): {2: 0.9, 3: 0.8}},
+                                           {2: 'EUR', 3: 'GBP'})
+        self.assertEqual(columns.to_dict(), self.columns.to_dict())
+
+    def test_iter_json(self):
+        self.assertEqual(''.join(self.columns.iter_json()),
+                         '{"2025-01-01":{"EUR":0.9,"GBP":0.8},"2025-01-02":{"GBP":0.81}}')
+        self.assertEqual(''.join(RateColumns([], ('EUR',), []).iter_json()), '{}')
+
+    def test_iter_csv(self):
+        self.assertEqual(''.join(self.columns.iter_csv()),
+                         'date,EUR,GBP\r\n2025-01-01,0.9,0.8\r\n2025-01-02,,0.81\r\n')
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from currencies.models import Currency
+from exchange_rates.libs.rate_events import DatabaseChannel, rate_hub
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate, RateEvent
+
+
+class RateHubTests(TestCase):
+    def setUp(self):
+        rate_hub.reset()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+
+    def tearDown(self):
+        rate_hub.reset()
+
+    def rate(self, source, exchanged, day, value):
+        return CurrencyExchangeRate(source_currency=source, exchanged_currency=exchanged,
+                                    valuation_date=date(2025, 1, day), rate_value=value)
+
+    def test_events_reach_matching_subscriptions(self):
+        everything = rate_hub.subscribe()
+        usd = rate_hub.subscribe(sources=['USD'])
+        usd_gbp = rate_hub.subscribe(pairs=[('USD', 'GBP')])
+        eur = rate_hub.subscribe(sources=['EUR'])
+
+        rate_hub.publish([self.rate(self.usd, self.eur, 1, 0.93), self.rate(self.usd, self.gbp, 1, 0.80),
+                          self.rate(self.usd, self.eur, 2, 0.94)])
+
+        events = [{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93, 'GBP': 0.80}},
+                  {'source': 'USD', 'date': '2025-01-02', 'rates': {'EUR': 0.94}}]
+        self.assertEqual(everything.get(timeout=0), events)
+        self.assertEqual(usd.get(timeout=0), events)
+        self.assertEqual(usd_gbp.get(timeout=0), [{'source': 'USD', 'date': '2025-01-01', 'rates': {'GBP': 0.80}}])
+        self.assertEqual(eur.get(timeout=0), [])
+
+    @override_settings(RATE_EVENTS_BUFFER=2)
+    def test_slow_subscription_drops_oldest_events(self):
+        subscription = rate_hub.subscribe(sources=['USD'])
+
+        for day in (1, 2, 3):
+            rate_hub.publish([self.rate(self.usd, self.eur, day, 0.93)])
+
+        self.assertEqual([event['date'] for event in subscription.get(timeout=0)], ['2025-01-02', '2025-01-03'])
+
+    def test_closed_subscription_gets_nothing(self):
+        subscription = rate_hub.subscribe(pairs=[('USD', 'EUR')])
+        subscription.close()
+
+        rate_hub.publish([self.rate(self.usd, self.eur, 1, 0.93)])
+
+        self.assertEqual(subscription.get(timeout=0), [])
+        self.assertEqual(rate_hub.by_source, {})
+
+    def test_subscription_read_by_coroutine(self):
+        # Events published by another thread wake the coroutine waiting on the subscription
+        subscription = rate_hub.subscribe(sources=['USD'])
+
+        async def read():
+            subscription.bind(asyncio.get_running_loop())
+            self.assertEqual(await subscription.aget(timeout=0), [])
+            threading.Timer(0.05, rate_hub.deliver,
+                            [[{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93}}]]).start()
+            return await subscription.aget(timeout=5)
+
+        self.assertEqual(asyncio.run(read()), [{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93}}])
+
+    def test_writer_publishes_on_commit(self):
+        subscription = rate_hub.subscribe()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RateWriter().write([self.rate(self.usd, self.eur, 1, 0.93)])
+            self.assertEqual(subscription.get(timeout=0), [])
+
+        self.assertEqual(subscription.get(timeout=0),
+                         [{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93}}])
+
+    def test_database_channel(self):
+        # Published events are stored, and delivered by the poll of every process
+        channel = DatabaseChannel(rate_hub)
+        channel.poll()
+        subscription = rate_hub.subscribe()
+
+        channel.publish([{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93}}])
+        self.assertEqual(subscription.get(timeout=0), [])
+        channel.poll()
+
+        self.assertEqual(subscription.get(timeout=0),
+                         [{'source': 'USD', 'date': '2025-01-01', 'rates': {'EUR': 0.93}}])
+        self.assertEqual(RateEvent.objects.count(), 1)
+        channel.poll()
+        self.assertEqual(subscription.get(timeout=0), [])
+
+
+@override_settings(RATE_EVENTS_KEEPALIVE=0.01)
+class RateStreamViewTests(TestCase):
+    def setUp(self):
+        rate_hub.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+
+    def tearDown(self):
+        rate_hub.reset()
+
+    def test_rate_stream(self):
+        response = self.client.get(reverse('v1:rate_stream'), {'pairs': 'USD-EUR'},
+                                   HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b": subscribed\n\n")
+        self.assertEqual(next(stream), b": keepalive\n\n")
+
+        rate_hub.publish([CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=self.eur,
+                                               valuation_date=date(2025, 1, 1), rate_value=0.93)])
+
+        self.assertEqual(next(stream),
+                         b'event: rates\ndata: {"source":"USD","date":"2025-01-01","rates":{"EUR":0.93}}\n\n')
+        response.close()
+        self.assertEqual(rate_hub.by_source, {})
+
+    def test_unread_stream_leaves_no_subscription(self):
+        response = self.client.get(reverse('v1:rate_stream'), {'sources': 'USD'}, HTTP_ACCEPT='text/event-stream')
+        response.close()
+
+        self.assertEqual(rate_hub.by_source, {})
+
+    def test_rate_stream_invalid_currency(self):
+        for params in ({'sources': 'XXX'}, {'pairs': 'USD'}, {'pairs': 'USD-EUR-GBP'}):
+            response = self.client.get(reverse('v1:rate_stream'), params, HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,96 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from currencies.models import Currency
+from exchange_rates.libs.rate_matrix import rate_matrix
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class RateMatrixTests(TestCase):
+    def setUp(self):
+        rate_matrix.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        for source, exchanged, day, value in ((self.usd, self.eur, 1, 0.93), (self.usd, self.eur, 2, 0.94),
+                                              (self.usd, self.gbp, 1, 0.80), (self.eur, self.usd, 1, 1.07)):
+            CurrencyExchangeRate.objects.create(source_currency=source, exchanged_currency=exchanged,
+                                                valuation_date=date(2025, 1, day), rate_value=value)
+
+    def tearDown(self):
+        rate_matrix.clear()
+
+    def test_latest_rate_of_every_pair(self):
+        # Latest date of each pair, their rates and the currency registry
+        with self.assertNumQueries(3):
+            matrix = rate_matrix.get()
+
+        self.assertEqual(matrix, {'EUR': {'date': '2025-01-01', 'rates': {'USD': 1.07}},
+                                  'USD': {'date': '2025-01-02', 'rates': {'EUR': 0.94, 'GBP': 0.80}}})
+        with self.assertNumQueries(0):
+            self.assertEqual(rate_matrix.get(sources=['USD', 'GBP'], targets=['GBP']),
+                             {'USD': {'date': '2025-01-01', 'rates': {'GBP': 0.80}}})
+
+    def test_matrix_is_refreshed_on_write(self):
+        rate_matrix.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RateWriter().write([
+                CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=self.gbp,
+                                     valuation_date=date(2025, 1, 3), rate_value=0.81),
+                # Older than the rate in the matrix
+                CurrencyExchangeRate(source_currency=self.eur, exchanged_currency=self.usd,
+                                     valuation_date=date(2024, 12, 31), rate_value=1.05)])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(rate_matrix.get(), {'EUR': {'date': '2025-01-01', 'rates': {'USD': 1.07}},
+                                                 'USD': {'date': '2025-01-03', 'rates': {'EUR': 0.94, 'GBP': 0.81}}})
+
+    @override_settings(RATE_MATRIX_TTL=60)
+    def test_matrix_is_reloaded_after_ttl(self):
+        rate_matrix.get()
+        # Stored by another process: no event reaches this one
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.gbp,
+                                            valuation_date=date(2025, 1, 3), rate_value=0.81)
+        rate_matrix.loaded -= 60
+
+        # The request reading the expired matrix does not wait for the reload
+        with patch('exchange_rates.libs.rate_matrix.threading.Thread') as thread, self.assertNumQueries(0):
+            self.assertEqual(rate_matrix.get(sources=['USD'])['USD']['date'], '2025-01-02')
+            rate_matrix.get()
+        thread.assert_called_once_with(target=rate_matrix._reload_in_background, daemon=True)
+
+        rate_matrix.reload()
+        self.assertEqual(rate_matrix.get(sources=['USD']),
+                         {'USD': {'date': '2025-01-03', 'rates': {'EUR': 0.94, 'GBP': 0.81}}})
+
+    def test_events_received_while_reloading_are_kept(self):
+        rate_matrix.get()
+        load = rate_matrix._load
+
+        def load_then_receive():
+            rates = load()
+            rate_matrix.update({'source': 'EUR', 'date': '2025-01-04', 'rates': {'GBP': 0.85}})
+            return rates
+
+        with patch.object(rate_matrix, '_load', side_effect=load_then_receive):
+            rate_matrix.reload()
+
+        self.assertEqual(rate_matrix.get(sources=['EUR']),
+                         {'EUR': {'date': '2025-01-04', 'rates': {'GBP': 0.85, 'USD': 1.07}}})
+
+    def test_rate_matrix_view(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='testuser', password='testpass'))
+        url = reverse('v1:rate_matrix')
+
+        response = client.get(url, {'sources': 'EUR,USD', 'targets': 'USD'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'EUR': {'date': '2025-01-01', 'rates': {'USD': 1.07}}})
+        self.assertEqual(client.get(url, {'targets': 'XXX'}).status_code, 400)
@@ -0,0 +1,115 @@
+import multiprocessing
+from array import array
+import tempfile
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.libs.exchange_finder import ExchangeFinder
+from exchange_rates.libs.rate_store import RateStore, rate_store
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate
+
+
+def append_in_child(directory, source_id, exchanged_id, first, days):
+    RateStore(directory).append([
+        CurrencyExchangeRate(source_currency_id=source_id, exchanged_currency_id=exchanged_id,
+                             valuation_date=first + timedelta(days=day), rate_value=exchanged_id + day / 100)
+        for day in range(days)])
+
+
+class RateStoreTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(RATE_STORE_DIR=self.directory.name, RATE_STORE_COLUMNS=2)
+        self.settings_override.enable()
+        self.store = RateStore()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.directory.cleanup()
+        currency_registry.clear()
+
+    def rates(self, exchanged, first, days, value=1.5):
+        return [CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=exchanged,
+                                     valuation_date=first + timedelta(days=day), rate_value=value + day / 100)
+                for day in range(days)]
+
+    def test_append_and_read(self):
+        self.store.append(self.rates(self.eur, date(2025, 1, 1), 3))
+
+        self.assertEqual(self.store.read(self.usd.id, date(2025, 1, 2), date(2025, 1, 3), [self.eur.id]),
+                         array('d', [1.51, 1.52]))
+
+    def test_missing_rates_read_as_none(self):
+        self.store.append(self.rates(self.eur, date(2025, 1, 1), 3))
+        self.store.append(self.rates(self.eur, date(2025, 1, 5), 1))
+
+        self.assertIsNone(self.store.read(self.usd.id, date(2025, 1, 1), date(2025, 1, 5), [self.eur.id]))
+        self.assertIsNone(self.store.read(self.usd.id, date(2025, 1, 1), date(2025, 1, 9), [self.eur.id]))
+        self.assertIsNone(self.store.read(self.usd.id, date(2025, 1, 1), date(2025, 1, 1), [self.gbp.id]))
+        self.assertIsNone(self.store.read(self.eur.id, date(2025, 1, 1), date(2025, 1, 1), [self.usd.id]))
+
+    def test_layout_grows_with_earlier_dates_and_new_currencies(self):
+        self.store.append(self.rates(self.eur, date(2025, 1, 10), 2))
+        self.store.append(self.rates(self.eur, date(2024, 12, 30), 11, value=2))
+        self.store.append(self.rates(self.gbp, date(2024, 12, 30), 13, value=3))
+        third = Currency.objects.create(code='CHF', name='Swiss Franc')
+        self.store.append(self.rates(third, date(2024, 12, 30), 13, value=4))
+
+        # Row by date, one column per requested currency in the order given
+        stored = self.store.read(self.usd.id, date(2024, 12, 30), date(2025, 1, 11),
+                                 [third.id, self.eur.id, self.gbp.id])
+        self.assertEqual(len(stored), 13 * 3)
+        self.assertEqual(stored[11 * 3:12 * 3], array('d', [4.11, 1.5, 3.11]))
+        self.assertEqual(stored[10 * 3 + 1], 2.1)
+        self.assertEqual(stored[12 * 3 + 1], 1.51)
+
+    def test_processes_append_concurrently(self):
+        # Every process adds a currency (and earlier dates), rewriting the file: no rows are lost
+        context = multiprocessing.get_context('fork')
+        children = [context.Process(target=append_in_child,
+                                    args=(self.directory.name, self.usd.id, 100 + index,
+                                          date(2025, 1, 10) - timedelta(days=index), 20))
+                    for index in range(6)]
+        for child in children:
+            child.start()
+        for child in children:
+            child.join(30)
+
+        for index in range(6):
+            first = date(2025, 1, 10) - timedelta(days=index)
+            rates = self.store.read(self.usd.id, first, first + timedelta(days=19), [100 + index])
+            self.assertIsNotNone(rates)
+            self.assertEqual(rates[19], 100 + index + 0.19)
+
+    @override_settings(RATE_STORE_ENABLED=True)
+    def test_writer_appends_and_finder_reads_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RateWriter().write(self.rates(self.eur, date(2025, 1, 1), 3) + self.rates(self.gbp, date(2025, 1, 1), 3))
+        self.assertIsNotNone(rate_store.read(self.usd.id, date(2025, 1, 1), date(2025, 1, 3), [self.eur.id]))
+
+        finder = ExchangeFinder('USD', '2025-01-01', '2025-01-03')
+        with self.assertNumQueries(0):
+            out = finder.get_currency_rates_list()
+        self.assertEqual(out['2025-01-03'], {'EUR': 1.52, 'GBP': 1.52})
+
+    @override_settings(RATE_STORE_ENABLED=True)
+    def test_build_command(self):
+        CurrencyExchangeRate.objects.bulk_create(self.rates(self.eur, date(2025, 1, 1), 5)
+                                                 + self.rates(self.gbp, date(2025, 1, 1), 5))
+
+        call_command('build_rate_store', '--chunk-size', '3', stdout=open('/dev/null', 'w'))
+
+        finder = ExchangeFinder('USD', '2025-01-01', '2025-01-05')
+        self.assertEqual(finder._stored_rates().to_dict(), {
+            day: {'EUR': rate, 'GBP': rate} for day, rate in [('2025-01-01', 1.5), ('2025-01-02', 1.51),
+                                                              ('2025-01-03', 1.52), ('2025-01-04', 1.53),
+                                                              ('2025-01-05', 1.54)]})
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.libs.rollup import get_rollups, period_start, rebuild_rollups
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate, CurrencyExchangeRateRollup
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.writer = RateWriter()
+
+    def tearDown(self):
+        currency_registry.clear()
+
+    def rates(self, first, days):
+        return [CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=self.eur,
+                                     valuation_date=first + timedelta(days=day), rate_value=1 + (day % 7) / 10)
+                for day in range(days)]
+
+    def snapshot(self):
+        return list(CurrencyExchangeRateRollup.objects.order_by('granularity', 'period_start').values_list(
+            'granularity', 'period_start', 'open_value', 'high_value', 'low_value', 'close_value',
+            'total_value', 'days'))
+
+    def test_period_start(self):
+        day = date(2025, 3, 13)  # Thursday
+        self.assertEqual(period_start(day, 'week'), date(2025, 3, 10))
+        self.assertEqual(period_start(day, 'month'), date(2025, 3, 1))
+        self.assertEqual(period_start(day, 'year'), date(2025, 1, 1))
+        with self.assertRaises(ValueError):
+            period_start(day, 'day')
+
+    def test_writer_merges_rollups_incrementally(self):
+        # Writing in several out-of-order chunks gives the same rollups as a rebuild
+        rates = self.rates(date(2024, 12, 20), 60)
+        self.writer.write(rates[30:])
+        self.writer.write(rates[:10])
+        self.writer.write(rates[5:30])
+        incremental = self.snapshot()
+
+        rebuild_rollups()
+
+        self.assertEqual(incremental, self.snapshot())
+        year_2025 = CurrencyExchangeRateRollup.objects.get(granularity='year', period_start=date(2025, 1, 1))
+        self.assertEqual(year_2025.days, 48)
+        self.assertEqual(year_2025.open_date, date(2025, 1, 1))
+        self.assertEqual(year_2025.close_date, date(2025, 2, 17))
+
+    def test_get_rollups(self):
+        self.writer.write(self.rates(date(2025, 1, 1), 14))
+
+        out = get_rollups('USD', 'month', '2025-01-10', '2025-01-31')
+
+        self.assertEqual(list(out), ['2025-01-01'])
+        self.assertEqual(out['2025-01-01']['EUR'], {'open': 1.0, 'high': 1.6, 'low': 1.0, 'close': 1.6,
+                                                    'average': 1.3, 'days': 14})
+
+    def test_rebuild_command(self):
+        CurrencyExchangeRate.objects.bulk_create(self.rates(date(2025, 1, 1), 3))
+
+        call_command('rebuild_rollups', '--source-currency', 'USD', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(CurrencyExchangeRateRollup.objects.count(), 3)
+
+    def test_rollups_follow_single_rate_changes(self):
+        # Rates edited or deleted one by one (admin) recompute the rollups of their periods
+        self.writer.write(self.rates(date(2025, 1, 1), 14))
+        rate = CurrencyExchangeRate.objects.get(valuation_date=date(2025, 1, 3))
+        rate.rate_value = 5
+        rate.save()
+        CurrencyExchangeRate.objects.get(valuation_date=date(2025, 1, 14)).delete()
+        moved = CurrencyExchangeRate.objects.get(valuation_date=date(2025, 1, 13))
+        moved.valuation_date = date(2025, 2, 1)
+        moved.save()
+        incremental = self.snapshot()
+
+        rebuild_rollups()
+
+        self.assertEqual(incremental, self.snapshot())
+        january = CurrencyExchangeRateRollup.objects.get(granularity='month', period_start=date(2025, 1, 1))
+        self.assertEqual((january.high_value, january.days), (5, 12))
+
+    def test_migration_backfills_rollups(self):
+        CurrencyExchangeRate.objects.bulk_create(self.rates(date(2025, 1, 1), 3))
+        migration = import_module('exchange_rates.migrations.0006_backfill_rate_rollups')
+
+        migration.backfill_rollups(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(CurrencyExchangeRateRollup.objects.count(), 3)
+        self.assertEqual(CurrencyExchangeRateRollup.objects.get(granularity='year').days, 3)
@@ -0,0 +1,72 @@
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from currencies.models import Currency
+from exchange_rates.models import CurrencyExchangeRate
+from my_currency.middleware import PIN_COOKIE, PrimaryPinMiddleware
+from my_currency.routers import ReadReplicaRouter, pin_primary, primary_pinned
+
+
+@override_settings(DATABASE_READ_ALIAS='replica')
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_rate_and_currency_reads_go_to_replica(self):
+        with primary_pinned(False):
+            self.assertEqual(self.router.db_for_read(CurrencyExchangeRate), 'replica')
+            self.assertEqual(self.router.db_for_read(Currency), 'replica')
+            self.assertIsNone(self.router.db_for_read(User))
+            with patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Currency), 'default')
+
+    def test_reads_after_a_write_stay_on_primary(self):
+        with primary_pinned(False):
+            self.assertEqual(self.router.db_for_write(CurrencyExchangeRate), 'default')
+            self.assertEqual(self.router.db_for_read(CurrencyExchangeRate), 'default')
+        with primary_pinned(False):
+            self.assertEqual(self.router.db_for_read(CurrencyExchangeRate), 'replica')
+            pin_primary()
+            self.assertEqual(self.router.db_for_read(CurrencyExchangeRate), 'default')
+
+    def test_middleware_pins_the_client_that_wrote(self):
+        routes = []
+
+        def view(request):
+            routes.append(self.router.db_for_read(Currency))
+            if request.GET.get('write'):
+                self.router.db_for_write(Currency)
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(view)
+        response = middleware(self.factory.get('/', {'write': 1}))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        self.assertNotIn(PIN_COOKIE, middleware(self.factory.get('/')).cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        middleware(request)
+        middleware(self.factory.post('/'))
+        self.assertEqual(routes, ['replica', 'replica', 'default', 'default'])
+
+
+class ReplicateDbTests(TransactionTestCase):
+    def test_copies_primary_to_replica_file(self):
+        Currency.objects.create(code='USD', name='US Dollar')
+        with tempfile.NamedTemporaryFile(suffix='.sqlite3') as file:
+            call_command('replicate_db', '--path', file.name, stdout=StringIO())
+            replica = sqlite3.connect(file.name)
+            try:
+                codes = replica.execute('SELECT code FROM currencies_currency').fetchall()
+            finally:
+                replica.close()
+        self.assertEqual(codes, [('USD',)])
@@ -0,0 +1,115 @@
+import multiprocessing
+import struct
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from exchange_rates.libs import shared_rates as shared_rates_module
+from exchange_rates.libs.exchange_finder import ExchangeFinder
+from exchange_rates.libs.shared_rates import SharedRates
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate
+
+
+def read_in_child(name, source_id, day, exchanged_ids, results):
+    results.put(SharedRates(name).get_range(source_id, day, day, exchanged_ids))
+
+
+@override_settings(RATE_SHM_DAYS=4, RATE_SHM_CURRENCIES=3)
+class SharedRatesTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        self.today = date.today()
+        self.name = f"test_rates_{uuid.uuid4().hex[:8]}"
+        self.shared = SharedRates(self.name)
+
+    def tearDown(self):
+        self.shared.unlink()
+        currency_registry.clear()
+
+    def rate(self, exchanged, day, value, source=None):
+        return CurrencyExchangeRate(source_currency=source or self.usd, exchanged_currency=exchanged,
+                                    valuation_date=day, rate_value=value)
+
+    def test_put_and_get_range(self):
+        yesterday = self.today - timedelta(days=1)
+        self.shared.put([self.rate(self.eur, yesterday, 0.9), self.rate(self.eur, self.today, 0.91),
+                         self.rate(self.gbp, self.today, 0.8)])
+
+        self.assertEqual(self.shared.get_range(self.usd.id, yesterday, self.today, [self.eur.id]),
+                         {yesterday: {self.eur.id: 0.9}, self.today: {self.eur.id: 0.91}})
+        self.assertIsNone(self.shared.get_range(self.usd.id, yesterday, self.today, [self.eur.id, self.gbp.id]))
+        self.assertIsNone(self.shared.get_range(self.eur.id, self.today, self.today, [self.usd.id]))
+
+    def test_interrupted_write_does_not_block_readers(self):
+        # A writer killed during put() leaves the sequence odd: readers give up and use the database
+        self.shared.put([self.rate(self.eur, self.today, 0.91)])
+        buf = self.shared._segment().buf
+        struct.pack_into('<Q', buf, 8, struct.unpack_from('<Q', buf, 8)[0] + 1)
+
+        start = time.monotonic()
+        self.assertIsNone(self.shared.get_range(self.usd.id, self.today, self.today, [self.eur.id]))
+        self.assertLess(time.monotonic() - start, 1)
+
+        # The next write starts from an even sequence again
+        self.shared.put([self.rate(self.gbp, self.today, 0.8)])
+        self.assertEqual(self.shared.get_range(self.usd.id, self.today, self.today, [self.eur.id, self.gbp.id]),
+                         {self.today: {self.eur.id: 0.91, self.gbp.id: 0.8}})
+
+    def test_ring_drops_old_days(self):
+        old = self.today - timedelta(days=4)
+        self.shared.put([self.rate(self.eur, old, 0.9)])
+        self.shared.put([self.rate(self.eur, self.today, 0.91)])
+
+        # Same ring slot (4 days apart): the old day is replaced, older rates are ignored
+        self.assertIsNone(self.shared.get_range(self.usd.id, old, old, [self.eur.id]))
+        self.shared.put([self.rate(self.eur, old, 0.9)])
+        self.assertEqual(self.shared.get_range(self.usd.id, self.today, self.today, [self.eur.id]),
+                         {self.today: {self.eur.id: 0.91}})
+
+    def test_currencies_beyond_capacity_are_skipped(self):
+        chf = Currency.objects.create(code='CHF', name='Swiss Franc')
+        self.shared.put([self.rate(self.eur, self.today, 0.9), self.rate(self.gbp, self.today, 0.8),
+                         self.rate(chf, self.today, 0.95)])
+
+        self.assertIsNone(self.shared.get_range(self.usd.id, self.today, self.today, [chf.id]))
+
+    def test_new_segment_is_seeded_from_database(self):
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=self.today, rate_value=0.93)
+
+        self.assertEqual(self.shared.get_range(self.usd.id, self.today, self.today, [self.eur.id]),
+                         {self.today: {self.eur.id: 0.93}})
+
+    def test_other_processes_see_updates(self):
+        self.shared.put([self.rate(self.eur, self.today, 0.93)])
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+
+        child = context.Process(target=read_in_child,
+                                args=(self.name, self.usd.id, self.today, [self.eur.id], results))
+        child.start()
+        child.join(10)
+
+        self.assertEqual(results.get(timeout=5), {self.today: {self.eur.id: 0.93}})
+
+    def test_writer_publishes_and_finder_reads(self):
+        self.shared.put([self.rate(self.eur, self.today - timedelta(days=3), 0.7)])
+        with self.settings(RATE_SHM_ENABLED=True, RATE_SHM_NAME=self.name):
+            shared_rates_module.shared_rates.close()
+            with self.captureOnCommitCallbacks(execute=True):
+                RateWriter().write([self.rate(self.eur, self.today - timedelta(days=1), 0.9),
+                                    self.rate(self.gbp, self.today - timedelta(days=1), 0.8)])
+            finder = ExchangeFinder('USD', self.today.strftime('%Y-%m-%d'), self.today.strftime('%Y-%m-%d'))
+            with self.assertNumQueries(0):
+                as_of, rates = finder.get_latest_rates(2)
+            shared_rates_module.shared_rates.close()
+
+        self.assertEqual((as_of, rates), (self.today - timedelta(days=1), {'EUR': 0.9, 'GBP': 0.8}))
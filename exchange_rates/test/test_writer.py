@@ -0,0 +1,74 @@
+import threading
+from datetime import date
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from currencies.models import Currency
+from exchange_rates.libs.writer import RateWriter
+from exchange_rates.models import CurrencyExchangeRate
+
+
+class RateWriterTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        self.writer = RateWriter()
+
+    def rate(self, exchanged, day, value):
+        return CurrencyExchangeRate(source_currency=self.usd, exchanged_currency=exchanged,
+                                    valuation_date=date(2025, 1, day), rate_value=value)
+
+    def test_write_inserts_rates(self):
+        inserted = self.writer.write([self.rate(self.eur, 1, 0.93), self.rate(self.gbp, 1, 0.80)])
+
+        self.assertEqual(len(inserted), 2)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 2)
+
+    def test_write_skips_existing_and_repeated_rates(self):
+        # Rates already stored, or repeated in the same call, are not inserted twice
+        CurrencyExchangeRate.objects.create(source_currency=self.usd, exchanged_currency=self.eur,
+                                            valuation_date=date(2025, 1, 1), rate_value=0.93)
+
+        inserted = self.writer.write([self.rate(self.eur, 1, 0.99), self.rate(self.gbp, 1, 0.80),
+                                      self.rate(self.gbp, 1, 0.81)])
+
+        self.assertEqual([(rate.exchanged_currency.code, float(rate.rate_value)) for rate in inserted],
+                         [('GBP', 0.80)])
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 2)
+        self.assertEqual(float(CurrencyExchangeRate.objects.get(exchanged_currency=self.eur).rate_value), 0.93)
+
+    def test_write_nothing(self):
+        self.assertEqual(self.writer.write([]), [])
+
+
+@override_settings(RATE_WRITER_BACKGROUND=True, RATE_WRITER_LINGER_SECONDS=0.2)
+class RateWriterBackgroundTests(TransactionTestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.writer = RateWriter()
+
+    def test_concurrent_writes_are_batched(self):
+        # Requests queued while the writer lingers are committed in one transaction
+        results = {}
+        commit = RateWriter._commit
+
+        def write(day):
+            results[day] = self.writer.write([CurrencyExchangeRate(
+                source_currency=self.usd, exchanged_currency=self.eur,
+                valuation_date=date(2025, 1, day), rate_value=1)])
+            connection.close()
+
+        with patch.object(RateWriter, '_commit', autospec=True, side_effect=commit) as mock_commit:
+            threads = [threading.Thread(target=write, args=(day,)) for day in range(1, 6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(mock_commit.call_count, 1)
+        self.assertEqual(sum(len(inserted) for inserted in results.values()), 5)
+        self.assertEqual(CurrencyExchangeRate.objects.count(), 5)
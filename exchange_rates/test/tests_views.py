@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
@@ -6,7 +7,7 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
 from currencies.models import Currency
-from providers.models import Credentials
+from providers.models import Credentials, PublicationCalendar
 from exchange_rates.models import CurrencyExchangeRate
 
 
@@ -52,6 +53,129 @@ class ExchangeRateListViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data.get("2025-01-01")), 2)
 
+    def test_paginated_exchange_rate_list(self):
+        # Pages of at most `limit` rates are walked with the `next` cursor link
+        params = {
+            "source_currency": "USD",
+            "date_from": "2025-01-01",
+            "date_to": "2025-01-03",
+            "limit": 4
+        }
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], {
+            day: {code: float(rate) for code, rate in CurrencyExchangeRate.objects.filter(
+                source_currency=self.usd, valuation_date=day).values_list('exchanged_currency__code', 'rate_value')}
+            for day in ("2025-01-01", "2025-01-02")})
+        self.assertIsNotNone(response.data["next"])
+
+        # Rates added or removed before the cursor position do not shift the next page
+        CurrencyExchangeRate.objects.filter(source_currency=self.usd, valuation_date="2025-01-01",
+                                            exchanged_currency=self.eur).delete()
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data["results"]), ["2025-01-03"])
+        self.assertEqual(len(response.data["results"]["2025-01-03"]), 2)
+        self.assertIsNone(response.data["next"])
+
+    def test_paginated_exchange_rate_list_invalid_params(self):
+        params = {
+            "source_currency": "USD",
+            "date_from": "2025-01-01",
+            "date_to": "2025-01-03"
+        }
+        self.assertEqual(self.client.get(self.url, dict(params, limit="x")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, limit=0)).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, cursor="not-a-cursor")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_streamed_exchange_rate_list(self):
+        # output=json streams the same rates as the default response, output=csv one line per date
+        params = {
+            "source_currency": "USD",
+            "date_from": "2025-01-01",
+            "date_to": "2025-01-02"
+        }
+        expected = self.client.get(self.url, params).data
+        response = self.client.get(self.url, dict(params, output="json"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+
+        response = self.client.get(self.url, dict(params, output="csv"))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'date,EUR,GBP')
+        self.assertEqual(lines[1], f"2025-01-01,{expected['2025-01-01']['EUR']},{expected['2025-01-01']['GBP']}")
+        self.assertEqual(len(lines), 3)
+
+        self.assertEqual(self.client.get(self.url, dict(params, output="xml")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, output="csv", limit=2)).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_forward_filled_exchange_rate_list(self):
+        # The weekend gets the rates of Friday, flagged as filled
+        PublicationCalendar.objects.create(credentials=self.provider, weekdays='0,1,2,3,4')
+        params = {
+            "source_currency": "USD",
+            "date_from": "2025-01-03",
+            "date_to": "2025-01-05",
+            "fill": "forward"
+        }
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rates = response.data["rates"]
+        self.assertEqual(list(rates), ["2025-01-03", "2025-01-04", "2025-01-05"])
+        self.assertEqual(rates["2025-01-04"], rates["2025-01-03"])
+        self.assertEqual(rates["2025-01-05"], rates["2025-01-03"])
+        self.assertEqual(response.data["filled"], ["2025-01-04", "2025-01-05"])
+
+        self.assertEqual(self.client.get(self.url, dict(params, fill="backward")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, output="json")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class RollupRateListViewTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass')
+        self.client.login(username='testuser', password='testpass')
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.eur = Currency.objects.create(code='EUR', name='Euro')
+        self.gbp = Currency.objects.create(code='GBP', name='British Pound')
+        self.provider = Credentials.objects.create(name='Mock', token='random',
+                                                   url='www.url.com', enabled=True, priority=1)
+        self.url = reverse('v1:rollup_rate_list')
+
+    def test_rollups_of_populated_rates(self):
+        # Rates stored by the list view are aggregated as they are inserted
+        self.client.get(reverse('v1:concurrency_rate_list'),
+                        {"source_currency": "USD", "date_from": "2025-01-01", "date_to": "2025-01-10"})
+        params = {"source_currency": "USD", "granularity": "year", "date_from": "2025-01-01",
+                  "date_to": "2025-12-31"}
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rates = [float(rate) for rate in CurrencyExchangeRate.objects.filter(
+            source_currency=self.usd, exchanged_currency=self.eur).order_by('valuation_date').values_list(
+            'rate_value', flat=True)]
+        eur = response.data["2025-01-01"]["EUR"]
+        self.assertEqual((eur["open"], eur["close"], eur["high"], eur["low"], eur["days"]),
+                         (rates[0], rates[-1], max(rates), min(rates), 10))
+        self.assertAlmostEqual(eur["average"], sum(rates) / 10, places=6)
+
+    def test_invalid_params(self):
+        params = {"source_currency": "USD", "date_from": "2025-01-01", "date_to": "2025-12-31"}
+        self.assertEqual(self.client.get(self.url, {"source_currency": "USD"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, granularity="day")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, dict(params, source_currency="XXX")).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
 
 class ConverterViewTests(APITestCase):
     def setUp(self):
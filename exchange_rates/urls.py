@@ -1,9 +1,15 @@
 from django.urls import path
 
-from .views import ExchangeRateListView, ConverterView
+from .views import ExchangeRateListView, ConverterView, RateMatrixView, RateStreamView, RollupRateListView
 
 urlpatterns_exchange = [
     path('concurrency_rate_list/',
          ExchangeRateListView.as_view(), name='concurrency_rate_list'),
+    path('rollup_rate_list/',
+         RollupRateListView.as_view(), name='rollup_rate_list'),
     path('convert_amount/',
-         ConverterView.as_view(), name='convert_amount'), ]
+         ConverterView.as_view(), name='convert_amount'),
+    path('rate_matrix/',
+         RateMatrixView.as_view(), name='rate_matrix'),
+    path('rate_stream/',
+         RateStreamView.as_view(), name='rate_stream'), ]
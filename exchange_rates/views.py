@@ -1,13 +1,30 @@
 # Create your views here.
 
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from currencies.registry import currency_registry
+from my_currency.deadline import DeadlineExceeded, deadline, request_budget
 from .libs.converter import converter
 from .libs.exchange_finder import ExchangeFinder
+from .libs.rate_events import rate_hub
+from .libs.rate_matrix import rate_matrix
+from .libs.rollup import get_rollups
+
+
+# Response header flagging rates answered partially because the request deadline was exceeded.
+PARTIAL_HEADER = 'X-Partial-Rates'
 
 
 class ExchangeRateListView(APIView):
@@ -19,10 +36,15 @@ class ExchangeRateListView(APIView):
         source_currency (str): The currency code of the source currency ('USD').
         date_from (str): The start date in 'YYYY-MM-DD' format.
         date_to (str): The end date in 'YYYY-MM-DD' format.
+        limit (int, optional): Page size, enables cursor pagination.
+        cursor (str, optional): Cursor of the page to fetch, taken from the 'next' link of the previous page.
+        output (str, optional): 'json' or 'csv' to stream the whole range from the columnar rates.
+        fill (str, optional): 'forward' to give non-publication days the rates of the last publication day.
 
     """
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated]
+    streaming_outputs = {'json': 'application/json', 'csv': 'text/csv'}
 
     def get(self, request):
         """
@@ -35,11 +57,33 @@ class ExchangeRateListView(APIView):
             source_currency (str): The currency code of the source currency ('USD').
             date_from (str): The start date in 'YYYY-MM-DD' format.
             date_to (str): The end date in 'YYYY-MM-DD' format.
+            limit (int, optional): Maximum number of rates per page, capped at RATE_LIST_MAX_PAGE_SIZE.
+            cursor (str, optional): Opaque cursor of the page to fetch.
+            output (str, optional): 'json' or 'csv'. Streams the rates of the whole range, without pagination.
+            fill (str, optional): 'forward'. Days on which the provider publishes no rates (see its
+                                  PublicationCalendar) get the rates of the last publication day.
+
+        When limit or cursor is given the rates are paginated by (valuation_date, currency) and the
+        response is {"results": <rates of the page>, "next": <URL of the next page or null>}.
+
+        With output the response is streamed from the columnar rates one date at a time: 'json' has
+        the same content as the default response and 'csv' has a 'date' column followed by one
+        column per currency code.
+
+        With fill=forward the response is {"rates": <rates by date>, "filled": <dates whose rates were
+        carried forward>}; only the publication days are fetched from the provider. It cannot be
+        combined with pagination nor output.
+
+        Missing rates are fetched within the time budget of the request, REQUEST_DEADLINE_SECONDS or
+        less when the client sends an X-Request-Timeout header. Once it is spent the rates already
+        stored are returned with an X-Partial-Rates header, or HTTP 504 if there are none or the
+        response is paginated or streamed.
 
         Returns:
             Response: A JSON response containing:
                 - Success: A dictionary of exchange rates if all parameters are valid and data is retrieved.
                 - Error: HTTP 400 status if parameters are missing or invalid, or if an exception occurs.
+                - Timeout: HTTP 504 status if the deadline is exceeded before any rate can be returned.
 
         Raises:
             Exception: Propagates any unhandled exceptions from ExchangeFinder for debugging purposes.
@@ -47,15 +91,115 @@ class ExchangeRateListView(APIView):
         source = request.query_params.get("source_currency")
         date_from = request.query_params.get("date_from")
         date_to = request.query_params.get("date_to")
+        limit = request.query_params.get("limit")
+        cursor = request.query_params.get("cursor")
+        output = request.query_params.get("output")
+        fill = request.query_params.get("fill")
         if source is None or date_from is None or date_to is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
+        if fill is not None and (fill != 'forward' or output is not None or limit is not None or cursor is not None):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if output is not None and (output not in self.streaming_outputs or limit is not None or cursor is not None):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None or cursor is not None:
+            try:
+                limit = min(int(limit or settings.RATE_LIST_PAGE_SIZE), settings.RATE_LIST_MAX_PAGE_SIZE)
+            except ValueError:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            if limit < 1:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+        try:
+            budget = request_budget(request)
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        partial = False
         try:
-            exchange = ExchangeFinder(source_currency=source, start_date=date_from, end_date=date_to)
-            out = exchange.get_currency_rates_list()
+            exchange = ExchangeFinder(source_currency=source, start_date=date_from, end_date=date_to,
+                                      forward_fill=fill is not None)
+            try:
+                with deadline(budget):
+                    if output is not None or fill is not None:
+                        columns = exchange.get_currency_rates_columns()
+                    elif limit is None:
+                        out = exchange.get_currency_rates_list()
+                    else:
+                        results, next_cursor = exchange.get_currency_rates_page(limit=limit, cursor=cursor)
+                        out = {"results": results,
+                               "next": next_cursor and replace_query_param(request.build_absolute_uri(), 'cursor',
+                                                                           next_cursor)}
+            except DeadlineExceeded:
+                if output is not None or limit is not None:
+                    return Response(status=status.HTTP_504_GATEWAY_TIMEOUT)
+                columns = exchange.get_stored_rates_columns()
+                if not len(columns):
+                    return Response(status=status.HTTP_504_GATEWAY_TIMEOUT)
+                out = columns.to_dict()
+                partial = True
         except Exception as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
             # raise e
 
+        if output == 'csv':
+            return StreamingHttpResponse(columns.iter_csv(), content_type=self.streaming_outputs[output])
+        if output is not None:
+            return StreamingHttpResponse(columns.iter_json(), content_type=self.streaming_outputs[output])
+        if fill is not None:
+            out = {"rates": columns.to_dict(),
+                   "filled": [day.strftime("%Y-%m-%d") for day in sorted(columns.filled)]}
+        response = Response(out)
+        if partial:
+            response[PARTIAL_HEADER] = 'true'
+        return response
+
+
+class RollupRateListView(APIView):
+    """
+    API view to retrieve weekly, monthly or yearly aggregates of the exchange rates of a source currency.
+
+    get_params:
+
+        source_currency (str): The currency code of the source currency ('USD').
+        granularity (str, optional): 'week', 'month' (default) or 'year'.
+        date_from (str): The start date in 'YYYY-MM-DD' format.
+        date_to (str): The end date in 'YYYY-MM-DD' format.
+
+    """
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handle GET requests to fetch the rate rollups of a source currency over a date range.
+
+        Args:
+            request (Request): The HTTP request object containing query parameters.
+
+        Query Parameters:
+            source_currency (str): The currency code of the source currency ('USD').
+            granularity (str, optional): Length of the periods: 'week', 'month' or 'year'. Defaults to 'month'.
+            date_from (str): The start date in 'YYYY-MM-DD' format.
+            date_to (str): The end date in 'YYYY-MM-DD' format.
+
+        The rollups are read from the stored aggregates, one row per period and currency, and only
+        cover the daily rates already stored: missing days are not fetched from the providers.
+
+        Returns:
+            Response: A JSON response containing:
+                - Success: A dictionary keyed by the first day of each period, mapping currency codes
+                  to their open, high, low, close and average rates.
+                - Error: HTTP 400 status if parameters are missing or invalid.
+        """
+        source = request.query_params.get("source_currency")
+        granularity = request.query_params.get("granularity", "month")
+        date_from = request.query_params.get("date_from")
+        date_to = request.query_params.get("date_to")
+        if source is None or date_from is None or date_to is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        try:
+            out = get_rollups(source_currency=source, granularity=granularity, start_date=date_from,
+                              end_date=date_to)
+        except Exception:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
         return Response(out)
 
 
@@ -83,22 +227,163 @@ class ConverterView(APIView):
             exchanged_currency (str): A comma-separated list of target currency codes ('EUR,GBP').
             amount (str): The amount to convert, expected to be an integer.
 
+        Rates are fetched from the provider, when no recent enough ones are stored, within the time
+        budget of the request (see ExchangeRateListView).
+
         Returns:
             Response: A JSON response containing:
                 - Success: A dictionary with conversion results if all parameters are valid.
                 - Error: HTTP 400 status if parameters are missing, invalid, or if conversion fails.
+                - Timeout: HTTP 504 status if the rates could not be fetched within the deadline.
         """
         try:
             source = request.query_params.get("source_currency")
             exchanged_currency = request.query_params.get("exchanged_currency")
             value = int(request.query_params.get("amount"))
+            budget = request_budget(request)
         except (ValueError, TypeError):
             return Response(status=status.HTTP_400_BAD_REQUEST)
         if source is None or exchanged_currency is None or value is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         try:
-            out = converter(source_currency=source,
-                            exchanged_currency=exchanged_currency.split(','), value=value)
+            with deadline(budget):
+                out = converter(source_currency=source,
+                                exchanged_currency=exchanged_currency.split(','), value=value)
+        except DeadlineExceeded:
+            return Response(status=status.HTTP_504_GATEWAY_TIMEOUT)
         except Exception:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         return Response(out)
+
+
+class RateMatrixView(APIView):
+    """
+    API view to retrieve the latest stored rates of every (or some) source and target currencies at once.
+
+    get_params:
+        sources (str, optional): A comma-separated list of source currency codes ('USD,EUR').
+        targets (str, optional): A comma-separated list of target currency codes ('GBP,CHF').
+    """
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handle GET requests to fetch the latest rate matrix.
+
+        Args:
+            request (Request): The HTTP request object containing query parameters.
+
+        Query Parameters:
+            sources (str, optional): Source currencies of the matrix. Defaults to every source with stored rates.
+            targets (str, optional): Target currencies of the matrix. Defaults to every target.
+
+        The matrix is served from memory (see exchange_rates.libs.rate_matrix), without querying
+        the database nor fetching rates from the providers.
+
+        Returns:
+            Response: A JSON response containing:
+                - Success: A dictionary keyed by source currency code of {"date": <latest valuation date>,
+                  "rates": {<target code>: <latest rate>}}.
+                - Error: HTTP 400 status if a currency code is not valid.
+        """
+        sources = request.query_params.get("sources")
+        targets = request.query_params.get("targets")
+        sources = [code for code in sources.split(',') if code] if sources else None
+        targets = [code for code in targets.split(',') if code] if targets else None
+        if not all(currency_registry.exists(code) for code in (sources or []) + (targets or [])):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return Response(rate_matrix.get(sources=sources, targets=targets))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients accepting only text/event-stream (EventSource) reach RateStreamView; it only renders errors.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b'' if data is None else json.dumps(data).encode()
+
+
+def _sse(events):
+    return ''.join(f"event: rates\ndata: {json.dumps(event, separators=(',', ':'))}\n\n" for event in events)
+
+
+# The streams subscribe when they start: a response closed before its first chunk never
+# runs the generator, and would leave a subscription buffering events in the hub.
+def _stream(sources, pairs):
+    subscription = rate_hub.subscribe(sources=sources, pairs=pairs)
+    try:
+        yield ": subscribed\n\n"
+        while True:
+            events = subscription.get(timeout=settings.RATE_EVENTS_KEEPALIVE)
+            yield _sse(events) if events else ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+async def _astream(sources, pairs):
+    subscription = rate_hub.subscribe(sources=sources, pairs=pairs)
+    try:
+        subscription.bind(asyncio.get_running_loop())
+        yield ": subscribed\n\n"
+        while True:
+            events = await subscription.aget(timeout=settings.RATE_EVENTS_KEEPALIVE)
+            yield _sse(events) if events else ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+class RateStreamView(APIView):
+    """
+    API view streaming the exchange rates stored from now on, as server-sent events.
+
+    get_params:
+        sources (str, optional): A comma-separated list of source currency codes ('USD,EUR').
+        pairs (str, optional): A comma-separated list of currency pairs, source and exchanged codes
+                               joined by a dash ('USD-EUR,GBP-CHF').
+    """
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        """
+        Handle GET requests to subscribe to the rate updates of some sources or currency pairs.
+
+        Args:
+            request (Request): The HTTP request object containing query parameters.
+
+        Query Parameters:
+            sources (str, optional): Source currency codes whose new rates are sent.
+            pairs (str, optional): Currency pairs whose new rates are sent. Without sources nor pairs,
+                                   every new rate is sent.
+
+        Every time new rates are stored (by populate()) the stream gets one 'rates' event per source
+        currency and valuation date, whose data is {"source": ..., "date": ..., "rates": {code: rate}}
+        restricted to the subscribed pairs. Comments are sent every RATE_EVENTS_KEEPALIVE seconds
+        while nothing is stored. Under ASGI the stream is served by the event loop; under WSGI it
+        holds a worker thread per client.
+
+        Returns:
+            StreamingHttpResponse: A text/event-stream response, or HTTP 400 status if a currency code
+                                   or a pair is not valid.
+        """
+        sources = request.query_params.get("sources")
+        pairs = request.query_params.get("pairs")
+        try:
+            sources = [code for code in sources.split(',') if code] if sources else None
+            pairs = [tuple(pair.split('-')) for pair in pairs.split(',') if pair] if pairs else None
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        codes = set(sources or ()) | {code for pair in pairs or () for code in pair}
+        if any(len(pair) != 2 for pair in pairs or ()) or not all(currency_registry.exists(code) for code in codes):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        stream = _astream if isinstance(request._request, ASGIRequest) else _stream
+        response = StreamingHttpResponse(stream(sources, pairs), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
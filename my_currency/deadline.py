@@ -0,0 +1,103 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Header a client may send to shorten the time budget of its request, in seconds.
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+# Monotonic time by which the current request must be answered, None without a budget.
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the time budget of the current request is spent."""
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Give the code of the block, and the threads it starts with its context, a time budget.
+
+    Nested budgets never extend the enclosing one.
+
+    Args:
+        seconds (float): The budget, None for no budget.
+    """
+    current = _deadline.get()
+    if seconds is not None:
+        end = time.monotonic() + seconds
+        current = end if current is None else min(current, end)
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """
+    Return the seconds left in the budget of the current request (0 once spent), or None without a budget.
+    """
+    end = _deadline.get()
+    if end is None:
+        return None
+    return max(end - time.monotonic(), 0)
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check():
+    """
+    Raises:
+        DeadlineExceeded: If the budget of the current request is spent.
+    """
+    if expired():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def timeout(default=None):
+    """
+    Return the timeout of a blocking call: default, shortened to the budget left.
+
+    Args:
+        default (float, optional): Timeout without a budget, or when more time is left. Defaults to None.
+
+    Returns:
+        float: The timeout in seconds, None to wait without limit.
+
+    Raises:
+        DeadlineExceeded: If the budget is already spent, rather than starting a call with no time to finish.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    check()
+    return left if default is None else min(default, left)
+
+
+def request_budget(request):
+    """
+    Return the time budget of a request: REQUEST_DEADLINE_SECONDS, or less if the client asks for it.
+
+    Args:
+        request (Request): The request, possibly with an X-Request-Timeout header in seconds.
+
+    Returns:
+        float: The budget in seconds, None for no budget.
+
+    Raises:
+        ValueError: If the header is not a positive number.
+    """
+    budget = settings.REQUEST_DEADLINE_SECONDS
+    asked = request.headers.get(DEADLINE_HEADER)
+    if asked is not None:
+        asked = float(asked)
+        if not asked > 0:
+            raise ValueError(f"Invalid {DEADLINE_HEADER} header")
+        budget = asked if budget is None else min(asked, budget)
+    return budget
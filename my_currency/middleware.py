@@ -0,0 +1,29 @@
+from django.conf import settings
+
+from .routers import primary_pinned, wrote_primary
+
+PIN_COOKIE = 'pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryPinMiddleware(object):
+    """
+    Read-your-writes for clients of a read replica (see my_currency.routers).
+
+    Reads are pinned to the primary database for requests that may write (unsafe methods) and
+    for the requests of a client that wrote less than DATABASE_PIN_SECONDS ago, which carry the
+    short-lived pin cookie set on the response of the request that wrote.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = PIN_COOKIE in request.COOKIES or request.method not in SAFE_METHODS
+        with primary_pinned(pinned):
+            response = self.get_response(request)
+            wrote = wrote_primary()
+        if wrote and settings.DATABASE_READ_ALIAS != 'default':
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.DATABASE_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
@@ -0,0 +1,76 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps whose reads may be served by the read replica: the currencies and their exchange rates.
+REPLICATED_APPS = {'currencies', 'exchange_rates'}
+
+# Whether the reads of the current request or thread must see the primary database.
+_pinned = contextvars.ContextVar('primary_pinned', default=False)
+# Whether the current request or thread wrote to the primary database.
+_wrote = contextvars.ContextVar('primary_wrote', default=False)
+
+
+def pin_primary():
+    """
+    Send the following reads of the current request or thread to the primary database.
+
+    Called on every write (see ReadReplicaRouter.db_for_write) and by populate(), whose rates
+    may be stored by the writer thread, so the code that wrote reads its own writes.
+    """
+    _pinned.set(True)
+    _wrote.set(True)
+
+
+def wrote_primary():
+    return _wrote.get()
+
+
+@contextmanager
+def primary_pinned(pinned):
+    """
+    Scope the primary pinning to a block, typically one request.
+
+    Args:
+        pinned (bool): Whether the reads of the block start pinned to the primary database.
+    """
+    pinned_token = _pinned.set(pinned)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(wrote_token)
+        _pinned.reset(pinned_token)
+
+
+class ReadReplicaRouter(object):
+    """
+    Route the reads of currencies and exchange rates to DATABASE_READ_ALIAS and every write to the primary.
+
+    Reads stay on the primary while it has a transaction open, and for the rest of a request
+    (or thread) that wrote, so code never reads back a replica that is behind its own writes.
+    PrimaryPinMiddleware extends this to the following requests of the same client for
+    DATABASE_PIN_SECONDS.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = settings.DATABASE_READ_ALIAS
+        if alias == DEFAULT_DB_ALIAS or model._meta.app_label not in REPLICATED_APPS:
+            return None
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included.
+        return db == DEFAULT_DB_ALIAS
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -23,9 +24,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-cr6)8cq9zq5rvwf@jl%)a4vki2=&+b2&7*nd!*q7ztfj!sz-a$'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# MY_CURRENCY_DEBUG=0 turns it off and MY_CURRENCY_ALLOWED_HOSTS lists the served host names
+# (comma-separated), e.g. for the server of `manage.py loadtest`.
+DEBUG = os.environ.get('MY_CURRENCY_DEBUG', '1') != '0'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('MY_CURRENCY_ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 
@@ -34,6 +37,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'providers',
     'exchange_rates',
+    'profiling',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +54,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'my_currency.middleware.PrimaryPinMiddleware',
+    'profiling.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'my_currency.urls'
@@ -78,10 +84,149 @@ WSGI_APPLICATION = 'my_currency.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # MY_CURRENCY_DB points a process to another database file, e.g. the server of `manage.py loadtest`.
+        'NAME': os.environ.get('MY_CURRENCY_DB', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Run on every new connection. WAL lets readers go on while a writer commits,
+            # busy_timeout makes writers wait for the lock instead of failing with
+            # "database is locked", NORMAL sync is durable enough under WAL and mmap
+            # serves reads straight from the page cache.
+            'init_command': ('PRAGMA journal_mode=WAL;'
+                             'PRAGMA busy_timeout=5000;'
+                             'PRAGMA synchronous=NORMAL;'
+                             'PRAGMA mmap_size=268435456;'),
+            # Take the write lock at BEGIN, so a transaction never fails upgrading a read lock.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Seconds the serialized currency catalogue (currencies.catalogue) is cached, and the in-memory
+# currency registry (currencies.registry) kept. Saving a currency refreshes them at once in its own
+# process; the other processes see the change within this delay. None keeps them until then,
+# e.g. with a shared cache and a single process.
+CURRENCY_CATALOGUE_TTL = 60
+
+# Read replica (my_currency.routers): reads of currencies and exchange rates go to
+# DATABASE_READ_ALIAS and every write to 'default'. A client that wrote keeps reading from the
+# primary for DATABASE_PIN_SECONDS. Locally, 'replica' is a copy of db.sqlite3 refreshed by
+# `manage.py replicate_db --interval 1`; set DATABASE_READ_ALIAS = 'replica' to read from it.
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'replica.sqlite3',
+    'OPTIONS': {
+        'init_command': 'PRAGMA busy_timeout=5000;',
+    },
+}
+DATABASE_ROUTERS = ['my_currency.routers.ReadReplicaRouter']
+DATABASE_READ_ALIAS = 'default'
+DATABASE_PIN_SECONDS = 5
+
+# Exchange rate writes are funneled through a single writer thread that merges
+# concurrent populate() calls into larger transactions (exchange_rates.libs.writer).
+RATE_WRITER_BACKGROUND = True
+RATE_WRITER_BATCH_SIZE = 5000
+RATE_WRITER_LINGER_SECONDS = 0.05
+
+# Provider fetches run as durable jobs stored in the database (exchange_rates.libs.jobs). A failed
+# job is retried after FETCH_JOB_BACKOFF seconds, doubled on every attempt up to
+# FETCH_JOB_MAX_BACKOFF, and fails after FETCH_JOB_MAX_ATTEMPTS attempts. A running job whose
+# worker did not finish within FETCH_JOB_LEASE seconds is claimed again. With
+# FETCH_WORKER_IN_PROCESS the web process drains the queue in a background thread; disable it
+# when jobs are run by `manage.py fetch_worker`.
+FETCH_JOB_MAX_ATTEMPTS = 5
+FETCH_JOB_BACKOFF = 30
+FETCH_JOB_MAX_BACKOFF = 3600
+FETCH_JOB_LEASE = 600
+FETCH_WORKER_IN_PROCESS = True
+
+# Optional memory-mapped copy of the rate history (exchange_rates.libs.rate_store): one float64
+# date x currency matrix per source currency, appended by the rate writer and read by
+# ExchangeFinder instead of the database. Build it with `manage.py build_rate_store` before
+# enabling it. RATE_STORE_COLUMNS is the number of currencies reserved per file.
+# MY_CURRENCY_RATE_STORE_DIR overrides the directory, e.g. for the server of `manage.py loadtest`.
+RATE_STORE_ENABLED = False
+RATE_STORE_DIR = os.environ.get('MY_CURRENCY_RATE_STORE_DIR', BASE_DIR / 'rate_store')
+RATE_STORE_COLUMNS = 16
+
+# Optional shared memory segment (exchange_rates.libs.shared_rates) holding the last
+# RATE_SHM_DAYS days of rates for up to RATE_SHM_CURRENCIES currencies, shared by every worker
+# process and read by converter() and ExchangeFinder before the database. MY_CURRENCY_RATE_SHM_NAME
+# overrides the segment name.
+RATE_SHM_ENABLED = False
+RATE_SHM_NAME = os.environ.get('MY_CURRENCY_RATE_SHM_NAME', 'my_currency_rates')
+RATE_SHM_DAYS = 32
+RATE_SHM_CURRENCIES = 32
+
+# Request profiling (profiling app): the view of a request runs under cProfile and its profile is
+# stored when PROFILING_ENABLED, when a staff user sends an X-Profile header, or for a random
+# PROFILING_SAMPLE_RATE fraction of the requests. The PROFILING_MAX_PROFILES latest profiles are kept;
+# `manage.py profiles` summarizes them.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_MAX_PROFILES = 1000
+
+# Time budget, in seconds, of the requests of ExchangeRateListView and ConverterView (my_currency.deadline),
+# None for no budget. Clients may shorten it with an X-Request-Timeout header. It bounds the provider
+# calls they make, which never wait more than PROVIDER_TIMEOUT seconds either.
+REQUEST_DEADLINE_SECONDS = 10
+PROVIDER_TIMEOUT = 10
+
+# Server-sent events of new rates (exchange_rates.libs.rate_events). RATE_EVENTS_CHANNEL carries them
+# to every process: LocalChannel when a single process serves the API, DatabaseChannel (RateEvent
+# table, polled every RATE_EVENTS_POLL seconds by one thread per process and kept
+# RATE_EVENTS_RETENTION seconds) otherwise. A client keeps at most RATE_EVENTS_BUFFER unsent events,
+# older ones are dropped, and idle streams get a keepalive comment every RATE_EVENTS_KEEPALIVE seconds.
+RATE_EVENTS_CHANNEL = 'exchange_rates.libs.rate_events.LocalChannel'
+RATE_EVENTS_POLL = 1.0
+RATE_EVENTS_RETENTION = 300
+RATE_EVENTS_BUFFER = 100
+RATE_EVENTS_KEEPALIVE = 15
+
+# The rate matrix (exchange_rates.libs.rate_matrix) follows the rate events and is loaded again from
+# the database, in a background thread, every RATE_MATRIX_TTL seconds, so with LocalChannel it also
+# gets the rates stored by other processes (web workers, `manage.py fetch_worker`). None to rely
+# on the events alone, with DatabaseChannel.
+RATE_MATRIX_TTL = 60
+
+# Adapter class of each provider, by Credentials.name (providers.adapters.registry). Classes are
+# imported when a credential of the provider is first used.
+PROVIDER_ADAPTERS = {
+    'CurrencyBeacon': 'providers.adapters.currency_beacon.CurrencyBeaconAdapter',
+    'Mock': 'providers.adapters.mock_provider.MockProvider',
+}
+
+# Hedged provider requests (providers.adapters.hedged): when the primary provider has not answered
+# after the PROVIDER_HEDGE_PERCENTILE of its last PROVIDER_HEDGE_WINDOW response times, the request
+# is also sent to the next enabled provider. PROVIDER_HEDGE_DEFAULT_DELAY (seconds) is used until
+# PROVIDER_HEDGE_MIN_SAMPLES responses have been timed. Hedged calls run on a pool of
+# PROVIDER_HEDGE_WORKERS threads per process and are given PROVIDER_TIMEOUT seconds each.
+PROVIDER_HEDGING = False
+PROVIDER_HEDGE_PERCENTILE = 95
+PROVIDER_HEDGE_WINDOW = 200
+PROVIDER_HEDGE_MIN_SAMPLES = 20
+PROVIDER_HEDGE_DEFAULT_DELAY = 1.0
+PROVIDER_HEDGE_WORKERS = 8
+
+# Client-side limits of the providers whose Credentials set a rate or quotas
+# (providers.adapters.throttle). Background refreshes cannot use the last
+# PROVIDER_BACKGROUND_RESERVE share of the token bucket nor of the daily/monthly quotas, and a
+# request waits at most PROVIDER_THROTTLE_TIMEOUT seconds for a token.
+PROVIDER_BACKGROUND_RESERVE = 0.2
+PROVIDER_THROTTLE_TIMEOUT = 10
+
+# Raw provider responses of past windows are kept on disk (providers.adapters.response_cache).
+# Modes: 'off', 'readwrite' (reuse and store past windows), 'record' (also store windows that
+# include today) and 'replay' (serve every request from disk, never call the providers).
+# MY_CURRENCY_PROVIDER_CACHE_DIR and MY_CURRENCY_PROVIDER_CACHE_MODE override them.
+PROVIDER_RESPONSE_CACHE_DIR = os.environ.get('MY_CURRENCY_PROVIDER_CACHE_DIR', BASE_DIR / 'provider_cache')
+PROVIDER_RESPONSE_CACHE_MODE = os.environ.get('MY_CURRENCY_PROVIDER_CACHE_MODE', 'readwrite')
+
+# Seconds the publication calendar of the provider in use (providers.calendar) is cached. Saving a
+# provider or a calendar drops it at once in its own process; with the default per-process cache,
+# the other processes see the change within this delay. None caches it until then, for a shared cache.
+PROVIDER_CALENDAR_TTL = 60
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -107,6 +252,14 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Keyset pagination of /api/v1/concurrency_rate_list/ (used when `limit` or `cursor` is given).
+RATE_LIST_PAGE_SIZE = 1000
+RATE_LIST_MAX_PAGE_SIZE = 10000
+
+# converter() serves the latest stored rates while today's are fetched in the background, as
+# long as they are at most this many days old; past that it waits for the provider (0: always wait).
+CONVERTER_MAX_STALENESS_DAYS = 3
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -134,3 +287,6 @@ if 'test' in sys.argv:
         'NAME': ':memory:',
         'timeout': 200,
     }
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    RATE_WRITER_BACKGROUND = False
+    PROVIDER_RESPONSE_CACHE_MODE = 'off'
@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the stored request profiles; summarize them with `manage.py profiles`.
+    """
+    list_display = ('created', 'method', 'path', 'status', 'duration', 'sql_count', 'trigger', 'user')
+    list_filter = ('trigger', 'view')
+    ordering = ('-pk',)
+    exclude = ('stats',)
+    readonly_fields = [field.name for field in RequestProfile._meta.fields if field.name != 'stats']
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
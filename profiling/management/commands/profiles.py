@@ -0,0 +1,53 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand
+
+from profiling.models import RequestProfile
+
+
+class Command(BaseCommand):
+    """
+    List the stored request profiles (profiling app) and summarize the functions they spend their time in.
+
+    The statistics of the selected profiles are added together, so the summary shows where the
+    time goes across many requests of an endpoint rather than in a single one.
+    """
+    help = "List the stored request profiles and the top cumulative functions across them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help="Only the profiles of this view, e.g. v1:convert_amount.")
+        parser.add_argument('--limit', type=int, default=20, help="Number of latest profiles to select.")
+        parser.add_argument('--top', type=int, default=25, help="Number of functions in the summary.")
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'],
+                            help="Order of the functions in the summary.")
+        parser.add_argument('--clear', action='store_true', help="Delete the stored profiles instead.")
+
+    def handle(self, *args, **options):
+        profiles = RequestProfile.objects.order_by('-pk')
+        if options['view']:
+            profiles = profiles.filter(view=options['view'])
+        if options['clear']:
+            count, _ = profiles.delete()
+            self.stdout.write(f"Deleted {count} profiles")
+            return
+        profiles = list(profiles[:options['limit']])
+        if not profiles:
+            self.stdout.write("No stored profiles")
+            return
+
+        for profile in profiles:
+            self.stdout.write(f"{profile.pk:>6} {profile.created:%Y-%m-%d %H:%M:%S} {profile.method} {profile.path} "
+                              f"{profile.status} {profile.duration * 1000:.1f} ms {profile.sql_count} queries "
+                              f"({profile.sql_time * 1000:.1f} ms) [{profile.trigger}]")
+        durations = sorted(profile.duration for profile in profiles)
+        queries = sum(profile.sql_count for profile in profiles) / len(profiles)
+        self.stdout.write(f"\n{len(profiles)} profiles, median {durations[len(durations) // 2] * 1000:.1f} ms, "
+                          f"max {durations[-1] * 1000:.1f} ms, {queries:.1f} queries per request\n")
+
+        output = io.StringIO()
+        stats = pstats.Stats(stream=output)
+        for profile in profiles:
+            stats.add(profile.load_stats())
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,123 @@
+import cProfile
+import marshal
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from my_currency.routers import primary_pinned
+from .models import RequestProfile
+
+# Header asking for the profile of a request; only honoured for staff users.
+PROFILE_HEADER = 'X-Profile'
+
+
+class _QueryCounter(object):
+    """Database execute wrapper counting the queries run and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+class ProfilingMiddleware(object):
+    """
+    Run the view of some requests under cProfile and store the profile as a RequestProfile.
+
+    A request is profiled when PROFILING_ENABLED, when it carries the X-Profile header, or at
+    random for a PROFILING_SAMPLE_RATE fraction of the requests. The header is only honoured for
+    staff users, authenticated before the view runs, so other clients cannot make the server
+    profile their requests. Only the PROFILING_MAX_PROFILES latest profiles are kept. Requests
+    that are not profiled cost a random draw at most.
+
+    The middleware calls the view itself: keep it last in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def _trigger(self, request):
+        if settings.PROFILING_ENABLED:
+            return RequestProfile.SETTING
+        if PROFILE_HEADER in request.headers and self._is_staff(request):
+            return RequestProfile.HEADER
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return RequestProfile.SAMPLE
+        return None
+
+    def _is_staff(self, request):
+        """
+        Check whether the session user (AuthenticationMiddleware) or the user of the API
+        authentication classes is a staff user.
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        api_request = Request(request)
+        for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            try:
+                result = authentication().authenticate(api_request)
+            except APIException:
+                return False
+            if result is not None:
+                return result[0].is_staff
+        return False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return None
+        counter = _QueryCounter()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = profiler.runcall(self._render_view, view_func, request, view_args, view_kwargs)
+        duration = time.perf_counter() - start
+        profiler.create_stats()
+        self._store(request, view_func, response, trigger, duration, counter, marshal.dumps(profiler.stats))
+        return response
+
+    def _render_view(self, view_func, request, view_args, view_kwargs):
+        """
+        Call the view and render its response, which Django would render after the profile: the
+        serialization of a DRF Response is part of the time of the request.
+        """
+        response = view_func(request, *view_args, **view_kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        return response
+
+    def _store(self, request, view_func, response, trigger, duration, counter, stats):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        # Storing the profile is not a write of the client: do not pin its reads to the primary.
+        with primary_pinned(False):
+            RequestProfile.objects.create(
+                method=request.method, path=request.path[:200],
+                view=(match.view_name if match and match.view_name else
+                      f"{view_func.__module__}.{view_func.__name__}")[:200],
+                params={key: request.GET.getlist(key) for key in request.GET}, status=response.status_code,
+                duration=duration, sql_count=counter.count, sql_time=counter.time, trigger=trigger,
+                user=user.get_username() if user is not None and user.is_authenticated else '', stats=stats)
+            oldest = RequestProfile.objects.order_by('-pk').values_list('pk', flat=True)[
+                settings.PROFILING_MAX_PROFILES:settings.PROFILING_MAX_PROFILES + 1].first()
+            if oldest is not None:
+                RequestProfile.objects.filter(pk__lte=oldest).delete()
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=200)),
+                ('view', models.CharField(db_index=True, max_length=200)),
+                ('params', models.JSONField(default=dict)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_time', models.FloatField(default=0)),
+                ('trigger', models.CharField(choices=[('setting', 'Setting'), ('header', 'Header'), ('sample', 'Sample')], max_length=7)),
+                ('user', models.CharField(blank=True, max_length=150)),
+                ('stats', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+import marshal
+import pstats
+
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+        A cProfile of the view of one request, stored by profiling.middleware.ProfilingMiddleware.
+
+        Attributes:
+            created (DateTimeField): When the request was served.
+            method (CharField): HTTP method of the request.
+            path (CharField): Path of the request.
+            view (CharField): Name of the URL pattern, or dotted path of the view.
+            params (JSONField): Query parameters, each mapped to the list of its values.
+            status (PositiveSmallIntegerField): HTTP status of the response.
+            duration (FloatField): Wall time of the view, in seconds.
+            sql_count (PositiveIntegerField): Number of SQL queries run by the view.
+            sql_time (FloatField): Time spent in those queries, in seconds.
+            trigger (CharField): Why the request was profiled: 'setting', 'header' or 'sample'.
+            user (CharField): Username of the authenticated user, if any.
+            stats (BinaryField): The marshalled cProfile statistics, as written by pstats.Stats.dump_stats.
+    """
+    SETTING = 'setting'
+    HEADER = 'header'
+    SAMPLE = 'sample'
+    TRIGGER_CHOICES = [(SETTING, 'Setting'), (HEADER, 'Header'), (SAMPLE, 'Sample')]
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=200)
+    view = models.CharField(max_length=200, db_index=True)
+    params = models.JSONField(default=dict)
+    status = models.PositiveSmallIntegerField()
+    duration = models.FloatField()
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_time = models.FloatField(default=0)
+    trigger = models.CharField(max_length=7, choices=TRIGGER_CHOICES)
+    user = models.CharField(max_length=150, blank=True)
+    stats = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} ms)"
+
+    def load_stats(self):
+        """
+        Return the profile as a pstats.Stats, which can be added to the Stats of other profiles.
+        """
+        stats = pstats.Stats()
+        stats.stats = marshal.loads(bytes(self.stats))
+        stats.get_top_level_stats()
+        return stats
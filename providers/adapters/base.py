@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 
 from currencies.models import Currency
+from currencies.registry import currency_registry
 
 
 def pre_get_timeseries(source_currency,
@@ -29,8 +30,7 @@ def pre_get_timeseries(source_currency,
     except ValueError as e:
         raise ValueError(f"Dates must be in YYYY-MM-DD format: {e}")
     try:
-        exchanged_currency = ",".join(Currency.objects.exclude(code=source_currency.upper()
-                                                               ).values_list('code', flat=True))
+        exchanged_currency = ",".join(currency.code for currency in currency_registry.exclude(source_currency.upper()))
     except Currency.DoesNotExist:
         raise Currency.DoesNotExist("Currency codes does not exist, you need to add")
     return start, end, exchanged_currency
@@ -41,7 +41,9 @@ class ExchangeRateProvider(ABC):
     Abstract base class defining the interface for exchange rate data providers.
 
     Subclasses must implement methods to fetch exchange rate data for specific dates or time series.
+    CreateProvider checks that a provider answers before selecting it, unless check_on_create is False.
     """
+    check_on_create = True
 
     @abstractmethod
     def __init__(self):
@@ -1,11 +1,15 @@
 from datetime import datetime
 
 import requests
+from django.conf import settings
 
-from currencies.models import Currency
+from currencies.registry import currency_registry
+from my_currency import deadline
 from providers.models import Credentials
-from .currency_beacon import CurrencyBeaconAdapter
-from .mock_provider import MockProvider
+from .hedged import HedgedProvider
+from .registry import adapter_registry
+from .response_cache import OFF, REPLAY, CachedResponseProvider
+from .throttle import ProviderThrottled, ThrottledProvider
 
 
 class CreateProvider(object):
@@ -21,33 +25,92 @@ class CreateProvider(object):
     def create(self):
         """
         Creates and returns a provider instance based on available credentials.
-        Check if the provider works if not change the priority.
+        The adapter of each provider is looked up in the adapter registry (PROVIDER_ADAPTERS) and
+        providers without one are skipped. Check if the provider works if not change the priority;
+        adapters whose check_on_create is False are not checked. A provider whose limits refuse the
+        check (ProviderThrottled) is skipped for this call, its priority unchanged.
+        With PROVIDER_HEDGING the provider is paired with the next enabled one (see HedgedProvider).
+        Providers are wrapped to honour their limits (ThrottledProvider) and to reuse the responses
+        stored on disk (CachedResponseProvider); replaying stored responses skips the check.
 
         Returns:
             Provider instance if successful, None otherwise
         """
-
         for provider in Credentials.objects.filter(enabled=True).order_by('priority'):
-            if provider.name == 'CurrencyBeacon':
+            if provider.name not in settings.PROVIDER_ADAPTERS:
+                continue
+            try:
+                adapter = adapter_registry.get(provider)
+            except Exception:
+                return self._change_priority(provider)
+            prov = self._wrap(provider, adapter)
+            if adapter.check_on_create and settings.PROVIDER_RESPONSE_CACHE_MODE != REPLAY:
                 try:
-                    prov = CurrencyBeaconAdapter(token=provider.token,
-                                                 url=provider.url)
-                    currency = Currency.objects.all().first()
-                    prov.get_timeseries_rates(source_currency=currency.code, start_date=self.today,
-                                              end_date=self.today)
-                    return prov
+                    prov.get_timeseries_rates(source_currency=currency_registry.codes()[0],
+                                              start_date=self.today, end_date=self.today)
+                except ProviderThrottled:
+                    # Out of quota or rate for now, not broken: use the next provider for this call only.
+                    continue
                 except requests.RequestException:
+                    # A probe cut short by the request deadline says nothing about the provider.
+                    deadline.check()
                     return self._change_priority(provider)
-            elif provider.name == 'Mock':
-                try:
-                    try:
-                        return MockProvider()
-                    except Exception:
-                        return self._change_priority(provider)
-                except requests.RequestException:
-                    raise ValueError("There is no Provider, please speak to the administrator")
+            return self._hedge(provider, prov)
         raise ValueError("There is no Provider, please speak to the administrator")
 
+    def _hedge(self, provider, prov):
+        """
+        Pair the selected provider with the next enabled one when hedging is enabled.
+
+        Args:
+            provider: Credentials instance of the selected provider
+            prov: Provider instance built from it
+
+        Returns:
+            A HedgedProvider, or prov itself if hedging is disabled or there is no other provider
+        """
+        if not settings.PROVIDER_HEDGING:
+            return prov
+        for backup in Credentials.objects.filter(enabled=True, priority__gt=provider.priority).order_by('priority'):
+            secondary = adapter_registry.get(backup)
+            if secondary is None:
+                continue
+            return HedgedProvider(prov, self._wrap(backup, secondary), provider.name, backup.name)
+        return prov
+
+    def _wrap(self, provider, prov):
+        """
+        Apply the provider limits and the response cache to a provider instance.
+
+        The cache is the outer layer, so responses served from disk use no quota.
+
+        Args:
+            provider: Credentials instance of the provider
+            prov: Provider instance built from it
+
+        Returns:
+            The wrapped provider instance
+        """
+        prov = self._throttle(provider, prov)
+        if settings.PROVIDER_RESPONSE_CACHE_MODE != OFF:
+            prov = CachedResponseProvider(prov, provider.name)
+        return prov
+
+    def _throttle(self, provider, prov):
+        """
+        Keep the requests to a provider within the limits set in its credentials.
+
+        Args:
+            provider: Credentials instance of the provider
+            prov: Provider instance built from it
+
+        Returns:
+            A ThrottledProvider, or prov itself if the credentials set no limit
+        """
+        if provider.is_limited:
+            return ThrottledProvider(prov, provider)
+        return prov
+
     def _change_priority(self, provider):
         """
         Adjusts provider priorities and attempts to create a new provider.
@@ -1,7 +1,9 @@
 from abc import ABC
 
 import requests
+from django.conf import settings
 
+from my_currency import deadline
 from .base import ExchangeRateProvider, pre_get_timeseries
 
 
@@ -41,7 +43,8 @@ class CurrencyBeaconAdapter(ExchangeRateProvider, ABC):
 
         url = (f"{self.url}"
                f"/v1/historical?base={source_currency}&date={valuation_date}&symbols={exchanged_currency}")
-        response = requests.get(url, headers={"Authorization": f"Bearer {self.token}"})
+        response = requests.get(url, headers={"Authorization": f"Bearer {self.token}"},
+                                timeout=deadline.timeout(settings.PROVIDER_TIMEOUT))
         response.raise_for_status()
         data = response.json()
         return data.get("response").get(valuation_date).get(exchanged_currency)
@@ -61,6 +64,9 @@ class CurrencyBeaconAdapter(ExchangeRateProvider, ABC):
         Returns:
             Dictionary of date-rate pairs
 
+        The request times out after PROVIDER_TIMEOUT seconds, or when the budget of the current
+        request runs out (see my_currency.deadline).
+
         """
         start, end, exchanged_currency = pre_get_timeseries(source_currency,
                                                             start_date,
@@ -70,7 +76,8 @@ class CurrencyBeaconAdapter(ExchangeRateProvider, ABC):
             url = (f"{self.url}"
                    f"/v1/timeseries?base={source_currency.upper()}&"
                    f"symbols={exchanged_currency.upper()}&start_date={start_date}&end_date={end_date}")
-            response = requests.get(url, headers={"Authorization": f"Bearer {self.token}"})
+            response = requests.get(url, headers={"Authorization": f"Bearer {self.token}"},
+                                    timeout=deadline.timeout(settings.PROVIDER_TIMEOUT))
             response.raise_for_status()
             data = response.json()
 
@@ -79,6 +86,7 @@ class CurrencyBeaconAdapter(ExchangeRateProvider, ABC):
             raise ValueError("Invalid response format from API")
 
         except requests.RequestException as e:
+            deadline.check()
             raise requests.RequestException(f"Failed to retrieve exchange rates from API: {e}")
         except (KeyError, ValueError) as e:
             raise Exception(f"Failed to retrieve exchange rates from key Value: {e}")
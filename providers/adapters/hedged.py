@@ -0,0 +1,208 @@
+import contextvars
+import threading
+import time
+from abc import ABC
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+
+from my_currency import deadline
+from .base import ExchangeRateProvider
+
+
+class LatencyTracker(object):
+    """
+    Recent response times of each provider, kept in a sliding window of PROVIDER_HEDGE_WINDOW calls.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, name, seconds):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=settings.PROVIDER_HEDGE_WINDOW)
+            self.samples[name].append(seconds)
+
+    def percentile(self, name, percent):
+        """
+        Return the given percentile of the recent latencies of a provider.
+
+        Args:
+            name (str): Name of the provider (Credentials.name).
+            percent (float): Percentile between 0 and 100.
+
+        Returns:
+            float: Latency in seconds, or None if fewer than PROVIDER_HEDGE_MIN_SAMPLES calls were recorded.
+        """
+        with self.lock:
+            samples = sorted(self.samples.get(name, ()))
+        if len(samples) < settings.PROVIDER_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+    def clear(self):
+        with self.lock:
+            self.samples = {}
+
+
+class HedgeMetrics(object):
+    """
+    Counters of the hedged requests made by this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def increment(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def snapshot(self):
+        """
+        Return a copy of the counters and the hedge rate (share of requests that sent a hedge).
+
+        Returns:
+            dict: 'requests', 'hedged', 'primary_wins', 'hedge_wins', 'failures' and 'hedge_rate'.
+        """
+        with self.lock:
+            out = dict(self.counters)
+        out['hedge_rate'] = out['hedged'] / out['requests'] if out['requests'] else 0.0
+        return out
+
+    def clear(self):
+        with self.lock:
+            self.counters = {'requests': 0, 'hedged': 0, 'primary_wins': 0, 'hedge_wins': 0, 'failures': 0}
+
+
+latency_tracker = LatencyTracker()
+hedge_metrics = HedgeMetrics()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    """
+    Return the PROVIDER_HEDGE_WORKERS threads running the hedged calls, started on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.PROVIDER_HEDGE_WORKERS,
+                                           thread_name_prefix='provider-hedge')
+        return _executor
+
+
+def _left(end):
+    """
+    Return the seconds left until end, a time.monotonic() value, or None to wait without limit.
+    """
+    return None if end is None else max(end - time.monotonic(), 0)
+
+
+class HedgedProvider(ExchangeRateProvider, ABC):
+    """
+    Provider that sends a second request to a backup provider when the primary one is slow.
+
+    The primary provider is called first. If it has not answered after the PROVIDER_HEDGE_PERCENTILE
+    percentile of its recent latencies (PROVIDER_HEDGE_DEFAULT_DELAY until enough calls are known),
+    or if it fails, the same request is sent to the secondary provider and the first successful
+    answer wins. The delay counts from when the primary call starts running, not from when it
+    was queued for a thread. Every call runs with a PROVIDER_TIMEOUT budget of its own, and
+    the answers are awaited PROVIDER_TIMEOUT seconds at most; a losing call that already
+    started cannot be interrupted, so its result is ignored; it still records its latency.
+    """
+
+    def __init__(self, primary, secondary, primary_name, secondary_name):
+        """
+        Initialize the hedged provider with the two providers to race.
+
+        Args:
+            primary (ExchangeRateProvider): Provider of the highest priority.
+            secondary (ExchangeRateProvider): Provider used as hedge.
+            primary_name (str): Name of the primary provider, used to track its latency.
+            secondary_name (str): Name of the secondary provider, used to track its latency.
+        """
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.primary_name = primary_name
+        self.secondary_name = secondary_name
+
+    def get_exchange_rate_data(self, source_currency, exchanged_currency, valuation_date):
+        return self.primary.get_exchange_rate_data(source_currency, exchanged_currency, valuation_date)
+
+    def get_timeseries_rates(self,
+                             source_currency,
+                             start_date,
+                             end_date):
+        """
+        Fetch exchange rate time series between two dates from whichever provider answers first.
+
+        Args:
+            source_currency: Base currency code
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            Dictionary of date-rate pairs
+
+        Raises:
+            Exception: The error of the primary provider if both providers fail.
+            requests.Timeout: If neither provider answers within PROVIDER_TIMEOUT seconds.
+            DeadlineExceeded: If neither provider answers within the budget of the current request.
+        """
+        hedge_metrics.increment('requests')
+        args = (source_currency, start_date, end_date)
+        timeout = deadline.timeout(settings.PROVIDER_TIMEOUT)
+        end = None if timeout is None else time.monotonic() + timeout
+        started = threading.Event()
+        primary = self._submit(self.primary, self.primary_name, started, args)
+        # Time queued behind other hedged calls is not latency of the primary: wait for it to start.
+        started.wait(_left(end))
+        delay = latency_tracker.percentile(self.primary_name, settings.PROVIDER_HEDGE_PERCENTILE)
+        if delay is None:
+            delay = settings.PROVIDER_HEDGE_DEFAULT_DELAY
+        left = _left(end)
+        done, pending = wait([primary], timeout=delay if left is None else min(delay, left))
+        if done and primary.exception() is None:
+            hedge_metrics.increment('primary_wins')
+            return primary.result()
+
+        hedge_metrics.increment('hedged')
+        secondary = self._submit(self.secondary, self.secondary_name, threading.Event(), args)
+        pending = {primary, secondary}
+        while pending:
+            done, pending = wait(pending, timeout=_left(end), return_when=FIRST_COMPLETED)
+            if not done:
+                for loser in pending:
+                    loser.cancel()
+                hedge_metrics.increment('failures')
+                deadline.check()
+                raise requests.Timeout(f"Neither {self.primary_name} nor {self.secondary_name} answered "
+                                       f"within {settings.PROVIDER_TIMEOUT} seconds")
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    hedge_metrics.increment('primary_wins' if future is primary else 'hedge_wins')
+                    return future.result()
+        hedge_metrics.increment('failures')
+        raise primary.exception()
+
+    def _submit(self, provider, name, started, args):
+        return _pool().submit(contextvars.copy_context().run, self._timed, provider, name, started, *args)
+
+    def _timed(self, provider, name, started, source_currency, start_date, end_date):
+        started.set()
+        start = time.monotonic()
+        try:
+            with deadline.deadline(settings.PROVIDER_TIMEOUT):
+                return provider.get_timeseries_rates(source_currency=source_currency, start_date=start_date,
+                                                     end_date=end_date)
+        finally:
+            latency_tracker.record(name, time.monotonic() - start)
@@ -10,6 +10,8 @@ class MockProvider(ExchangeRateProvider, ABC):
         Mock implementation of ExchangeRateProvider for testing purposes.
         Generates random exchange rates instead of fetching from an API.
     """
+    check_on_create = False
+
     def __init__(self, token=None, url=None):
         """
         Initialize the mock provider. Token and URL are optional as this is a mock.
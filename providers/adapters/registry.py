@@ -0,0 +1,74 @@
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class AdapterRegistry(object):
+    """
+    Adapter classes of the providers, by Credentials.name, and the adapter built for each credential.
+
+    PROVIDER_ADAPTERS maps every provider name to the dotted path of its adapter class. A class is
+    imported the first time a credential of its provider is used, so the adapter modules are not
+    loaded when Django starts. Adapters are built once per credential and
+    reused by every CreateProvider.create() call until the credential is saved or deleted
+    (see providers.signals).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.adapters = {}
+
+    def adapter_class(self, name):
+        """
+        Return the adapter class of a provider, importing it on first use.
+
+        Args:
+            name (str): Name of the provider, as in Credentials.name.
+
+        Returns:
+            The adapter class, or None if no adapter is registered for the provider.
+
+        Raises:
+            ImportError: If the dotted path of the adapter cannot be imported.
+        """
+        path = settings.PROVIDER_ADAPTERS.get(name)
+        if path is None:
+            return None
+        return import_string(path)
+
+    def get(self, credentials):
+        """
+        Return the adapter of a credential, building it on first use.
+
+        Args:
+            credentials: Credentials instance of the provider.
+
+        Returns:
+            The adapter instance, or None if no adapter is registered for the provider.
+        """
+        adapter = self.adapters.get(credentials.pk)
+        if adapter is not None:
+            return adapter
+        adapter_class = self.adapter_class(credentials.name)
+        if adapter_class is None:
+            return None
+        with self.lock:
+            adapter = self.adapters.get(credentials.pk)
+            if adapter is None:
+                adapter = self.adapters[credentials.pk] = adapter_class(token=credentials.token, url=credentials.url)
+        return adapter
+
+    def invalidate(self, credentials_id):
+        """
+        Drop the adapter of a credential, so the next use builds it from the current credential.
+        """
+        with self.lock:
+            self.adapters.pop(credentials_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.adapters.clear()
+
+
+adapter_registry = AdapterRegistry()
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from abc import ABC
+from datetime import date, datetime
+from pathlib import Path
+
+from django.conf import settings
+
+from currencies.registry import currency_registry
+from .base import ExchangeRateProvider
+
+OFF = 'off'
+READ_WRITE = 'readwrite'
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class ResponseNotCached(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache(object):
+    """
+    Raw provider responses stored as gzip-compressed JSON files under PROVIDER_RESPONSE_CACHE_DIR.
+
+    A response is stored at <provider>/<base>/<start>_<end>_<symbols hash>.json.gz, so old
+    windows can be inspected or pruned by hand. Files are written to a temporary name and then
+    renamed, so readers never see a partial file.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, provider, base, symbols, start_date, end_date):
+        digest = hashlib.sha1(symbols.encode()).hexdigest()[:12]
+        return self.directory / provider / base / f"{start_date}_{end_date}_{digest}.json.gz"
+
+    def get(self, provider, base, symbols, start_date, end_date):
+        """
+        Return the stored response of a request, or None if there is none.
+        """
+        try:
+            with gzip.open(self.path(provider, base, symbols, start_date, end_date), 'rt') as file:
+                return json.load(file)['response']
+        except (FileNotFoundError, EOFError, OSError, ValueError, KeyError):
+            return None
+
+    def set(self, provider, base, symbols, start_date, end_date, response):
+        path = self.path(provider, base, symbols, start_date, end_date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        key = {'provider': provider, 'base': base, 'symbols': symbols, 'start_date': start_date,
+               'end_date': end_date}
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as file:
+                file.write(json.dumps({'key': key, 'response': response}, separators=(',', ':')).encode())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class CachedResponseProvider(ExchangeRateProvider, ABC):
+    """
+    Provider that keeps the raw time series responses of another one on disk.
+
+    Rates of past days never change, so the response of a window that ends before today is
+    stored after the first request and served from disk afterwards, without any HTTP call.
+    Windows that include today are always fetched. PROVIDER_RESPONSE_CACHE_MODE 'record' also
+    stores those, and 'replay' serves every request from disk, raising ResponseNotCached for a
+    missing one: a recorded run becomes a deterministic fixture for benchmarks.
+    """
+
+    def __init__(self, provider, name, cache=None):
+        """
+        Initialize the cached provider.
+
+        Args:
+            provider (ExchangeRateProvider): The provider whose responses are cached.
+            name (str): Name of the provider (Credentials.name), part of the cache key.
+            cache (ResponseCache, optional): Where responses are stored.
+                                             Defaults to PROVIDER_RESPONSE_CACHE_DIR.
+        """
+        super().__init__()
+        self.provider = provider
+        self.name = name
+        self.cache = cache or ResponseCache(settings.PROVIDER_RESPONSE_CACHE_DIR)
+
+    def get_exchange_rate_data(self, source_currency, exchanged_currency, valuation_date):
+        return self.provider.get_exchange_rate_data(source_currency, exchanged_currency, valuation_date)
+
+    def get_timeseries_rates(self,
+                             source_currency,
+                             start_date,
+                             end_date):
+        """
+        Fetch exchange rate time series between two dates, from disk when possible.
+
+        Args:
+            source_currency: Base currency code
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            Dictionary of date-rate pairs
+
+        Raises:
+            ResponseNotCached: In replay mode, if the response was never recorded.
+        """
+        base = source_currency.upper()
+        # The symbols requested by the adapters, see pre_get_timeseries.
+        symbols = ",".join(currency.code for currency in currency_registry.exclude(base))
+        mode = settings.PROVIDER_RESPONSE_CACHE_MODE
+        historical = datetime.strptime(end_date, "%Y-%m-%d").date() < date.today()
+        if mode == REPLAY or (mode == READ_WRITE and historical):
+            response = self.cache.get(self.name, base, symbols, start_date, end_date)
+            if response is not None:
+                return response
+            if mode == REPLAY:
+                raise ResponseNotCached(f"No recorded {self.name} response for {base} {start_date}..{end_date}")
+        response = self.provider.get_timeseries_rates(source_currency=source_currency, start_date=start_date,
+                                                      end_date=end_date)
+        if historical or mode == RECORD:
+            self.cache.set(self.name, base, symbols, start_date, end_date, response)
+        return response
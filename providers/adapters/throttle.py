@@ -0,0 +1,244 @@
+import contextvars
+import threading
+import time
+from abc import ABC
+from contextlib import contextmanager
+from datetime import date
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from my_currency import deadline
+from providers.models import ProviderUsage
+from .base import ExchangeRateProvider
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+# Priority of the provider requests made by the current thread or task.
+fetch_priority = contextvars.ContextVar('fetch_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def background_fetch():
+    """
+    Mark the provider requests made inside the block as background refreshes.
+
+    Background requests leave part of the request rate and of the quotas to user-facing ones
+    (PROVIDER_BACKGROUND_RESERVE).
+    """
+    token = fetch_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        fetch_priority.reset(token)
+
+
+class ProviderThrottled(requests.RequestException):
+    """Raised when a provider request cannot be sent without exceeding the provider limits."""
+
+
+class TokenBucket(object):
+    """
+    Token bucket holding up to `burst` tokens, refilled at `rate` tokens per second.
+
+    Background requests only take a token while more than PROVIDER_BACKGROUND_RESERVE of the
+    bucket is left, so a burst of background refreshes never makes user-facing requests wait
+    for a whole refill.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority, timeout):
+        """
+        Take one token, waiting at most `timeout` seconds for it.
+
+        Args:
+            priority (str): INTERACTIVE or BACKGROUND.
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            bool: True if a token was taken, False on timeout.
+        """
+        reserve = self.burst * settings.PROVIDER_BACKGROUND_RESERVE if priority == BACKGROUND else 0
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self._refill()
+                if self.tokens - 1 >= reserve:
+                    self.tokens -= 1
+                    return True
+                wait = (reserve + 1 - self.tokens) / self.rate
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+                self.condition.wait(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket(credentials):
+    """
+    Return the process-wide token bucket of a provider, rebuilt when its limits change.
+    """
+    limits = (credentials.requests_per_second, credentials.burst)
+    with _buckets_lock:
+        if credentials.id not in _buckets or _buckets[credentials.id][0] != limits:
+            _buckets[credentials.id] = (limits, TokenBucket(*limits))
+        return _buckets[credentials.id][1]
+
+
+def _periods(today=None):
+    today = today or date.today()
+    return {ProviderUsage.DAY: today, ProviderUsage.MONTH: today.replace(day=1)}
+
+
+def current_usage(credentials):
+    """
+    Return how many requests were sent to the provider today and this month.
+
+    Args:
+        credentials (Credentials): The provider.
+
+    Returns:
+        dict: {'day': int, 'month': int}.
+    """
+    current = Q()
+    for period, start in _periods().items():
+        current |= Q(period=period, period_start=start)
+    used = dict(ProviderUsage.objects.filter(current, credentials=credentials).values_list('period', 'requests'))
+    return {period: used.get(period, 0) for period in (ProviderUsage.DAY, ProviderUsage.MONTH)}
+
+
+def remaining_quota(credentials):
+    """
+    Return how many requests the provider still accepts today and this month.
+
+    Args:
+        credentials (Credentials): The provider.
+
+    Returns:
+        dict: {'day': int or None, 'month': int or None}, None meaning no quota.
+    """
+    quotas = {ProviderUsage.DAY: credentials.daily_quota, ProviderUsage.MONTH: credentials.monthly_quota}
+    used = current_usage(credentials)
+    return {period: None if quota is None else max(quota - used.get(period, 0), 0)
+            for period, quota in quotas.items()}
+
+
+def record_usage(credentials, limits=None):
+    """
+    Count one request against the daily and monthly usage of a provider, if it stays within limits.
+
+    Each counter is incremented by one conditional UPDATE, in a single transaction, so
+    concurrent requests of several processes cannot both take the last request of a quota.
+
+    Args:
+        credentials (Credentials): The provider.
+        limits (dict, optional): Usage each period must stay below, by period ('day', 'month');
+                                 None or a missing period means no limit. Defaults to None.
+
+    Returns:
+        bool: True if the request was counted, False (and nothing counted) if a limit is reached.
+    """
+    limits = limits or {}
+    with transaction.atomic():
+        for period, start in _periods().items():
+            usage = ProviderUsage.objects.filter(credentials=credentials, period=period, period_start=start)
+            below = usage if limits.get(period) is None else usage.filter(requests__lt=limits[period])
+            if below.update(requests=F('requests') + 1):
+                continue
+            if not usage.exists() and (limits.get(period) is None or limits[period] > 0):
+                try:
+                    with transaction.atomic():
+                        ProviderUsage.objects.create(credentials=credentials, period=period, period_start=start,
+                                                     requests=1)
+                    continue
+                except IntegrityError:
+                    # Created meanwhile by another request: count against it.
+                    if below.update(requests=F('requests') + 1):
+                        continue
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+class ThrottledProvider(ExchangeRateProvider, ABC):
+    """
+    Provider that keeps the requests sent to another one within its rate and quotas.
+
+    Requests first check the daily and monthly quotas persisted in ProviderUsage, then take a
+    token from the provider's token bucket, and are counted once sent. Background requests
+    (see background_fetch) are refused once less than PROVIDER_BACKGROUND_RESERVE of a quota
+    is left, keeping the rest for user-facing requests. A request that cannot be sent raises
+    ProviderThrottled; CreateProvider then uses the next provider for this call, without
+    changing the priorities as it does when a provider fails.
+    """
+
+    def __init__(self, provider, credentials):
+        """
+        Initialize the throttled provider.
+
+        Args:
+            provider (ExchangeRateProvider): The provider to throttle.
+            credentials (Credentials): Its credentials, holding the limits.
+        """
+        super().__init__()
+        self.provider = provider
+        self.credentials = credentials
+
+    def get_exchange_rate_data(self, source_currency, exchanged_currency, valuation_date):
+        self._acquire()
+        return self.provider.get_exchange_rate_data(source_currency, exchanged_currency, valuation_date)
+
+    def get_timeseries_rates(self,
+                             source_currency,
+                             start_date,
+                             end_date):
+        """
+        Fetch exchange rate time series between two dates once the provider limits allow it.
+
+        Args:
+            source_currency: Base currency code
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            Dictionary of date-rate pairs
+
+        Raises:
+            ProviderThrottled: If a quota is exhausted or no token is available in time.
+        """
+        self._acquire()
+        return self.provider.get_timeseries_rates(source_currency=source_currency, start_date=start_date,
+                                                  end_date=end_date)
+
+    def _acquire(self):
+        priority = fetch_priority.get()
+        quotas = {ProviderUsage.DAY: self.credentials.daily_quota, ProviderUsage.MONTH: self.credentials.monthly_quota}
+        limits = {period: quota - (quota * settings.PROVIDER_BACKGROUND_RESERVE if priority == BACKGROUND else 0)
+                  for period, quota in quotas.items() if quota is not None}
+        # Cheap check first, so a provider out of quota does not wait for a token.
+        for period, left in remaining_quota(self.credentials).items():
+            if left is not None and left <= quotas[period] - limits[period]:
+                raise ProviderThrottled(f"{self.credentials.name} {period} quota exhausted")
+        if self.credentials.requests_per_second:
+            if not _bucket(self.credentials).acquire(priority, deadline.timeout(settings.PROVIDER_THROTTLE_TIMEOUT)):
+                deadline.check()
+                raise ProviderThrottled(f"{self.credentials.name} rate limit reached")
+        if not record_usage(self.credentials, limits):
+            raise ProviderThrottled(f"{self.credentials.name} quota exhausted")
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Credentials
+from .adapters.throttle import remaining_quota
+from .models import ClosedDay, Credentials, PublicationCalendar
 
 
 # Register your models here.
@@ -15,7 +16,35 @@ class CredentialsAdmin(admin.ModelAdmin):
         'url',
         'token',
         'priority',
-        'enabled')
+        'enabled',
+        'requests_per_second',
+        'remaining_daily_quota',
+        'remaining_monthly_quota')
+
+    @admin.display(description='Left today')
+    def remaining_daily_quota(self, obj):
+        return remaining_quota(obj)['day']
+
+    @admin.display(description='Left this month')
+    def remaining_monthly_quota(self, obj):
+        return remaining_quota(obj)['month']
 
 
 admin.site.register(Credentials, CredentialsAdmin)
+
+
+class ClosedDayInline(admin.TabularInline):
+    model = ClosedDay
+    extra = 1
+
+
+class PublicationCalendarAdmin(admin.ModelAdmin):
+    """
+    Admin of the publication calendars, with their closed days inline.
+    """
+    model = PublicationCalendar
+    list_display = ('credentials', 'weekdays')
+    inlines = [ClosedDayInline]
+
+
+admin.site.register(PublicationCalendar, PublicationCalendarAdmin)
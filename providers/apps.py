@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ProvaidersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'providers'
+
+    def ready(self):
+        import providers.signals
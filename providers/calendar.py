@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Credentials
+
+CALENDAR_CACHE_KEY = 'providers:calendar'
+EVERY_DAY = frozenset(range(7))
+
+
+class Calendar(object):
+    """
+    Publication days of a provider: days of the week, Monday being 0, minus closed days.
+    """
+
+    def __init__(self, weekdays=EVERY_DAY, closed=()):
+        self.weekdays = frozenset(weekdays)
+        self.closed = frozenset(closed)
+
+    def is_published(self, day):
+        return day.weekday() in self.weekdays and day not in self.closed
+
+    def django_weekdays(self):
+        """
+        Return the publication days of the week as numbers of the week_day lookup (1 is Sunday).
+        """
+        return [(day + 1) % 7 + 1 for day in self.weekdays]
+
+    def count(self, start, end):
+        """
+        Return the number of publication days between start and end (inclusive), without iterating over them.
+        """
+        days = (end - start).days + 1
+        if days <= 0:
+            return 0
+        weeks, rest = divmod(days, 7)
+        total = weeks * len(self.weekdays)
+        total += sum(1 for offset in range(rest) if (start.weekday() + offset) % 7 in self.weekdays)
+        return total - sum(1 for day in self.closed if start <= day <= end and day.weekday() in self.weekdays)
+
+    def last_publication(self, day, max_days=31):
+        """
+        Return the last publication day on or before day.
+
+        Args:
+            day (date): The day to start from.
+            max_days (int, optional): How many days to look back. Defaults to 31.
+
+        Returns:
+            date: The publication day, or day itself if there is none in the max_days before it.
+        """
+        for age in range(max_days + 1):
+            previous = day - timedelta(days=age)
+            if self.is_published(previous):
+                return previous
+        return day
+
+
+def publication_calendar():
+    """
+    Return the Calendar of the provider in use, the enabled provider with the best priority.
+
+    The calendar is kept in the default cache for PROVIDER_CALENDAR_TTL seconds, and dropped when a
+    provider or a calendar is saved or deleted (see providers/signals.py), which only reaches the
+    cache of the process that saved it. A provider without a PublicationCalendar publishes every day.
+
+    Returns:
+        Calendar: The publication calendar.
+    """
+    calendar = cache.get(CALENDAR_CACHE_KEY)
+    if calendar is None:
+        provider = Credentials.objects.filter(enabled=True).select_related('calendar').order_by('priority').first()
+        stored = getattr(provider, 'calendar', None) if provider is not None else None
+        if stored is None:
+            calendar = Calendar()
+        else:
+            calendar = Calendar(stored.weekday_set, stored.closed_days.values_list('date', flat=True))
+        cache.set(CALENDAR_CACHE_KEY, calendar, settings.PROVIDER_CALENDAR_TTL)
+    return calendar
+
+
+def invalidate_calendar():
+    cache.delete(CALENDAR_CACHE_KEY)
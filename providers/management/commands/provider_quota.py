@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from providers.adapters.throttle import current_usage, remaining_quota
+from providers.models import Credentials, ProviderUsage
+
+
+class Command(BaseCommand):
+    """
+    Print the requests sent to each provider today and this month, and the quota left.
+    """
+    help = "Show the usage and remaining quota of every provider."
+
+    def handle(self, *args, **options):
+        for credentials in Credentials.objects.order_by('priority'):
+            used = current_usage(credentials)
+            left = remaining_quota(credentials)
+            self.stdout.write(
+                f"{credentials.name} (priority {credentials.priority}, "
+                f"{credentials.requests_per_second or 'unlimited'} req/s): "
+                f"today {used[ProviderUsage.DAY]} used / {self._left(left['day'])} left, "
+                f"this month {used[ProviderUsage.MONTH]} used / {self._left(left['month'])} left")
+
+    def _left(self, left):
+        return 'unlimited' if left is None else left
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credentials',
+            name='burst',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='credentials',
+            name='daily_quota',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentials',
+            name='monthly_quota',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentials',
+            name='requests_per_second',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProviderUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('credentials', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='providers.credentials')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('credentials', 'period', 'period_start'), name='unique_usage_per_provider_and_period')],
+            },
+        ),
+    ]
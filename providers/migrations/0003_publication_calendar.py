@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0002_provider_quotas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicationCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.CharField(default='0,1,2,3,4', help_text='Comma-separated days of the week with rates, 0 is Monday.', max_length=13)),
+                ('credentials', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar', to='providers.credentials')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ClosedDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('calendar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closed_days', to='providers.publicationcalendar')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('calendar', 'date'), name='unique_closed_day_per_calendar')],
+            },
+        ),
+    ]
@@ -5,12 +5,75 @@ class Credentials(models.Model):
     """
     Model representing credentials with associated metadata for providers
     Stores information such as name, token, URL, priority, and status.
+    Optional limits (requests per second, burst and daily/monthly quotas) are enforced client side
+    by providers.adapters.throttle; leave them empty for a provider without limits.
     """
     name = models.CharField(max_length=100)
     token = models.CharField(max_length=100)
     url = models.URLField(max_length=200)
     priority = models.IntegerField(unique=True)
     enabled = models.BooleanField(default=True)
+    requests_per_second = models.FloatField(null=True, blank=True)
+    burst = models.PositiveIntegerField(default=1)
+    daily_quota = models.PositiveIntegerField(null=True, blank=True)
+    monthly_quota = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return self.name
+
+    @property
+    def is_limited(self):
+        return any(limit is not None for limit in (self.requests_per_second, self.daily_quota, self.monthly_quota))
+
+
+class ProviderUsage(models.Model):
+    """
+    Number of requests sent to a provider during a day or a month, counted against its quotas.
+    """
+    DAY = 'day'
+    MONTH = 'month'
+    PERIOD_CHOICES = [(DAY, 'Day'), (MONTH, 'Month')]
+
+    credentials = models.ForeignKey(Credentials, related_name='usage', on_delete=models.CASCADE, db_index=False)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['credentials', 'period', 'period_start'],
+                                    name='unique_usage_per_provider_and_period'),
+        ]
+
+
+class PublicationCalendar(models.Model):
+    """
+    Days on which a provider publishes exchange rates: some days of the week, except its closed days.
+
+    Used by the forward-fill mode of ExchangeFinder (see providers.calendar): rates of the other days
+    are taken from the last publication day instead of being requested from the provider.
+    """
+    credentials = models.OneToOneField(Credentials, related_name='calendar', on_delete=models.CASCADE)
+    weekdays = models.CharField(max_length=13, default='0,1,2,3,4',
+                                help_text="Comma-separated days of the week with rates, 0 is Monday.")
+
+    def __str__(self):
+        return f"{self.credentials} calendar"
+
+    @property
+    def weekday_set(self):
+        return {int(day) for day in self.weekdays.split(',') if day.strip()}
+
+
+class ClosedDay(models.Model):
+    """
+    A day, typically a holiday, on which a provider publishes no rates although its calendar would.
+    """
+    calendar = models.ForeignKey(PublicationCalendar, related_name='closed_days', on_delete=models.CASCADE)
+    date = models.DateField()
+    name = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['calendar', 'date'], name='unique_closed_day_per_calendar'),
+        ]
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .adapters.registry import adapter_registry
+from .calendar import invalidate_calendar
+from .models import ClosedDay, Credentials, PublicationCalendar
+
+
+@receiver([post_save, post_delete], sender=Credentials)
+def refresh_provider_adapter(sender, instance, **kwargs):
+    """
+    Signal handler triggered after a Credentials instance is saved or deleted.
+
+    Drops the cached adapter of the credential, now and once the transaction commits in case
+    another thread built it again from the old values in the meantime.
+    """
+    credentials_id = instance.pk
+    adapter_registry.invalidate(credentials_id)
+    transaction.on_commit(lambda: adapter_registry.invalidate(credentials_id))
+
+
+@receiver([post_save, post_delete], sender=Credentials)
+@receiver([post_save, post_delete], sender=PublicationCalendar)
+@receiver([post_save, post_delete], sender=ClosedDay)
+def refresh_publication_calendar(sender, instance, **kwargs):
+    """
+    Drop the cached publication calendar when a provider, its calendar or a closed day changes.
+    """
+    invalidate_calendar()
+    transaction.on_commit(invalidate_calendar)
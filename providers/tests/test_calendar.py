@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from providers.calendar import Calendar, publication_calendar
+from providers.models import ClosedDay, Credentials, PublicationCalendar
+
+
+class CalendarTests(TestCase):
+    def setUp(self):
+        # Monday to Friday, 2025-01-01 closed
+        self.calendar = Calendar(range(5), [date(2025, 1, 1)])
+
+    def test_count(self):
+        self.assertEqual(self.calendar.count(date(2024, 12, 30), date(2025, 1, 5)), 4)
+        self.assertEqual(self.calendar.count(date(2025, 1, 4), date(2025, 1, 5)), 0)
+        days = [date(2024, 1, 3) + timedelta(days=day) for day in range(424)]
+        self.assertEqual(self.calendar.count(days[0], days[-1]), sum(map(self.calendar.is_published, days)))
+
+    def test_last_publication(self):
+        self.assertEqual(self.calendar.last_publication(date(2025, 1, 5)), date(2025, 1, 3))
+        self.assertEqual(self.calendar.last_publication(date(2025, 1, 1)), date(2024, 12, 31))
+        self.assertEqual(self.calendar.last_publication(date(2025, 1, 6)), date(2025, 1, 6))
+
+    def test_calendar_of_the_provider_in_use(self):
+        self.assertEqual(publication_calendar().weekdays, set(range(7)))
+
+        provider = Credentials.objects.create(name='Mock', url='www.mock.com', token='sdasd', priority=1)
+        calendar = PublicationCalendar.objects.create(credentials=provider, weekdays='0,1,2,3,4')
+        ClosedDay.objects.create(calendar=calendar, date=date(2025, 1, 1))
+
+        self.assertEqual(publication_calendar().weekdays, set(range(5)))
+        self.assertEqual(publication_calendar().closed, {date(2025, 1, 1)})
+        provider.enabled = False
+        provider.save()
+        self.assertEqual(publication_calendar().weekdays, set(range(7)))
+
+    @override_settings(PROVIDER_CALENDAR_TTL=30)
+    def test_calendar_expires(self):
+        with patch('providers.calendar.cache.set') as cache_set:
+            publication_calendar()
+
+        self.assertEqual(cache_set.call_args.args[2], 30)
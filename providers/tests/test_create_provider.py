@@ -6,11 +6,14 @@ from django.test import TestCase
 
 from currencies.models import Currency
 from providers.adapters.create_provider import CreateProvider  # Adjust import based on your structure
+from providers.adapters.mock_provider import MockProvider
+from providers.adapters.registry import adapter_registry
 from providers.models import Credentials
 
 
 class CreateProviderTests(TestCase):
     def setUp(self):
+        adapter_registry.clear()
         # Set up test data in the database
         self.usd = Currency.objects.create(code='USD', name='US Dollar')
         self.today = datetime.today().strftime('%Y-%m-%d')
@@ -31,7 +34,7 @@ class CreateProviderTests(TestCase):
             enabled=True
         )
 
-    @patch('providers.adapters.create_provider.CurrencyBeaconAdapter')
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
     def test_create_currency_beacon_success(self, mock_beacon_adapter):
         # Test successful creation of CurrencyBeacon provider
         mock_provider_instance = Mock()
@@ -47,8 +50,8 @@ class CreateProviderTests(TestCase):
             source_currency='USD', start_date=self.today, end_date=self.today
         )
 
-    @patch('providers.adapters.create_provider.CurrencyBeaconAdapter')
-    @patch('providers.adapters.create_provider.MockProvider')
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
+    @patch('providers.adapters.mock_provider.MockProvider')
     def test_create_fallback_to_mock(self, mock_mock_provider, mock_beacon_adapter):
         # Test fallback to Mock provider when CurrencyBeacon fails
         mock_beacon_adapter.side_effect = requests.RequestException("API down")
@@ -63,7 +66,7 @@ class CreateProviderTests(TestCase):
         self.assertEqual(Credentials.objects.get(name='Mock').priority, 1)  # Mock now highest
         mock_mock_provider.assert_called_once()
 
-    @patch('providers.adapters.create_provider.CurrencyBeaconAdapter')
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
     def test_create_currency_beacon_request_exception(self, mock_beacon_adapter):
         # Test handling of RequestException with no other providers
         mock_beacon_adapter.side_effect = requests.RequestException("API down")
@@ -75,7 +78,7 @@ class CreateProviderTests(TestCase):
         self.assertEqual(str(context.exception), "There is no Provider, please speak to the administrator")
         self.assertIn('CurrencyBeacon', provider_creator.providers_list)
 
-    @patch('providers.adapters.create_provider.MockProvider')
+    @patch('providers.adapters.mock_provider.MockProvider')
     def test_create_mock_provider_success(self, mock_mock_provider):
         # Test successful creation of Mock provider when it's the only enabled one
         Credentials.objects.filter(name='CurrencyBeacon').delete()
@@ -88,7 +91,7 @@ class CreateProviderTests(TestCase):
         self.assertEqual(result, mock_mock_instance)
         mock_mock_provider.assert_called_once()
 
-    @patch('providers.adapters.create_provider.MockProvider')
+    @patch('providers.adapters.mock_provider.MockProvider')
     def test_create_mock_provider_exception(self, mock_mock_provider):
         # Test Mock provider raising an exception with no fallback
         Credentials.objects.filter(name='CurrencyBeacon').delete()
@@ -110,7 +113,7 @@ class CreateProviderTests(TestCase):
         self.assertEqual(str(context.exception), "There is no Provider, please speak to the administrator")
         self.assertEqual(len(provider_creator.providers_list), 0)
 
-    @patch('providers.adapters.create_provider.CurrencyBeaconAdapter')
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
     def test_change_priority_logic(self, mock_beacon_adapter):
         # Test priority reassignment when CurrencyBeacon fails
         mock_beacon_adapter.side_effect = requests.RequestException("API down")
@@ -129,7 +132,32 @@ class CreateProviderTests(TestCase):
         self.assertEqual(backup.priority, 2)  # Shifted up
         self.assertIn('CurrencyBeacon', provider_creator.providers_list)
 
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
+    def test_adapters_are_reused_until_credentials_change(self, mock_beacon_adapter):
+        # The adapter of a credential is built once and rebuilt after the credential is saved
+        provider_creator = CreateProvider()
+        first = provider_creator.create()
+        self.assertIs(CreateProvider().create(), first)
+        mock_beacon_adapter.assert_called_once()
+
+        self.beacon.token = 'new-token'
+        self.beacon.save()
+        CreateProvider().create()
+        self.assertEqual(mock_beacon_adapter.call_count, 2)
+        mock_beacon_adapter.assert_called_with(token='new-token', url='https://api.currencybeacon.com')
+
+    def test_providers_without_adapter_are_skipped(self):
+        # Adapter classes are resolved from the dotted paths of PROVIDER_ADAPTERS
+        Credentials.objects.filter(name='CurrencyBeacon').update(name='Unknown')
+
+        result = CreateProvider().create()
+
+        self.assertIsInstance(result, MockProvider)
+        self.assertIs(adapter_registry.adapter_class('Mock'), MockProvider)
+        self.assertIsNone(adapter_registry.adapter_class('Unknown'))
+
     def tearDown(self):
         # Clean up after tests
+        adapter_registry.clear()
         Currency.objects.all().delete()
         Credentials.objects.all().delete()
@@ -4,7 +4,7 @@ import requests
 from django.test import TestCase
 
 from currencies.models import Currency
-from .adapters.currency_beacon import CurrencyBeaconAdapter
+from providers.adapters.currency_beacon import CurrencyBeaconAdapter
 
 
 class CurrencyBeaconAdapterTestCase(TestCase):
@@ -40,7 +40,7 @@ class CurrencyBeaconAdapterTestCase(TestCase):
         self.assertEqual(result, 0.85)
         mock_get.assert_called_once_with(
             "https://api.currencybeacon.com/v1/historical?base=USD&date=2023-01-01&symbols=EUR",
-            headers={"Authorization": "Bearer test_token"}
+            headers={"Authorization": "Bearer test_token"}, timeout=10
         )
 
     @patch('providers.adapters.currency_beacon.requests.get')
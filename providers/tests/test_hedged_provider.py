@@ -0,0 +1,137 @@
+import threading
+import time
+
+import requests
+
+from django.test import TestCase, override_settings
+
+from currencies.models import Currency
+from providers.adapters.create_provider import CreateProvider
+from providers.adapters import hedged
+from providers.adapters.hedged import HedgedProvider, hedge_metrics, latency_tracker
+from providers.models import Credentials
+
+
+class SlowProvider(object):
+    """Provider that answers once `release` is set, or right away if there is none."""
+
+    def __init__(self, result=None, error=None, release=None):
+        self.result = result
+        self.error = error
+        self.release = release
+        self.calls = 0
+
+    def get_timeseries_rates(self, source_currency, start_date, end_date):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@override_settings(PROVIDER_HEDGE_DEFAULT_DELAY=0.05, PROVIDER_HEDGE_MIN_SAMPLES=3, PROVIDER_HEDGE_PERCENTILE=50)
+class HedgedProviderTests(TestCase):
+    def setUp(self):
+        latency_tracker.clear()
+        hedge_metrics.clear()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def test_fast_primary_is_not_hedged(self):
+        secondary = SlowProvider(result={'from': 'secondary'})
+        provider = HedgedProvider(SlowProvider(result={'from': 'primary'}), secondary, 'Primary', 'Secondary')
+
+        self.assertEqual(provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01'), {'from': 'primary'})
+        self.assertEqual(secondary.calls, 0)
+        self.assertEqual(hedge_metrics.snapshot()['hedge_rate'], 0.0)
+
+    def test_slow_primary_is_hedged(self):
+        provider = HedgedProvider(SlowProvider(result={'from': 'primary'}, release=self.release),
+                                  SlowProvider(result={'from': 'secondary'}), 'Primary', 'Secondary')
+
+        self.assertEqual(provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01'), {'from': 'secondary'})
+        metrics = hedge_metrics.snapshot()
+        self.assertEqual((metrics['requests'], metrics['hedged'], metrics['hedge_wins']), (1, 1, 1))
+
+    def test_failed_primary_is_hedged(self):
+        provider = HedgedProvider(SlowProvider(error=ValueError("down")),
+                                  SlowProvider(result={'from': 'secondary'}), 'Primary', 'Secondary')
+
+        self.assertEqual(provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01'), {'from': 'secondary'})
+
+    def test_both_failing_raise_primary_error(self):
+        provider = HedgedProvider(SlowProvider(error=ValueError("primary down")),
+                                  SlowProvider(error=ValueError("secondary down")), 'Primary', 'Secondary')
+
+        with self.assertRaisesMessage(ValueError, "primary down"):
+            provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+        self.assertEqual(hedge_metrics.snapshot()['failures'], 1)
+
+    @override_settings(PROVIDER_TIMEOUT=0.2)
+    def test_hung_providers_time_out(self):
+        provider = HedgedProvider(SlowProvider(result={'from': 'primary'}, release=self.release),
+                                  SlowProvider(result={'from': 'secondary'}, release=self.release),
+                                  'Primary', 'Secondary')
+
+        start = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(hedge_metrics.snapshot()['failures'], 1)
+
+    @override_settings(PROVIDER_TIMEOUT=None)
+    def test_providers_without_timeout(self):
+        provider = HedgedProvider(SlowProvider(result={'from': 'primary'}, release=self.release),
+                                  SlowProvider(result={'from': 'secondary'}), 'Primary', 'Secondary')
+
+        self.assertEqual(provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01'), {'from': 'secondary'})
+
+    @override_settings(PROVIDER_HEDGE_WORKERS=1)
+    def test_hedge_delay_starts_with_the_call(self):
+        # The only hedge thread is busy: time spent waiting for it does not trigger the hedge
+        hedged._executor = None
+        try:
+            hedged._pool().submit(time.sleep, 0.2)
+            secondary = SlowProvider(result={'from': 'secondary'})
+            provider = HedgedProvider(SlowProvider(result={'from': 'primary'}), secondary, 'Primary', 'Secondary')
+
+            self.assertEqual(provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01'), {'from': 'primary'})
+            self.assertEqual(secondary.calls, 0)
+        finally:
+            hedged._pool().shutdown(wait=False)
+            hedged._executor = None
+
+    def test_hedge_delay_follows_recent_latency(self):
+        for seconds in (0.01, 0.02, 10):
+            latency_tracker.record('Primary', seconds)
+
+        self.assertEqual(latency_tracker.percentile('Primary', 50), 0.02)
+        self.assertIsNone(latency_tracker.percentile('Secondary', 50))
+
+
+class CreateHedgedProviderTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        Credentials.objects.create(name='Mock', token='XXXX', url='www.mock.com', priority=1, enabled=True)
+        Credentials.objects.create(name='CurrencyBeacon', token='test-token', url='https://api.currencybeacon.com',
+                                   priority=2, enabled=True)
+
+    @override_settings(PROVIDER_HEDGING=True)
+    def test_create_pairs_with_next_provider(self):
+        provider = CreateProvider().create()
+
+        self.assertIsInstance(provider, HedgedProvider)
+        self.assertEqual((provider.primary_name, provider.secondary_name), ('Mock', 'CurrencyBeacon'))
+
+    @override_settings(PROVIDER_HEDGING=False)
+    def test_create_without_hedging(self):
+        self.assertNotIsInstance(CreateProvider().create(), HedgedProvider)
+
+    @override_settings(PROVIDER_HEDGING=True)
+    def test_create_without_backup_provider(self):
+        Credentials.objects.filter(name='CurrencyBeacon').update(enabled=False)
+
+        self.assertNotIsInstance(CreateProvider().create(), HedgedProvider)
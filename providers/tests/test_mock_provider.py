@@ -53,7 +53,7 @@ class TestMockProvider(TestCase):
         with self.settings():
             with self.subTest("Mocking pre_get_timeseries"):
                 from unittest.mock import patch
-                with patch('your_app.models.pre_get_timeseries') as mock_pre_get:
+                with patch('providers.adapters.mock_provider.pre_get_timeseries') as mock_pre_get:
                     # Mock return value for pre_get_timeseries
                     mock_pre_get.return_value = (datetime(2023, 1, 1),
                                                  datetime(2023, 1, 2),
@@ -0,0 +1,83 @@
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import Mock
+
+from django.test import TestCase, override_settings
+
+from currencies.models import Currency
+from currencies.registry import currency_registry
+from providers.adapters.create_provider import CreateProvider
+from providers.adapters.response_cache import CachedResponseProvider, ResponseCache, ResponseNotCached
+from providers.models import Credentials
+
+
+class CachedResponseProviderTests(TestCase):
+    def setUp(self):
+        currency_registry.clear()
+        Currency.objects.create(code='USD', name='US Dollar')
+        Currency.objects.create(code='EUR', name='Euro')
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.directory.name)
+        self.inner = Mock()
+        self.inner.get_timeseries_rates.return_value = {'2025-01-01': {'EUR': 0.93}}
+        self.provider = CachedResponseProvider(self.inner, 'CurrencyBeacon', cache=self.cache)
+        self.today = date.today().strftime('%Y-%m-%d')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        currency_registry.clear()
+
+    @override_settings(PROVIDER_RESPONSE_CACHE_MODE='readwrite')
+    def test_historical_window_is_fetched_once(self):
+        first = self.provider.get_timeseries_rates('usd', '2025-01-01', '2025-01-01')
+        second = self.provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.inner.get_timeseries_rates.call_count, 1)
+        self.assertTrue(self.cache.path('CurrencyBeacon', 'USD', 'EUR', '2025-01-01', '2025-01-01').exists())
+
+    @override_settings(PROVIDER_RESPONSE_CACHE_MODE='readwrite')
+    def test_current_window_is_always_fetched(self):
+        self.provider.get_timeseries_rates('USD', self.today, self.today)
+        self.provider.get_timeseries_rates('USD', self.today, self.today)
+
+        self.assertEqual(self.inner.get_timeseries_rates.call_count, 2)
+
+    @override_settings(PROVIDER_RESPONSE_CACHE_MODE='readwrite')
+    def test_new_symbols_change_the_key(self):
+        self.provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+        Currency.objects.create(code='GBP', name='British Pound')
+
+        self.provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+
+        self.assertEqual(self.inner.get_timeseries_rates.call_count, 2)
+
+    def test_record_then_replay(self):
+        with override_settings(PROVIDER_RESPONSE_CACHE_MODE='record'):
+            recorded = self.provider.get_timeseries_rates('USD', self.today, self.today)
+
+        with override_settings(PROVIDER_RESPONSE_CACHE_MODE='replay'):
+            self.assertEqual(self.provider.get_timeseries_rates('USD', self.today, self.today), recorded)
+            with self.assertRaises(ResponseNotCached):
+                self.provider.get_timeseries_rates('USD', '2024-01-01', '2024-01-02')
+        self.assertEqual(self.inner.get_timeseries_rates.call_count, 1)
+
+
+class CreateCachedProviderTests(TestCase):
+    def setUp(self):
+        Currency.objects.create(code='USD', name='US Dollar')
+        Currency.objects.create(code='EUR', name='Euro')
+        Credentials.objects.create(name='Mock', token='XXXX', url='www.mock.com', priority=1)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_mock_responses_are_replayed(self):
+        yesterday = (date.today() - timedelta(days=1)).strftime('%Y-%m-%d')
+        with self.settings(PROVIDER_RESPONSE_CACHE_MODE='readwrite', PROVIDER_RESPONSE_CACHE_DIR=self.directory.name):
+            provider = CreateProvider().create()
+            self.assertIsInstance(provider, CachedResponseProvider)
+            recorded = provider.get_timeseries_rates('USD', yesterday, yesterday)
+        with self.settings(PROVIDER_RESPONSE_CACHE_MODE='replay', PROVIDER_RESPONSE_CACHE_DIR=self.directory.name):
+            self.assertEqual(CreateProvider().create().get_timeseries_rates('USD', yesterday, yesterday), recorded)
@@ -0,0 +1,115 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from currencies.models import Currency
+from providers.adapters.create_provider import CreateProvider
+from providers.adapters.throttle import (BACKGROUND, INTERACTIVE, ProviderThrottled, ThrottledProvider, TokenBucket,
+                                         background_fetch, current_usage, record_usage, remaining_quota)
+from providers.models import Credentials
+
+
+class TokenBucketTests(TestCase):
+    def test_burst_then_refused(self):
+        bucket = TokenBucket(rate=0.001, burst=2)
+
+        self.assertTrue(bucket.acquire(INTERACTIVE, timeout=0))
+        self.assertTrue(bucket.acquire(INTERACTIVE, timeout=0))
+        self.assertFalse(bucket.acquire(INTERACTIVE, timeout=0.01))
+
+    @override_settings(PROVIDER_BACKGROUND_RESERVE=0.5)
+    def test_background_leaves_reserve(self):
+        bucket = TokenBucket(rate=0.001, burst=4)
+
+        self.assertTrue(bucket.acquire(BACKGROUND, timeout=0))
+        self.assertTrue(bucket.acquire(BACKGROUND, timeout=0))
+        self.assertFalse(bucket.acquire(BACKGROUND, timeout=0))
+        self.assertTrue(bucket.acquire(INTERACTIVE, timeout=0))
+
+    def test_waits_for_refill(self):
+        bucket = TokenBucket(rate=100, burst=1)
+
+        self.assertTrue(bucket.acquire(INTERACTIVE, timeout=0))
+        self.assertTrue(bucket.acquire(INTERACTIVE, timeout=1))
+
+
+@override_settings(PROVIDER_BACKGROUND_RESERVE=0.5)
+class ThrottledProviderTests(TestCase):
+    def setUp(self):
+        self.credentials = Credentials.objects.create(name='CurrencyBeacon', token='token', url='https://api.test',
+                                                      priority=1, daily_quota=4, monthly_quota=100)
+        self.inner = Mock()
+        self.inner.get_timeseries_rates.return_value = {'2025-01-01': {'EUR': 0.93}}
+        self.provider = ThrottledProvider(self.inner, self.credentials)
+
+    def fetch(self):
+        return self.provider.get_timeseries_rates('USD', '2025-01-01', '2025-01-01')
+
+    def test_usage_is_counted(self):
+        self.fetch()
+        self.fetch()
+
+        self.assertEqual(current_usage(self.credentials), {'day': 2, 'month': 2})
+        self.assertEqual(remaining_quota(self.credentials), {'day': 2, 'month': 98})
+
+    def test_quota_exhausted(self):
+        for _ in range(4):
+            self.fetch()
+
+        with self.assertRaises(ProviderThrottled):
+            self.fetch()
+        self.assertEqual(self.inner.get_timeseries_rates.call_count, 4)
+
+    def test_background_keeps_quota_for_interactive(self):
+        with background_fetch():
+            self.fetch()
+            self.fetch()
+            with self.assertRaises(ProviderThrottled):
+                self.fetch()
+        self.fetch()
+        self.assertEqual(remaining_quota(self.credentials)['day'], 1)
+
+    def test_usage_is_counted_within_limits(self):
+        # The check and the count are one conditional update: the last request is only counted once
+        self.assertTrue(record_usage(self.credentials, {'day': 2}))
+        self.assertTrue(record_usage(self.credentials, {'day': 2}))
+        self.assertFalse(record_usage(self.credentials, {'day': 2}))
+        self.assertFalse(record_usage(self.credentials, {'day': 5, 'month': 2}))
+
+        self.assertEqual(current_usage(self.credentials), {'day': 2, 'month': 2})
+
+    def test_quota_command(self):
+        self.fetch()
+        out = StringIO()
+
+        call_command('provider_quota', stdout=out)
+
+        self.assertIn("today 1 used / 3 left, this month 1 used / 99 left", out.getvalue())
+
+
+class CreateThrottledProviderTests(TestCase):
+    def setUp(self):
+        self.usd = Currency.objects.create(code='USD', name='US Dollar')
+        self.beacon = Credentials.objects.create(name='CurrencyBeacon', token='token', url='https://api.test',
+                                                 priority=1, daily_quota=1)
+        self.mock = Credentials.objects.create(name='Mock', token='XXXX', url='www.mock.com', priority=2)
+
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
+    def test_limited_provider_is_throttled(self, mock_beacon_adapter):
+        provider = CreateProvider().create()
+
+        self.assertIsInstance(provider, ThrottledProvider)
+        self.assertEqual(remaining_quota(self.beacon)['day'], 0)
+
+    @patch('providers.adapters.currency_beacon.CurrencyBeaconAdapter')
+    def test_exhausted_quota_skips_provider(self, mock_beacon_adapter):
+        # The next provider serves the call, but the priorities are not swapped
+        CreateProvider().create()
+
+        provider = CreateProvider().create()
+
+        self.assertNotIsInstance(provider, ThrottledProvider)
+        self.assertEqual(Credentials.objects.get(name='CurrencyBeacon').priority, 1)
+        self.assertEqual(Credentials.objects.get(name='Mock').priority, 2)